@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+import redis.asyncio as redis
 from models.user import User
 from models.booking import Booking, BookingStatus
-from models.ticket import Ticket, TicketStatus
+from models.show import Show
 from schemas.booking import (
     BookingCreate, 
+    BookingBatchCreate,
+    BestAvailableRequest,
     BookingOut, 
+    BookingBatchOut,
     BookingDetailOut, 
     BookingListResponse,
     BookingConfirmRequest,
@@ -13,42 +17,62 @@ from schemas.booking import (
 )
 from daos.booking import BookingDAO
 from core.database import get_db
+from core.redis import get_redis
+from core.config import settings
+from core.pagination import require_offset_pagination
 from services.auth_service import get_current_user
-from typing import List
+from services.seat_allocator import seat_allocator
+from services.waiting_room import waiting_room
+from services.idempotency import idempotent
+from typing import List, Optional
 import math
+import uuid
 
 router = APIRouter()
 
+# How many candidate blocks the allocator tries before giving up
+MAX_ALLOCATION_ATTEMPTS = 3
+
+
+def _admission_required():
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="This show is behind a waiting room; join it at /waiting-room/{show_id}/join and retry with the X-Admission-Token header"
+    )
+
 
 @router.post("/bookings", response_model=BookingOut, status_code=status.HTTP_201_CREATED)
+@idempotent(BookingOut, status.HTTP_201_CREATED)
 async def create_booking(
     booking_data: BookingCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user),
+    x_admission_token: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
 ):
     """Create a new booking with distributed locking"""
-    dao = BookingDAO(db)
+    dao = BookingDAO(db, redis_client)
+    hold = None
+    
+    if not await waiting_room.check_admission(
+        redis_client, db, [booking_data.ticket_id], x_admission_token, current_user.id
+    ):
+        raise _admission_required()
     
     try:
-        # Check if ticket exists and is available
-        ticket = db.query(Ticket).filter(
-            Ticket.id == booking_data.ticket_id,
-            Ticket.status == TicketStatus.available
-        ).first()
+        # Check and acquire the distributed lock in a single round trip
+        hold = await dao.hold_ticket(booking_data.ticket_id, current_user.id)
         
-        if not ticket:
+        if hold.unavailable:
+            # Rejected by the seat inventory without touching the DB
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Ticket not found or not available"
             )
         
-        # Try to acquire distributed lock
-        lock_acquired = await dao.acquire_ticket_lock(booking_data.ticket_id, current_user.id)
-        
-        if not lock_acquired:
-            # Check if another user has the lock
-            lock_owner = await dao.get_ticket_lock_owner(booking_data.ticket_id)
-            if lock_owner and lock_owner != current_user.id:
+        if not hold.acquired:
+            if hold.owner_id and hold.owner_id != current_user.id:
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
                     detail="Ticket is currently being booked by another user"
@@ -59,55 +83,211 @@ async def create_booking(
                     detail="Unable to reserve ticket at this time"
                 )
         
-        # Create the booking
-        booking = dao.create_booking(booking_data, current_user.id)
+        # Create the booking; the DB write checks the hold's fencing token
+        booking = await dao.create_booking(booking_data, current_user.id, hold.fence_token)
         
         if not booking:
             # Release lock if booking creation failed
-            await dao.release_ticket_lock(booking_data.ticket_id)
+            await dao.release_ticket_lock(booking_data.ticket_id, current_user.id, hold.fence_token)
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Failed to create booking"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Ticket not found or not available"
             )
         
-        # Send Kafka event for booking creation
-        dao._send_booking_event("booking_created", booking, current_user)
-        
         return booking
         
     except HTTPException:
         raise
     except Exception as e:
-        # Release lock on any error
-        await dao.release_ticket_lock(booking_data.ticket_id)
+        # Release our lock (if we took one) on any error
+        if hold and hold.acquired:
+            await dao.release_ticket_lock(booking_data.ticket_id, current_user.id, hold.fence_token)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating booking: {str(e)}"
         )
 
 
+@router.post("/bookings/batch", response_model=BookingBatchOut, status_code=status.HTTP_201_CREATED)
+@idempotent(BookingBatchOut, status.HTTP_201_CREATED)
+async def create_booking_batch(
+    batch_data: BookingBatchCreate,
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user),
+    x_admission_token: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
+    """Hold several tickets together, all or nothing"""
+    dao = BookingDAO(db, redis_client)
+    ticket_ids = batch_data.ticket_ids
+    hold = None
+    
+    if not await waiting_room.check_admission(
+        redis_client, db, ticket_ids, x_admission_token, current_user.id
+    ):
+        raise _admission_required()
+    
+    try:
+        # Acquire every lock or none in a single round trip
+        hold = await dao.hold_tickets(ticket_ids, current_user.id)
+        
+        if hold.unavailable:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Ticket {hold.conflict_ticket_id} is not available"
+            )
+        
+        if not hold.acquired:
+            if hold.owner_id and hold.owner_id != current_user.id:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Ticket {hold.conflict_ticket_id} is currently being booked by another user"
+                )
+            else:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Unable to reserve ticket {hold.conflict_ticket_id} at this time"
+                )
+        
+        # Insert every booking in one transaction
+        group_id = uuid.uuid4().hex
+        bookings = await dao.create_bookings(ticket_ids, current_user.id, hold.fence_tokens, group_id)
+        
+        if not bookings:
+            await dao.release_ticket_locks(ticket_ids, current_user.id, hold.fence_tokens)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="One or more tickets not found or not available"
+            )
+        
+        return {"group_id": group_id, "bookings": bookings}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Release our locks (if we took them) on any error
+        if hold and hold.acquired:
+            await dao.release_ticket_locks(ticket_ids, current_user.id, hold.fence_tokens)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating bookings: {str(e)}"
+        )
+
+
+@router.post("/bookings/best-available", response_model=BookingBatchOut, status_code=status.HTTP_201_CREATED)
+@idempotent(BookingBatchOut, status.HTTP_201_CREATED)
+async def create_best_available_booking(
+    request_data: BestAvailableRequest,
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user),
+    x_admission_token: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
+    """Hold the best available block of seats in a ticket class, chosen server-side"""
+    dao = BookingDAO(db, redis_client)
+    ticket_ids = None
+    hold = None
+    
+    gated = await waiting_room.gated_shows(redis_client)
+    if request_data.show_id in gated and \
+            waiting_room.verify_token(x_admission_token, current_user.id) != request_data.show_id:
+        raise _admission_required()
+    # The allocator indexes every show it is asked about
+    if await db.get(Show, request_data.show_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Show not found")
+    
+    try:
+        for _ in range(MAX_ALLOCATION_ATTEMPTS):
+            ticket_ids = await seat_allocator.allocate(
+                db,
+                redis_client,
+                request_data.show_id,
+                request_data.ticket_class,
+                request_data.quantity,
+                request_data.allow_split
+            )
+            if not ticket_ids:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"No {request_data.quantity} seats available in class {request_data.ticket_class}"
+                )
+            
+            hold = await dao.hold_tickets(ticket_ids, current_user.id)
+            if hold.acquired:
+                break
+            
+            # Lost a race with another worker: keep the contested seat out of
+            # the local index and try the next block
+            seat_allocator.mark_released(t for t in ticket_ids if t != hold.conflict_ticket_id)
+            if hold.unavailable:
+                seat_allocator.mark_sold([hold.conflict_ticket_id])
+            else:
+                seat_allocator.mark_held([hold.conflict_ticket_id])
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Seats are selling fast, please try again"
+            )
+        
+        group_id = uuid.uuid4().hex
+        bookings = await dao.create_bookings(ticket_ids, current_user.id, hold.fence_tokens, group_id)
+        
+        if not bookings:
+            await dao.release_ticket_locks(ticket_ids, current_user.id, hold.fence_tokens)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Selected seats are no longer available, please try again"
+            )
+        
+        return {"group_id": group_id, "bookings": bookings}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        if hold and hold.acquired:
+            await dao.release_ticket_locks(ticket_ids, current_user.id, hold.fence_tokens)
+        elif ticket_ids:
+            seat_allocator.mark_released(ticket_ids)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error allocating seats: {str(e)}"
+        )
+
+
 @router.get("/bookings", response_model=BookingListResponse)
 async def list_user_bookings(
-    page: int = Query(1, ge=1, description="Page number"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    page: Optional[int] = Query(None, ge=1, description="Page number (offset pagination, compatibility)"),
     limit: int = Query(10, gt=0, le=100, description="Items per page"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
-    """List current user's bookings with pagination"""
-    dao = BookingDAO(db)
-    
-    # Calculate pagination
-    skip = (page - 1) * limit
-    total_count = dao.count_user_bookings(current_user.id)
+    """List current user's bookings, newest first, with cursor pagination"""
+    dao = BookingDAO(db, redis_client)
+    total_count = await dao.count_user_bookings_cached(current_user.id, settings.COUNT_CACHE_SECONDS)
     total_pages = math.ceil(total_count / limit) if total_count > 0 else 1
-    
-    # Get bookings
-    bookings = dao.get_user_bookings(current_user.id, skip, limit)
-    
+
+    if page is not None:
+        require_offset_pagination()
+        bookings = await dao.get_user_bookings(current_user.id, (page - 1) * limit, limit)
+        return BookingListResponse(
+            total_count=total_count,
+            current_page=page,
+            total_pages=total_pages,
+            data=bookings
+        )
+
+    try:
+        bookings, next_cursor = await dao.get_user_bookings_page(current_user.id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return BookingListResponse(
         total_count=total_count,
-        current_page=page,
         total_pages=total_pages,
+        next_cursor=next_cursor,
         data=bookings
     )
 
@@ -115,13 +295,14 @@ async def list_user_bookings(
 @router.get("/bookings/{booking_id}", response_model=BookingDetailOut)
 async def get_booking_details(
     booking_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
     """Get detailed information about a specific booking"""
-    dao = BookingDAO(db)
+    dao = BookingDAO(db, redis_client)
     
-    booking = dao.get_booking_with_details(booking_id, current_user.id)
+    booking = await dao.get_booking_with_details(booking_id, current_user.id)
     
     if not booking:
         raise HTTPException(
@@ -151,14 +332,17 @@ async def get_booking_details(
 
 
 @router.post("/bookings/{booking_id}/confirm", response_model=BookingOut)
+@idempotent(BookingOut)
 async def confirm_booking(
     booking_id: int,
     confirm_data: BookingConfirmRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
 ):
     """Confirm a booking (after the hold/seat reservation step)"""
-    dao = BookingDAO(db)
+    dao = BookingDAO(db, redis_client)
     
     try:
         booking = await dao.confirm_booking(booking_id, current_user.id)
@@ -181,14 +365,17 @@ async def confirm_booking(
 
 
 @router.post("/bookings/{booking_id}/cancel", response_model=BookingOut)
+@idempotent(BookingOut)
 async def cancel_booking(
     booking_id: int,
     cancel_data: BookingCancelRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
 ):
     """Cancel a reserved booking"""
-    dao = BookingDAO(db)
+    dao = BookingDAO(db, redis_client)
     
     try:
         booking = await dao.cancel_booking(booking_id, current_user.id)
@@ -212,7 +399,8 @@ async def cancel_booking(
 
 @router.post("/bookings/cleanup-expired", status_code=status.HTTP_200_OK)
 async def cleanup_expired_bookings(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
     """Clean up expired bookings (admin utility endpoint)"""
@@ -223,11 +411,11 @@ async def cleanup_expired_bookings(
             detail="Only admins can perform this action"
         )
     
-    dao = BookingDAO(db)
+    dao = BookingDAO(db, redis_client)
     
     try:
-        await dao.cleanup_expired_bookings()
-        return {"message": "Expired bookings cleaned up successfully"}
+        expired = await dao.cleanup_expired_bookings(settings.BOOKING_CLEANUP_CHUNK_SIZE)
+        return {"message": "Expired bookings cleaned up successfully", "expired": expired}
         
     except Exception as e:
         raise HTTPException(
@@ -1,15 +1,21 @@
-import json
-from typing import Any, Dict, List
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from models.show import Show
 from models.user import User
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from schemas.show import ShowCreate, ShowDetailOut, ShowOut, ShowUpdate
 from daos.show import ShowDAO
+from daos.seat_inventory import SeatInventoryDAO
+from daos.show_availability import ShowAvailabilityDAO
+from daos.show_search import ShowSearchDAO
+from core.config import settings
 from core.database import get_db
+from core.pagination import require_offset_pagination
 from fastapi import Query
-from core.redis import redis_client
-from core.elasticsearch import es_client
+import redis.asyncio as redis
+from core.redis import get_redis
+from core.elasticsearch import get_search_client
 from services.auth_service import get_current_user
 
 router = APIRouter()
@@ -28,7 +34,8 @@ def require_admin_role(current_user: User = Depends(get_current_user)):
 @router.post("/shows", response_model=ShowOut, status_code=status.HTTP_201_CREATED)
 async def create_show(
     show_data: ShowCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
     current_user: User = Depends(require_admin_role)
 ):
     try:
@@ -39,12 +46,12 @@ async def create_show(
                 status_code=400, detail="At least one ticket must be created")
 
         # Create the show
-        dao = ShowDAO(db)
-        show = dao.create_show_with_tickets(
+        dao = ShowDAO(db, redis_client)
+        show = await dao.create_show_with_tickets(
             show_data, total_tickets=total_tickets)
         return show
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500, detail=f"Error creating show: {str(e)}")
 
@@ -53,12 +60,13 @@ async def create_show(
 async def update_show(
     show_id: int,
     show_update: ShowUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
     current_user: User = Depends(require_admin_role)
 ):
     """Update a show (admin only)"""
-    dao = ShowDAO(db)
-    show = dao.update_show(show_id, show_update)
+    dao = ShowDAO(db, redis_client)
+    show = await dao.update_show(show_id, show_update)
     
     if not show:
         raise HTTPException(
@@ -66,43 +74,125 @@ async def update_show(
             detail="Show not found"
         )
     
-    # Clear cache for this show
-    await redis_client.delete(f"show_{show_id}")
-    
     return show
 
 
 @router.get("/shows")
-def list_shows(
-    page: int = Query(1, ge=1),
-    limit: int = Query(10, gt=0),
-    db: Session = Depends(get_db)
+async def list_shows(
+    cursor: Optional[str] = None,
+    page: Optional[int] = Query(None, ge=1, description="Offset pagination (compatibility)"),
+    limit: int = Query(10, gt=0, le=100),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
-    total_record = db.query(Show).count()
-    offset = (page - 1) * limit
-    shows = db.query(Show).offset(offset).limit(limit).all()
-    return {
-        "total_record": total_record,
-        "current_page": page,
-        "data": shows
-    }
+    """List shows. Pass `next_cursor` from a page back as `cursor` to get the next one.
 
-# , response_model=ShowDetailOut
+    `total_record` is an estimate from the table statistics.
+    """
+    dao = ShowDAO(db)
+    total_record = await dao.estimate_show_count()
+    response = {"total_record": total_record}
+    if page is not None:
+        require_offset_pagination()
+        shows = await dao.list_shows(skip=(page - 1) * limit, limit=limit)
+        response["current_page"] = page
+    else:
+        try:
+            shows, response["next_cursor"] = await dao.list_shows_page(limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    available = await ShowAvailabilityDAO(redis_client).get_many(db, [show.id for show in shows])
+    response["data"] = [
+        ShowOut.model_validate(show).model_copy(update={"available_tickets": available[show.id]})
+        for show in shows
+    ]
+    return response
+
+
+@router.get("/shows/search")
+async def search_shows(
+    q: Optional[str] = Query(None, max_length=200),
+    location: Optional[str] = Query(None, max_length=200),
+    starts_after: Optional[datetime] = None,
+    starts_before: Optional[datetime] = None,
+    available_only: bool = False,
+    max_price: Optional[float] = Query(None, ge=0),
+    size: int = Query(10, gt=0, le=settings.SHOW_SEARCH_MAX_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
+    search_client=Depends(get_search_client)
+):
+    """Full-text search on name, performer, description and location.
+
+    `available_only` and `max_price` filter on the ticket availability
+    projection kept in the index. Pass `next_cursor` from a page back as
+    `cursor` to get the next one.
+    """
+    dao = ShowSearchDAO(search_client, redis_client, settings.SHOW_SEARCH_CACHE_SECONDS)
+    params = dao.normalize(q, location, starts_after, starts_before, size, cursor, available_only, max_price)
+    try:
+        page = await dao.search(params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Cached pages are static; availability always comes from the live counter
+    available = await ShowAvailabilityDAO(redis_client).get_many(db, [doc["id"] for doc in page["data"]])
+    for doc in page["data"]:
+        doc["available_tickets"] = available.get(doc["id"])
+    return page
+
+
+@router.get("/shows/autocomplete")
+async def autocomplete_shows(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    size: int = Query(5, gt=0, le=settings.AUTOCOMPLETE_MAX_SIZE),
+    search_client=Depends(get_search_client)
+):
+    """Ranked show name and performer suggestions for a search box prefix"""
+    dao = ShowSearchDAO(search_client)
+    return {"prefix": prefix, "suggestions": await dao.suggest(prefix, size)}
 
 
-@router.get("/shows/{show_id}")
-async def get_show_detail(show_id: int, db: Session = Depends(get_db)):
-    cached_show = await redis_client.get(f"show_{show_id}")
+@router.get("/shows/{show_id}/seat-map")
+async def get_seat_map(
+    show_id: int,
+    redis_client: redis.Redis = Depends(get_redis)
+):
+    """Live seat states for a show, served from the Redis seat inventory"""
+    seats = await SeatInventoryDAO(redis_client).get_seat_map(show_id)
+    if not seats:
+        raise HTTPException(status_code=404, detail="Seat map not found")
+    return {"show_id": show_id, "seats": seats}
 
-    if cached_show:
-        data = json.loads(cached_show)
-        return data
-    show = db.query(Show).filter(Show.id == show_id).first()
 
-    if not show:
+@router.post("/shows/{show_id}/seat-map/rebuild")
+async def rebuild_seat_map(
+    show_id: int,
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(require_admin_role)
+):
+    """Rebuild a show's seat inventory from Postgres (admin only)"""
+    indexed = await SeatInventoryDAO(redis_client).rebuild_from_db(db, show_id)
+    return {"message": "Seat map rebuilt", "tickets_indexed": indexed}
+
+# , response_model=ShowDetailOut
+
+
+@router.get("/shows/{show_id}")
+async def get_show_detail(
+    show_id: int,
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis)
+):
+    data = await ShowDAO(db, redis_client).get_show_detail_cached(show_id)
+    if data is None:
         raise HTTPException(status_code=404, detail="Show not found")
-    await redis_client.set(f"show_{show_id}", ShowOut.model_validate(show).model_dump_json())
-    return show
+
+    # The cached copy is static; availability always comes from the live counter
+    # (copied: callers coalesced onto one load share the same dict)
+    return {**data, "available_tickets": await ShowAvailabilityDAO(redis_client).get(db, show_id)}
 
     tickets = TicketDAO(db).get_tickets_by_show_id(show_id)
 
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+import redis.asyncio as redis
 from models.user import User
-from models.ticket import Ticket, TicketStatus
+from models.ticket import TicketStatus
 from schemas.ticket import TicketOut, TicketCreate, TicketUpdate, TicketDetailOut
 from daos.ticket import TicketDAO
 from core.database import get_db
+from core.pagination import require_offset_pagination
+from core.redis import get_redis
 from services.auth_service import get_current_user
 from typing import List, Optional
 
@@ -22,14 +25,14 @@ def require_admin_role(current_user: User = Depends(get_current_user)):
 
 
 @router.get("/tickets/{ticket_id}", response_model=TicketDetailOut)
-def get_ticket_details(
+async def get_ticket_details(
     ticket_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get detailed information about a specific ticket"""
     dao = TicketDAO(db)
-    ticket = dao.get_ticket_with_show_details(ticket_id)
+    ticket = await dao.get_ticket_with_show_details(ticket_id)
     
     if not ticket:
         raise HTTPException(
@@ -54,49 +57,67 @@ def get_ticket_details(
 
 
 @router.get("/tickets", response_model=List[TicketOut])
-def list_tickets(
-    skip: int = Query(0, ge=0),
+async def list_tickets(
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: Optional[int] = Query(None, ge=0, description="Offset pagination (compatibility)"),
     limit: int = Query(100, gt=0, le=1000),
     show_id: Optional[int] = Query(None),
     user_id: Optional[int] = Query(None),
     status: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get a list of tickets with optional filtering"""
+    """Get a list of tickets with optional filtering.
+
+    The cursor of the next page is returned in the X-Next-Cursor header.
+    """
     dao = TicketDAO(db)
     
-    # Build query based on filters
-    query = db.query(Ticket)
-    
-    if show_id:
-        query = query.filter(Ticket.show_id == show_id)
-    
-    if user_id:
-        query = query.filter(Ticket.user_id == user_id)
-    
+    ticket_status = None
     if status:
         try:
             ticket_status = TicketStatus(status)
-            query = query.filter(Ticket.status == ticket_status)
         except ValueError:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
+                status_code=400,
                 detail=f"Invalid status. Must be one of: {[s.value for s in TicketStatus]}"
             )
     
-    tickets = query.offset(skip).limit(limit).all()
+    if skip is not None:
+        require_offset_pagination()
+        return await dao.list_tickets(
+            skip=skip,
+            limit=limit,
+            show_id=show_id,
+            user_id=user_id,
+            status=ticket_status
+        )
+
+    try:
+        tickets, next_cursor = await dao.list_tickets_page(
+            limit=limit,
+            cursor=cursor,
+            show_id=show_id,
+            user_id=user_id,
+            status=ticket_status
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return tickets
 
 
 @router.post("/tickets", response_model=TicketOut, status_code=status.HTTP_201_CREATED)
-def create_ticket(
+async def create_ticket(
     ticket_data: TicketCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
     current_user: User = Depends(require_admin_role)
 ):
     """Create a new ticket (admin only)"""
-    dao = TicketDAO(db)
+    dao = TicketDAO(db, redis_client)
     
     try:
         # Validate status
@@ -106,7 +127,7 @@ def create_ticket(
                 detail=f"Invalid status. Must be one of: {[s.value for s in TicketStatus]}"
             )
         
-        ticket = dao.create_ticket(ticket_data)
+        ticket = await dao.create_ticket(ticket_data)
         return ticket
         
     except ValueError as e:
@@ -115,7 +136,7 @@ def create_ticket(
             detail=str(e)
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating ticket: {str(e)}"
@@ -123,14 +144,15 @@ def create_ticket(
 
 
 @router.put("/tickets/{ticket_id}", response_model=TicketOut)
-def update_ticket(
+async def update_ticket(
     ticket_id: int,
     ticket_update: TicketUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
     current_user: User = Depends(require_admin_role)
 ):
     """Update ticket information (admin only)"""
-    dao = TicketDAO(db)
+    dao = TicketDAO(db, redis_client)
     
     # Validate status if provided
     if ticket_update.status and ticket_update.status not in [s.value for s in TicketStatus]:
@@ -139,7 +161,7 @@ def update_ticket(
             detail=f"Invalid status. Must be one of: {[s.value for s in TicketStatus]}"
         )
     
-    ticket = dao.update_ticket(ticket_id, ticket_update)
+    ticket = await dao.update_ticket(ticket_id, ticket_update)
     
     if not ticket:
         raise HTTPException(
@@ -151,15 +173,16 @@ def update_ticket(
 
 
 @router.delete("/tickets/{ticket_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_ticket(
+async def delete_ticket(
     ticket_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
     current_user: User = Depends(require_admin_role)
 ):
     """Delete a ticket (admin only)"""
-    dao = TicketDAO(db)
+    dao = TicketDAO(db, redis_client)
     
-    success = dao.delete_ticket(ticket_id)
+    success = await dao.delete_ticket(ticket_id)
     
     if not success:
         raise HTTPException(
@@ -169,21 +192,21 @@ def delete_ticket(
 
 
 @router.get("/tickets/user/{user_id}", response_model=List[TicketOut])
-def get_user_tickets(
+async def get_user_tickets(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all tickets for a specific user"""
     dao = TicketDAO(db)
-    tickets = dao.get_tickets_by_user_id(user_id)
+    tickets = await dao.get_tickets_by_user_id(user_id)
     return tickets
 
 
 @router.get("/tickets/status/{status}", response_model=List[TicketOut])
-def get_tickets_by_status(
+async def get_tickets_by_status(
     status: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all tickets with a specific status"""
@@ -196,5 +219,5 @@ def get_tickets_by_status(
         )
     
     dao = TicketDAO(db)
-    tickets = dao.get_tickets_by_status(ticket_status)
+    tickets = await dao.get_tickets_by_status(ticket_status)
     return tickets
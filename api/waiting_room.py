@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field
+from typing import Optional
+import redis.asyncio as redis
+from models.user import User
+from core.config import settings
+from core.redis import get_redis
+from api.show import require_admin_role
+from services.auth_service import get_current_user
+from services.waiting_room import waiting_room
+
+router = APIRouter()
+
+
+class WaitingRoomStatus(BaseModel):
+    show_id: int
+    admitted: bool
+    admission_token: Optional[str] = None
+    position: int
+    eta_seconds: Optional[float] = None
+
+
+class WaitingRoomConfig(BaseModel):
+    admit_per_second: float = Field(settings.WAITING_ROOM_DEFAULT_ADMIT_PER_SECOND, gt=0)
+
+
+@router.post("/waiting-room/{show_id}/join", response_model=WaitingRoomStatus)
+async def join_waiting_room(
+    show_id: int,
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user)
+):
+    """Join a show's waiting room (idempotent); returns position and ETA"""
+    return await waiting_room.join(redis_client, show_id, current_user.id)
+
+
+@router.get("/waiting-room/{show_id}/status", response_model=WaitingRoomStatus)
+async def get_waiting_room_status(
+    show_id: int,
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(get_current_user)
+):
+    """Poll queue position/ETA; once admitted the admission token is returned"""
+    result = await waiting_room.status(redis_client, show_id, current_user.id)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not in the waiting room for this show"
+        )
+    return result
+
+
+@router.put("/waiting-room/{show_id}", status_code=status.HTTP_200_OK)
+async def enable_waiting_room(
+    show_id: int,
+    config: WaitingRoomConfig,
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(require_admin_role)
+):
+    """Put a show behind the waiting room (admin only)"""
+    await waiting_room.enable(redis_client, show_id, config.admit_per_second)
+    return {"message": "Waiting room enabled", "admit_per_second": config.admit_per_second}
+
+
+@router.delete("/waiting-room/{show_id}", status_code=status.HTTP_200_OK)
+async def disable_waiting_room(
+    show_id: int,
+    redis_client: redis.Redis = Depends(get_redis),
+    current_user: User = Depends(require_admin_role)
+):
+    """Open a show to everyone again and drop its queue (admin only)"""
+    await waiting_room.disable(redis_client, show_id)
+    return {"message": "Waiting room disabled"}
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from prometheus_client import Counter, Gauge, Histogram
+import redis.asyncio as redis
+
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Read-through cache lookups', ['cache', 'outcome'])
+CACHE_LOAD_SECONDS = Histogram(
+    'cache_load_seconds', 'Time to load a missing cache entry from its source', ['cache'])
+LOCAL_CACHE_EVICTIONS = Counter(
+    'cache_local_evictions_total', 'Entries dropped from in-process caches', ['cache', 'reason'])
+LOCAL_CACHE_ENTRIES = Gauge(
+    'cache_local_entries', 'Entries held by in-process caches', ['cache'])
+
+# Stored for keys whose source had nothing (e.g. a 404), so misses are cached too
+NEGATIVE_ENTRY = "__none__"
+
+# KEYS[1] = entry, KEYS[2] = its generation. ARGV = generation read before
+# loading, value, TTL in ms. Skips the write when the entry was invalidated
+# while it was loading, so a slow load never re-caches stale data.
+STORE_IF_CURRENT_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])
+return 1
+"""
+
+# KEYS[1] = lock. ARGV[1] = owner token.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Every worker subscribes; invalidate() publishes {"cache": name, "keys": [...]}
+INVALIDATION_CHANNEL = "cache:invalidations"
+
+# Loads in progress in this process, shared by concurrent callers of the same key
+_in_flight: Dict[str, asyncio.Future] = {}
+
+# Returned by LocalCache.get() for keys it does not hold (None is a cached miss)
+MISSING = object()
+
+
+class LocalCache:
+    """Bounded in-process LRU with a TTL.
+
+    Values are shared by every caller in the process, so they must be
+    treated as read-only. In front of a ReadThroughCache, other workers'
+    invalidations arrive over pub/sub (listen_for_invalidations) and the TTL
+    bounds staleness should a message be lost; used on its own (e.g. the
+    autocomplete cache) the TTL is the only bound.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # Bumped on every invalidation, see set()
+        self.generation = 0
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._drop(key, "expired")
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, generation: Optional[int] = None):
+        """Store value; with generation (read before loading it), only if nothing was invalidated since"""
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            LOCAL_CACHE_EVICTIONS.labels(cache=self.name, reason="capacity").inc()
+        LOCAL_CACHE_ENTRIES.labels(cache=self.name).set(len(self._entries))
+
+    def invalidate(self, *keys):
+        self.generation += 1
+        for key in keys:
+            self._drop(key, "invalidated")
+
+    def clear(self):
+        self.generation += 1
+        LOCAL_CACHE_EVICTIONS.labels(cache=self.name, reason="invalidated").inc(len(self._entries))
+        self._entries.clear()
+        LOCAL_CACHE_ENTRIES.labels(cache=self.name).set(0)
+
+    def _drop(self, key, reason: str):
+        if self._entries.pop(key, None) is not None:
+            LOCAL_CACHE_EVICTIONS.labels(cache=self.name, reason=reason).inc()
+            LOCAL_CACHE_ENTRIES.labels(cache=self.name).set(len(self._entries))
+
+
+# One per cache name, shared by the ReadThroughCache instances of this process
+_local_caches: Dict[str, LocalCache] = {}
+
+
+async def listen_for_invalidations(redis_client: redis.Redis):
+    """Drop entries other workers invalidated from this process's local caches (run as a task)"""
+    while True:
+        try:
+            async with redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Messages published while unsubscribed are lost: start from empty caches
+                for local in _local_caches.values():
+                    local.clear()
+                async for message in pubsub.listen():
+                    payload = json.loads(message["data"])
+                    local = _local_caches.get(payload["cache"])
+                    if local is not None:
+                        local.invalidate(*payload["keys"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error in cache invalidation listener: {e}")
+            await asyncio.sleep(1)
+
+
+class ReadThroughCache:
+    """Redis read-through cache for JSON-serialisable values.
+
+    Entries live for `ttl` seconds plus up to `jitter` of that at random,
+    so entries written together do not expire together. Misses are
+    single-flight: callers in one process share one load, and across
+    processes a short Redis lock lets one load while the others wait for
+    its result. A None result is cached for `negative_ttl` seconds.
+    invalidate() drops an entry and bumps its generation, so a load that
+    started before the invalidation does not write its stale result back.
+
+    With local_entries > 0, up to that many values are also kept in process
+    memory (LocalCache) for local_seconds, skipping Redis altogether.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        name: str,
+        ttl: int,
+        negative_ttl: int,
+        jitter: float = 0.1,
+        lock_seconds: float = 5.0,
+        wait_seconds: float = 2.0,
+        poll_seconds: float = 0.05,
+        local_entries: int = 0,
+        local_seconds: float = 5.0
+    ):
+        self.redis_client = redis_client
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.jitter = jitter
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self._store_script = redis_client.register_script(STORE_IF_CURRENT_SCRIPT)
+        self._release_script = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        self.local = None
+        if local_entries > 0:
+            self.local = _local_caches.setdefault(name, LocalCache(name, local_entries, local_seconds))
+
+    def _key(self, key: str) -> str:
+        return f"cache:{self.name}:{key}"
+
+    @staticmethod
+    def _decode(raw) -> Optional[Any]:
+        raw = raw.decode() if isinstance(raw, bytes) else raw
+        return None if raw == NEGATIVE_ENTRY else json.loads(raw)
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """Cached value for key, calling loader (once per key at a time) when it is missing"""
+        if self.local is None:
+            return await self._get(key, loader)
+
+        value = self.local.get(key)
+        if value is not MISSING:
+            CACHE_REQUESTS.labels(cache=self.name, outcome="local_hit").inc()
+            return value
+        generation = self.local.generation
+        value = await self._get(key, loader)
+        self.local.set(key, value, generation)
+        return value
+
+    async def _get(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        raw = await self.redis_client.get(self._key(key))
+        if raw is not None:
+            value = self._decode(raw)
+            CACHE_REQUESTS.labels(cache=self.name, outcome="hit" if value is not None else "negative_hit").inc()
+            return value
+
+        in_flight = _in_flight.get(self._key(key))
+        if in_flight is not None:
+            CACHE_REQUESTS.labels(cache=self.name, outcome="coalesced").inc()
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        _in_flight[self._key(key)] = future
+        try:
+            value = await self._load(key, loader)
+            future.set_result(value)
+            return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Retrieved here so an unawaited failure is not reported as never retrieved
+            future.exception()
+            raise
+        finally:
+            _in_flight.pop(self._key(key), None)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        entry_key = self._key(key)
+        lock_key, token = f"{entry_key}:lock", uuid.uuid4().hex
+        if not await self.redis_client.set(lock_key, token, nx=True, px=int(self.lock_seconds * 1000)):
+            # Another process is loading it: wait for its result
+            deadline = time.monotonic() + self.wait_seconds
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_seconds)
+                raw = await self.redis_client.get(entry_key)
+                if raw is not None:
+                    CACHE_REQUESTS.labels(cache=self.name, outcome="waited").inc()
+                    return self._decode(raw)
+            # The loader is slow or gone; load without caching rather than fail
+            CACHE_REQUESTS.labels(cache=self.name, outcome="wait_timeout").inc()
+            return await loader()
+
+        CACHE_REQUESTS.labels(cache=self.name, outcome="miss").inc()
+        try:
+            generation = await self.redis_client.get(f"{entry_key}:gen") or b"0"
+            started = time.monotonic()
+            value = await loader()
+            CACHE_LOAD_SECONDS.labels(cache=self.name).observe(time.monotonic() - started)
+
+            if value is None:
+                raw, ttl = NEGATIVE_ENTRY, self.negative_ttl
+            else:
+                raw, ttl = json.dumps(value), self.ttl * (1 + random.uniform(0, self.jitter))
+            await self._store_script(
+                keys=[entry_key, f"{entry_key}:gen"],
+                args=[generation, raw, int(ttl * 1000)]
+            )
+            return value
+        finally:
+            await self._release_script(keys=[lock_key], args=[token])
+
+    async def invalidate(self, *keys: str):
+        """Drop entries (including cached misses) and fence off loads already in progress"""
+        if not keys:
+            return
+        if self.local is not None:
+            self.local.invalidate(*keys)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            for key in keys:
+                pipe.delete(self._key(key))
+                pipe.incr(f"{self._key(key)}:gen")
+                # Only has to outlive loads in progress
+                pipe.expire(f"{self._key(key)}:gen", self.ttl)
+            if self.local is not None:
+                pipe.publish(INVALIDATION_CHANNEL, json.dumps({"cache": self.name, "keys": list(keys)}))
+            await pipe.execute()
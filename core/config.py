@@ -8,8 +8,72 @@ class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7
     ALGORITHM: str = "HS256"
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
     REDIS_URL: str = os.getenv("REDIS_URL", "")
+    REDIS_MAX_CONNECTIONS: int = 100
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_SOCKET_TIMEOUT: float = 2.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
     ELASTICSEARCH_URL: str = os.getenv("ELASTICSEARCH_URL", "")
+    ALLOCATOR_REFRESH_SECONDS: float = 5.0
+    ALLOCATOR_MAX_SHOWS: int = 1000
+    BOOKING_EXPIRY_BATCH_SIZE: int = 200
+    BOOKING_EXPIRY_SWEEP_SECONDS: float = 1.0
+    BOOKING_EXPIRY_RECONCILE_SECONDS: int = 900
+    BOOKING_CLEANUP_CHUNK_SIZE: int = 1000
+    AVAILABILITY_FLUSH_SECONDS: float = 2.0
+    AVAILABILITY_FLUSH_BATCH_SIZE: int = 500
+    AVAILABILITY_COUNTER_TTL_SECONDS: int = 300
+    KAFKA_LINGER_MS: int = 20
+    KAFKA_BATCH_SIZE: int = 65536
+    KAFKA_COMPRESSION_TYPE: str = "lz4"
+    KAFKA_BUFFER_MEMORY: int = 33554432
+    KAFKA_MAX_BLOCK_MS: int = 1000
+    KAFKA_MAX_PENDING: int = 10000
+    KAFKA_SHUTDOWN_FLUSH_SECONDS: float = 10.0
+    OUTBOX_RELAY_BATCH_SIZE: int = 500
+    OUTBOX_RELAY_POLL_SECONDS: float = 0.5
+    BOOKING_CONSUMER_WORKERS: int = 8
+    BOOKING_CONSUMER_MAX_POLL_RECORDS: int = 200
+    BOOKING_CONSUMER_MAX_ATTEMPTS: int = 3
+    BOOKING_CONSUMER_DEDUP_TTL: int = 86400
+    BOOKING_NOTIFICATION_WINDOW_SECONDS: float = 5.0
+    BOOKING_NOTIFICATION_MAX_BUFFERED: int = 5000
+    SEARCH_BACKEND: str = "elasticsearch"
+    SHOW_SEARCH_CACHE_SECONDS: int = 30
+    SHOW_SEARCH_MAX_SIZE: int = 100
+    AUTOCOMPLETE_MAX_SIZE: int = 10
+    AUTOCOMPLETE_CACHE_SIZE: int = 10000
+    AUTOCOMPLETE_CACHE_SECONDS: float = 10.0
+    SHOWS_INDEX_BULK_SIZE: int = 500
+    SHOWS_INDEX_FLUSH_SECONDS: float = 1.0
+    TICKET_PROJECTION_BATCH_SIZE: int = 1000
+    TICKET_PROJECTION_FLUSH_SECONDS: float = 1.0
+    NOTIFIER_BACKEND: str = "console"
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 1025
+    SMTP_SENDER: str = "tickets@example.com"
+    SMTP_USERNAME: str = ""
+    SMTP_PASSWORD: str = ""
+    SMTP_STARTTLS: bool = False
+    SHOW_CACHE_TTL_SECONDS: int = 300
+    SHOW_CACHE_TTL_JITTER: float = 0.1
+    SHOW_CACHE_NEGATIVE_TTL_SECONDS: int = 30
+    LOCAL_CACHE_ENABLED: bool = True
+    SHOW_CACHE_LOCAL_ENTRIES: int = 1000
+    SHOW_CACHE_LOCAL_SECONDS: float = 5.0
+    OFFSET_PAGINATION_ENABLED: bool = True
+    COUNT_CACHE_SECONDS: int = 30
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_IN_FLIGHT_SECONDS: int = 30
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    WAITING_ROOM_TOKEN_TTL: int = 300
+    WAITING_ROOM_TICK_SECONDS: float = 1.0
+    WAITING_ROOM_GATED_CACHE_SECONDS: float = 2.0
+    WAITING_ROOM_DEFAULT_ADMIT_PER_SECOND: float = 50.0
 
 
 settings = Settings()
@@ -1,21 +1,69 @@
-from sqlalchemy import create_engine
+from pathlib import Path
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, Session
 from core.config import settings
 from sqlalchemy.orm import declarative_base
 
 DATABASE_URL = settings.DATABASE_URL
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or (
+    make_url(DATABASE_URL).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    if DATABASE_URL else ""
+)
 
+# Sync engine: only used for startup work (migrations, seeding)
 engine = create_engine(DATABASE_URL, echo=True, future=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: used by every request handler and background task
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+# Arbitrary pg_advisory_lock key so concurrently starting workers migrate one at a time
+MIGRATION_LOCK_KEY = 7_242_019
+
+def run_migrations():
+    """Upgrade the schema to the latest Alembic revision"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    with engine.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        connection.commit()
+        try:
+            config.attributes["connection"] = connection
+            tables = inspect(connection).get_table_names()
+            # Inspecting autobegins a transaction; left open, Alembic would run inside it as an
+            # external transaction and could not leave it for autocommit_block()
+            connection.commit()
+            if "alembic_version" not in tables and "shows" in tables:
+                # Database created by create_all before migrations existed
+                command.stamp(config, "0001_initial_schema")
+            command.upgrade(config, "head")
+            connection.commit()
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
+
 def seed_roles():
     """Seed the roles table with default data (admin, client)"""
     from models.user import Role
@@ -1,5 +1,19 @@
-from elasticsearch import Elasticsearch
+import os
+from elasticsearch import AsyncElasticsearch, Elasticsearch
 from core.config import settings
+from core.elasticsearch_memory import InMemoryElasticsearch
 
 ELASTICSEARCH_URL = settings.ELASTICSEARCH_URL
+ELASTICSEARCH_SHOWS_INDEX = os.getenv("ELASTICSEARCH_SHOWS_INDEX", "shows")
 es_client = Elasticsearch(ELASTICSEARCH_URL)
+
+# Query-side client for the API; SEARCH_BACKEND=memory swaps in a local double
+if settings.SEARCH_BACKEND == "memory":
+    async_es_client = InMemoryElasticsearch()
+else:
+    async_es_client = AsyncElasticsearch(ELASTICSEARCH_URL)
+
+
+def get_search_client():
+    """FastAPI dependency returning the shared async Elasticsearch client"""
+    return async_es_client
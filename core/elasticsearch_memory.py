@@ -0,0 +1,138 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+def _tokens(text) -> List[str]:
+    return re.findall(r"\w+", str(text or "").lower())
+
+
+def _as_datetime(value) -> datetime:
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+class InMemoryElasticsearch:
+    """Stand-in for AsyncElasticsearch with SEARCH_BACKEND=memory.
+
+    Keeps documents in a dict and understands the subset of the query DSL
+    that ShowSearchDAO sends: a bool query of multi_match/match clauses and
+    range filters, field sorts with _score, search_after, and completion
+    suggesters (plain prefix match on the inputs). Scores count
+    matched query terms, weighted by field boost. Lets the search endpoints
+    run without an Elasticsearch cluster; not for production.
+    """
+
+    def __init__(self):
+        self.indices: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    async def index(self, index: str, id, document: Dict[str, Any], **kwargs):
+        self.indices.setdefault(index, {})[str(id)] = dict(document)
+        return {"_index": index, "_id": str(id), "result": "created"}
+
+    async def delete(self, index: str, id, **kwargs):
+        self.indices.get(index, {}).pop(str(id), None)
+        return {"_index": index, "_id": str(id), "result": "deleted"}
+
+    async def close(self):
+        pass
+
+    def _match_score(self, doc: Dict[str, Any], clause: Dict[str, Any]) -> Optional[float]:
+        """Score of a multi_match/match clause (operator "and"), None if it does not match"""
+        if "multi_match" in clause:
+            spec = clause["multi_match"]
+            fields, query = spec["fields"], spec["query"]
+        else:
+            (field, spec), = clause["match"].items()
+            spec = spec if isinstance(spec, dict) else {"query": spec}
+            fields, query = [field], spec["query"]
+
+        score = 0.0
+        for term in _tokens(query):
+            term_score = 0.0
+            for field in fields:
+                name, _, boost = field.partition("^")
+                if term in _tokens(doc.get(name)):
+                    term_score += float(boost or 1)
+            if not term_score:
+                return None
+            score += term_score
+        return score
+
+    @staticmethod
+    def _in_range(doc: Dict[str, Any], clause: Dict[str, Any]) -> bool:
+        (field, bounds), = clause["range"].items()
+        if doc.get(field) is None:
+            return False
+        parse = float if isinstance(doc[field], (int, float)) else _as_datetime
+        value = parse(doc[field])
+        checks = {"gte": value.__ge__, "gt": value.__gt__, "lte": value.__le__, "lt": value.__lt__}
+        return all(checks[op](parse(bound)) for op, bound in bounds.items())
+
+    async def search(self, index: str, query: Optional[Dict[str, Any]] = None, sort=None, size: int = 10,
+                     search_after=None, suggest: Optional[Dict[str, Any]] = None, **kwargs):
+        if suggest:
+            return {"hits": {"hits": []}, "suggest": {
+                name: [self._complete(index, spec["prefix"], spec["completion"])] for name, spec in suggest.items()
+            }}
+        clauses = (query or {}).get("bool", {})
+        hits = []
+        for doc_id, doc in self.indices.get(index, {}).items():
+            score = 0.0
+            matched = True
+            for clause in clauses.get("must", []) + clauses.get("filter", []):
+                if "range" in clause:
+                    matched = self._in_range(doc, clause)
+                else:
+                    clause_score = self._match_score(doc, clause)
+                    matched = clause_score is not None
+                    if matched and clause in clauses.get("must", []):
+                        score += clause_score
+                if not matched:
+                    break
+            if matched:
+                hits.append({"_index": index, "_id": doc_id, "_score": score, "_source": doc})
+
+        sort = sort or [{"_score": "desc"}]
+        for spec in reversed(sort):
+            (field, order), = spec.items()
+            hits.sort(key=lambda hit: hit["_score"] if field == "_score" else hit["_source"].get(field),
+                      reverse=order == "desc")
+        for hit in hits:
+            hit["sort"] = [
+                hit["_score"] if field == "_score" else self._sort_value(hit["_source"].get(field))
+                for field in (next(iter(spec)) for spec in sort)
+            ]
+
+        if search_after is not None:
+            hits = [hit for hit in hits if self._after(hit["sort"], search_after, sort)]
+        return {"hits": {"total": {"value": len(hits), "relation": "eq"}, "hits": hits[:size]}}
+
+    def _complete(self, index: str, prefix: str, completion: Dict[str, Any]) -> Dict[str, Any]:
+        """Completion suggester: documents with an input starting with prefix, case-insensitively"""
+        options = []
+        for doc_id, doc in self.indices.get(index, {}).items():
+            inputs = (doc.get(completion["field"]) or {}).get("input", [])
+            matched = next((text for text in inputs if text.lower().startswith(prefix.lower())), None)
+            if matched is not None:
+                options.append({"text": matched, "_index": index, "_id": doc_id, "_score": 1.0, "_source": doc})
+        options.sort(key=lambda option: option["text"].lower())
+        return {"text": prefix, "offset": 0, "length": len(prefix), "options": options[:completion.get("size", 5)]}
+
+    @staticmethod
+    def _sort_value(value):
+        # Elasticsearch reports date sort values as epoch milliseconds
+        if isinstance(value, str):
+            try:
+                return int(_as_datetime(value).timestamp() * 1000)
+            except ValueError:
+                return value
+        return value
+
+    @staticmethod
+    def _after(values: List[Any], search_after: List[Any], sort) -> bool:
+        for value, after, spec in zip(values, search_after, sort):
+            if value == after:
+                continue
+            descending = next(iter(spec.values())) == "desc"
+            return value < after if descending else value > after
+        return False
@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import Select, func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque cursor over the sort key values of the last item of a page"""
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Sort key values from a cursor; ValueError if the cursor is malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _column_value(column, value):
+    if value is not None and column.type.python_type is datetime:
+        return datetime.fromisoformat(value)
+    return value
+
+
+async def keyset_page(
+    db: AsyncSession,
+    query: Select,
+    columns: Sequence[Any],
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = False
+) -> Tuple[list, Optional[str]]:
+    """One page of query ordered by columns (the last must be unique, e.g. id).
+
+    Seeks past the cursor with a row comparison instead of OFFSET, so every
+    page costs the same however deep it is. Returns the items and the cursor
+    of the next page (None on the last page).
+    """
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise ValueError("Invalid cursor")
+        try:
+            values = [_column_value(column, value) for column, value in zip(columns, values)]
+        except (TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor") from exc
+        key, after = tuple_(*columns), tuple_(*values)
+        query = query.where(key < after if descending else key > after)
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    # One extra row tells whether there is a next page without a COUNT
+    result = await db.execute(query.order_by(*order).limit(limit + 1))
+    items = list(result.scalars().all())
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor([getattr(items[-1], column.key) for column in columns])
+
+
+async def estimated_count(db: AsyncSession, model) -> int:
+    """Planner row estimate for a whole table (pg_class.reltuples), exact only while never analyzed"""
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": model.__tablename__}
+    )
+    estimate = result.scalar()
+    if estimate is None or estimate < 0:
+        result = await db.execute(select(func.count()).select_from(model))
+        return result.scalar_one()
+    return estimate
+
+
+def require_offset_pagination():
+    """Reject page/skip parameters once offset pagination has been switched off"""
+    if not settings.OFFSET_PAGINATION_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Offset pagination is disabled; use cursor"
+        )
@@ -1,5 +1,87 @@
+import time
+from typing import Optional
 import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from prometheus_client import Counter, Gauge, Histogram
 from core.config import settings
 
 REDIS_URL = settings.REDIS_URL
-redis_client = redis.from_url(REDIS_URL)
+
+# Pool metrics
+REDIS_POOL_MAX_CONNECTIONS = Gauge(
+    'redis_pool_max_connections', 'Upper bound of the shared Redis connection pool')
+REDIS_POOL_IN_USE = Gauge(
+    'redis_pool_connections_in_use', 'Redis connections currently checked out')
+REDIS_POOL_IDLE = Gauge(
+    'redis_pool_connections_idle', 'Redis connections open and waiting in the pool')
+REDIS_POOL_WAIT_SECONDS = Histogram(
+    'redis_pool_wait_seconds', 'Time spent waiting to check out a Redis connection',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5))
+REDIS_POOL_CHECKOUT_ERRORS = Counter(
+    'redis_pool_checkout_errors_total', 'Checkouts that failed because the pool was saturated or unreachable')
+
+
+class InstrumentedBlockingConnectionPool(redis.BlockingConnectionPool):
+    """Bounded pool that waits for a free connection and records saturation"""
+
+    async def get_connection(self, command_name, *keys, **options):
+        started = time.perf_counter()
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        except RedisConnectionError:
+            REDIS_POOL_CHECKOUT_ERRORS.inc()
+            raise
+        finally:
+            REDIS_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
+_pool: Optional[InstrumentedBlockingConnectionPool] = None
+_redis_client: Optional[redis.Redis] = None
+
+
+def _register_pool_gauges(pool: InstrumentedBlockingConnectionPool):
+    REDIS_POOL_MAX_CONNECTIONS.set(pool.max_connections)
+    REDIS_POOL_IN_USE.set_function(
+        lambda: len(getattr(pool, "_in_use_connections", ())))
+    REDIS_POOL_IDLE.set_function(
+        lambda: len(getattr(pool, "_available_connections", ())))
+
+
+async def init_redis() -> redis.Redis:
+    """Create the process-wide Redis pool and client (called from main.lifespan)"""
+    global _pool, _redis_client
+    if _redis_client is not None:
+        return _redis_client
+
+    _pool = InstrumentedBlockingConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        socket_keepalive=True,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        retry_on_timeout=True,
+    )
+    _register_pool_gauges(_pool)
+    _redis_client = redis.Redis(connection_pool=_pool)
+    await _redis_client.ping()
+    return _redis_client
+
+
+async def close_redis():
+    """Close the shared Redis client and disconnect every pooled connection"""
+    global _pool, _redis_client
+    if _redis_client is not None:
+        await _redis_client.aclose()
+    if _pool is not None:
+        await _pool.disconnect()
+    _pool = None
+    _redis_client = None
+
+
+def get_redis() -> redis.Redis:
+    """FastAPI dependency returning the shared Redis client"""
+    if _redis_client is None:
+        raise RuntimeError("Redis client is not initialised; init_redis() must run in the app lifespan")
+    return _redis_client
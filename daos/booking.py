@@ -1,108 +1,382 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, func, update, insert, values, column, literal, cast, or_, Integer, BigInteger, DateTime, String
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, aliased
 from models.booking import Booking, BookingStatus
 from models.ticket import Ticket, TicketStatus
 from models.show import Show
 from models.user import User
+from models.outbox import OutboxEvent
 from schemas.booking import BookingCreate
-from typing import List, Optional
-from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 import redis.asyncio as redis
 import json
-import os
+import uuid
+from prometheus_client import Counter, Histogram
 from services.booking_kafka import booking_producer
+from daos.seat_inventory import SeatInventoryDAO, SeatState, SEAT_INDEX_KEY, LOCATE_SEAT_LUA, fence_key
+from daos.show_availability import ShowAvailabilityDAO
+from services.seat_allocator import seat_allocator
+from core.pagination import keyset_page
+
+# All-or-nothing hold over N tickets. KEYS[1..n] are lock keys, KEYS[n+1..2n]
+# the matching fencing counters and KEYS[2n+1] the seat index. ARGV = user id,
+# TTL, then the ticket ids. Seats the inventory already knows are sold or
+# removed are rejected with {-1, <index>} before any lock is looked at.
+# ARGV may continue with each ticket's fence_token from Postgres: counters
+# are then raised to at least that before they are incremented. Without
+# them, {2} is returned when a counter is missing (lost with a Redis flush or
+# failover), since starting again from 1 would never pass the fence_token
+# check in create_bookings; the caller retries with the tokens.
+# Returns {1, {token, ...}} when every lock was taken (and the seats marked
+# held), or {0, <index>, <current lock value>} for the first ticket that is
+# already held, in which case nothing is written.
+HOLD_TICKETS_SCRIPT = LOCATE_SEAT_LUA + """
+local n = (#KEYS - 1) / 2
+local seats = {}
+for i = 1, n do
+    local seatmap, ordinal = locate_seat(KEYS[2 * n + 1], ARGV[2 + i])
+    if seatmap then
+        if redis.call('BITFIELD', seatmap, 'GET', 'u2', ordinal)[1] >= 2 then
+            return {-1, i}
+        end
+        seats[i] = {seatmap, ordinal}
+    end
+end
+for i = 1, n do
+    local current = redis.call('GET', KEYS[i])
+    if current then
+        return {0, i, current}
+    end
+end
+local floors = #ARGV >= 2 + 2 * n
+for i = 1, n do
+    if floors then
+        local floor = tonumber(ARGV[2 + n + i])
+        if tonumber(redis.call('GET', KEYS[n + i]) or '-1') < floor then
+            redis.call('SET', KEYS[n + i], floor)
+        end
+    elseif redis.call('EXISTS', KEYS[n + i]) == 0 then
+        return {2}
+    end
+end
+local tokens = {}
+for i = 1, n do
+    local token = redis.call('INCR', KEYS[n + i])
+    redis.call('SET', KEYS[i], ARGV[1] .. ':' .. token, 'EX', ARGV[2])
+    tokens[i] = token
+    if seats[i] then
+        redis.call('BITFIELD', seats[i][1], 'SET', 'u2', seats[i][2], 1)
+    end
+end
+return {1, tokens}
+"""
+
+# Compare-and-delete over N locks. KEYS[1..n] are lock keys and KEYS[n+1] the
+# seat index; ARGV[1..n] are the expected lock values and ARGV[n+1..2n] the
+# ticket ids. A seat still marked held goes back to available when its lock
+# was ours or has already expired, never when someone else now holds it.
+RELEASE_TICKETS_SCRIPT = LOCATE_SEAT_LUA + """
+local n = #KEYS - 1
+local released = 0
+for i = 1, n do
+    local current = redis.call('GET', KEYS[i])
+    if current == ARGV[i] then
+        released = released + redis.call('DEL', KEYS[i])
+    end
+    if current == ARGV[i] or not current then
+        local seatmap, ordinal = locate_seat(KEYS[n + 1], ARGV[n + i])
+        if seatmap and redis.call('BITFIELD', seatmap, 'GET', 'u2', ordinal)[1] == 1 then
+            redis.call('BITFIELD', seatmap, 'SET', 'u2', ordinal, 0)
+        end
+    end
+end
+return released
+"""
+
+
+BOOKINGS_EXPIRED = Counter(
+    'bookings_expired_total', 'Reserved bookings moved to expired', ['source'])
+BOOKING_CLEANUP_ROWS = Histogram(
+    'booking_cleanup_rows_per_run', 'Bookings expired by one full cleanup run',
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000))
+
+# Sorted set of reserved booking ids scored by their expires_at (epoch seconds)
+BOOKING_EXPIRY_KEY = "booking_expiry"
+
+# Atomically pop up to ARGV[2] members of KEYS[1] whose score is <= ARGV[1]
+POP_DUE_BOOKINGS_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+"""
+
+
+class TicketHold(NamedTuple):
+    acquired: bool
+    owner_id: Optional[int]
+    fence_token: Optional[int]
+    unavailable: bool = False
+
+
+class TicketBatchHold(NamedTuple):
+    acquired: bool
+    owner_id: Optional[int]
+    conflict_ticket_id: Optional[int]
+    fence_tokens: List[int]
+    unavailable: bool = False
+
 
 class BookingDAO:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession, redis_client: redis.Redis):
         self.db = db
-        # Initialize Redis connection
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-        self.redis_client = redis.from_url(redis_url)
+        # Shared, pooled client owned by main.lifespan
+        self.redis_client = redis_client
         self.booking_ttl = 600  # 10 minutes in seconds
+        # Registered scripts run via EVALSHA (falling back to EVAL once per server)
+        self._hold_script = redis_client.register_script(HOLD_TICKETS_SCRIPT)
+        self._release_script = redis_client.register_script(RELEASE_TICKETS_SCRIPT)
+        self._pop_due_script = redis_client.register_script(POP_DUE_BOOKINGS_SCRIPT)
+        self.inventory = SeatInventoryDAO(redis_client)
+        self.availability = ShowAvailabilityDAO(redis_client)
+
+    async def hold_ticket(self, ticket_id: int, user_id: int) -> TicketHold:
+        """Check and acquire the ticket lock in one round trip, issuing a fencing token"""
+        hold = await self.hold_tickets([ticket_id], user_id)
+        fence_token = hold.fence_tokens[0] if hold.acquired else None
+        return TicketHold(hold.acquired, hold.owner_id, fence_token, hold.unavailable)
 
-    async def acquire_ticket_lock(self, ticket_id: int, user_id: int) -> bool:
-        """Acquire a distributed lock for a ticket using Redis"""
-        lock_key = f"ticket_lock:{ticket_id}"
+    async def hold_tickets(self, ticket_ids: List[int], user_id: int) -> TicketBatchHold:
+        """Acquire the locks for every ticket or none of them in one round trip"""
+        keys = [self._lock_key(t) for t in ticket_ids] + [self._fence_key(t) for t in ticket_ids]
+        keys.append(SEAT_INDEX_KEY)
+        result = await self._hold_script(keys=keys, args=[user_id, self.booking_ttl, *ticket_ids])
+        if int(result[0]) == 2:
+            # A fencing counter is missing: seed it from the newest token Postgres has seen
+            tokens = await self._db_fence_tokens(ticket_ids)
+            result = await self._hold_script(
+                keys=keys,
+                args=[user_id, self.booking_ttl, *ticket_ids, *[tokens.get(t, 0) for t in ticket_ids]]
+            )
         
-        # Try to set the lock with TTL
-        result = await self.redis_client.set(
-            lock_key, 
-            str(user_id), 
-            nx=True,  # Only set if key doesn't exist
-            ex=self.booking_ttl  # Expire after TTL seconds
-        )
+        if int(result[0]) == 1:
+            seat_allocator.mark_held(ticket_ids)
+            return TicketBatchHold(True, user_id, None, [int(t) for t in result[1]])
+        
+        if int(result[0]) == -1:
+            # Sold or removed according to the seat inventory; the DB is never touched
+            conflict_ticket_id = ticket_ids[int(result[1]) - 1]
+            seat_allocator.mark_sold([conflict_ticket_id])
+            return TicketBatchHold(False, None, conflict_ticket_id, [], unavailable=True)
         
-        return result is not None
+        owner_id, _ = self._parse_lock_value(result[2])
+        return TicketBatchHold(False, owner_id, ticket_ids[int(result[1]) - 1], [])
 
-    async def release_ticket_lock(self, ticket_id: int) -> bool:
-        """Release the distributed lock for a ticket"""
-        lock_key = f"ticket_lock:{ticket_id}"
-        result = await self.redis_client.delete(lock_key)
-        return result > 0
+    async def release_ticket_lock(self, ticket_id: int, user_id: int, fence_token: Optional[int]) -> bool:
+        """Release the ticket lock only if it is still held with the given fencing token"""
+        if fence_token is None:
+            return False
+        return await self.release_ticket_locks([ticket_id], user_id, [fence_token]) > 0
+
+    async def release_ticket_locks(self, ticket_ids: List[int], user_id: int, fence_tokens: List[int]) -> int:
+        """Compare-and-delete the locks for several tickets and free their seats in one round trip"""
+        return await self.release_holds([
+            (ticket_id, user_id, fence_token)
+            for ticket_id, fence_token in zip(ticket_ids, fence_tokens)
+        ])
+
+    async def release_holds(self, holds: List[Tuple[int, int, Optional[int]]]) -> int:
+        """Release (ticket_id, user_id, fence_token) holds of any owners in one round trip"""
+        holds = [hold for hold in holds if hold[2] is not None]
+        if not holds:
+            return 0
+        ticket_ids = [ticket_id for ticket_id, _, _ in holds]
+        result = await self._release_script(
+            keys=[self._lock_key(t) for t in ticket_ids] + [SEAT_INDEX_KEY],
+            args=[f"{user_id}:{token}" for _, user_id, token in holds] + ticket_ids
+        )
+        seat_allocator.mark_released(ticket_ids)
+        return int(result)
 
     async def get_ticket_lock_owner(self, ticket_id: int) -> Optional[int]:
         """Get the user ID who currently holds the lock for a ticket"""
-        lock_key = f"ticket_lock:{ticket_id}"
-        result = await self.redis_client.get(lock_key)
-        if result:
-            try:
-                return int(result.decode('utf-8'))
-            except (ValueError, UnicodeDecodeError):
-                return None
-        return None
-
-    def create_booking(self, booking_data: BookingCreate, user_id: int) -> Optional[Booking]:
-        """Create a new booking"""
-        # Check if ticket exists and is available
-        ticket = self.db.query(Ticket).filter(
-            Ticket.id == booking_data.ticket_id,
-            Ticket.status == TicketStatus.available
-        ).first()
-        
-        if not ticket:
+        result = await self.redis_client.get(self._lock_key(ticket_id))
+        owner_id, _ = self._parse_lock_value(result)
+        return owner_id
+
+    @staticmethod
+    def _lock_key(ticket_id: int) -> str:
+        return f"ticket_lock:{ticket_id}"
+
+    @staticmethod
+    def _fence_key(ticket_id: int) -> str:
+        return fence_key(ticket_id)
+
+    async def _db_fence_tokens(self, ticket_ids: List[int]) -> Dict[int, int]:
+        result = await self.db.execute(select(Ticket.id, Ticket.fence_token).where(Ticket.id.in_(ticket_ids)))
+        return {ticket_id: fence_token for ticket_id, fence_token in result.all()}
+
+    @staticmethod
+    def _parse_lock_value(value) -> Tuple[Optional[int], Optional[int]]:
+        """Split a "<user_id>:<fence_token>" lock value"""
+        if not value:
+            return None, None
+        try:
+            if isinstance(value, bytes):
+                value = value.decode('utf-8')
+            owner, _, token = value.partition(":")
+            return int(owner), int(token) if token else None
+        except (ValueError, UnicodeDecodeError):
+            return None, None
+
+    async def create_booking(self, booking_data: BookingCreate, user_id: int, fence_token: int) -> Optional[Booking]:
+        """Create a new booking, rejecting holds whose fencing token is stale"""
+        bookings = await self.create_bookings([booking_data.ticket_id], user_id, [fence_token])
+        return bookings[0] if bookings else None
+
+    async def create_bookings(
+        self,
+        ticket_ids: List[int],
+        user_id: int,
+        fence_tokens: List[int],
+        group_id: Optional[str] = None
+    ) -> Optional[List[Booking]]:
+        """Create one booking per ticket in a single statement, all or nothing"""
+        holds = values(
+            column("id", Integer),
+            column("fence_token", BigInteger),
+            name="holds"
+        ).data(list(zip(ticket_ids, fence_tokens)))
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.booking_ttl)
+        
+        # Reserve each ticket and stamp it with its hold's token; this only
+        # matches while the ticket is available and no newer hold has written to it
+        reserved = (
+            update(Ticket)
+            .where(
+                Ticket.id == holds.c.id,
+                Ticket.status == TicketStatus.available,
+                Ticket.fence_token < holds.c.fence_token
+            )
+            .values(status=TicketStatus.reserved, fence_token=holds.c.fence_token)
+            .returning(Ticket.id, Ticket.show_id, Ticket.fence_token)
+            .cte("reserved")
+        )
+        inserted = (
+            insert(Booking)
+            .from_select(
+                ["user_id", "ticket_id", "status", "created_at", "expires_at", "lock_token", "group_id"],
+                select(
+                    literal(user_id, Integer),
+                    reserved.c.id,
+                    cast(literal(BookingStatus.reserved.value), Booking.__table__.c.status.type),
+                    literal(now, DateTime),
+                    literal(expires_at, DateTime),
+                    reserved.c.fence_token,
+                    literal(group_id, String)
+                )
+            )
+            .returning(*Booking.__table__.c)
+            .cte("inserted")
+        )
+        booking_row = aliased(Booking, inserted)
+        result = await self.db.execute(
+            select(booking_row, reserved.c.show_id)
+            .join(reserved, reserved.c.id == booking_row.ticket_id)
+            .order_by(booking_row.id)
+        )
+        rows = result.all()
+        
+        if len(rows) != len(ticket_ids):
+            await self.db.rollback()
             return None
         
-        # Calculate expiration time
-        expires_at = datetime.utcnow() + timedelta(seconds=self.booking_ttl)
+        bookings = [row[0] for row in rows]
+        user = await self.db.get(User, user_id)
+        if group_id:
+            self._stage_booking_group_event("booking_group_created", group_id, bookings, user)
+        else:
+            for booking in bookings:
+                self._stage_booking_event("booking_created", booking, user)
+        await self.db.commit()
         
-        # Create booking
-        booking = Booking(
-            user_id=user_id,
-            ticket_id=booking_data.ticket_id,
-            status=BookingStatus.reserved,
-            expires_at=expires_at
+        # Schedule each hold for expiry
+        await self.redis_client.zadd(
+            BOOKING_EXPIRY_KEY,
+            {booking.id: self._epoch(booking.expires_at) for booking in bookings}
         )
+        await self.availability.taken(row.show_id for row in rows)
+        await self.redis_client.delete(self._count_key(user_id))
         
-        self.db.add(booking)
-        self.db.commit()
-        self.db.refresh(booking)
-        
-        return booking
+        return bookings
 
-    def get_booking_by_id(self, booking_id: int, user_id: int) -> Optional[Booking]:
+    async def get_booking_by_id(self, booking_id: int, user_id: int) -> Optional[Booking]:
         """Get a booking by ID for a specific user"""
-        return self.db.query(Booking).filter(
-            Booking.id == booking_id,
-            Booking.user_id == user_id
-        ).first()
+        result = await self.db.execute(
+            select(Booking).where(
+                Booking.id == booking_id,
+                Booking.user_id == user_id
+            )
+        )
+        return result.scalars().first()
 
-    def get_booking_with_details(self, booking_id: int, user_id: int) -> Optional[Booking]:
+    async def get_booking_with_details(self, booking_id: int, user_id: int) -> Optional[Booking]:
         """Get a booking with related ticket and show details"""
-        return self.db.query(Booking).options(
-            joinedload(Booking.ticket).joinedload(Ticket.show)
-        ).filter(
-            Booking.id == booking_id,
-            Booking.user_id == user_id
-        ).first()
-
-    def get_user_bookings(self, user_id: int, skip: int = 0, limit: int = 10) -> List[Booking]:
-        """Get all bookings for a user with pagination"""
-        return self.db.query(Booking).filter(
-            Booking.user_id == user_id
-        ).order_by(Booking.created_at.desc()).offset(skip).limit(limit).all()
-
-    def count_user_bookings(self, user_id: int) -> int:
+        result = await self.db.execute(
+            select(Booking).options(
+                joinedload(Booking.ticket).joinedload(Ticket.show)
+            ).where(
+                Booking.id == booking_id,
+                Booking.user_id == user_id
+            )
+        )
+        return result.scalars().first()
+
+    async def get_user_bookings(self, user_id: int, skip: int = 0, limit: int = 10) -> List[Booking]:
+        """Get all bookings for a user with offset pagination (compatibility path)"""
+        result = await self.db.execute(
+            select(Booking).where(
+                Booking.user_id == user_id
+            ).order_by(Booking.created_at.desc(), Booking.id.desc()).offset(skip).limit(limit)
+        )
+        return result.scalars().all()
+
+    async def get_user_bookings_page(
+        self, user_id: int, limit: int = 10, cursor: Optional[str] = None
+    ) -> Tuple[List[Booking], Optional[str]]:
+        """Get a page of a user's bookings, newest first, and the cursor of the next page"""
+        return await keyset_page(
+            self.db,
+            select(Booking).where(Booking.user_id == user_id),
+            [Booking.created_at, Booking.id],
+            limit,
+            cursor,
+            descending=True
+        )
+
+    async def count_user_bookings(self, user_id: int) -> int:
         """Count total bookings for a user"""
-        return self.db.query(Booking).filter(Booking.user_id == user_id).count()
+        result = await self.db.execute(
+            select(func.count()).select_from(Booking).where(Booking.user_id == user_id)
+        )
+        return result.scalar_one()
+
+    @staticmethod
+    def _count_key(user_id: int) -> str:
+        return f"bookings:count:{user_id}"
+
+    async def count_user_bookings_cached(self, user_id: int, ttl: int) -> int:
+        """count_user_bookings, cached in Redis for ttl seconds (dropped when the user books)"""
+        key = self._count_key(user_id)
+        cached = await self.redis_client.get(key)
+        if cached is not None:
+            return int(cached)
+        count = await self.count_user_bookings(user_id)
+        await self.redis_client.set(key, count, ex=ttl)
+        return count
 
     def _prepare_booking_data(self, booking: Booking) -> dict:
         """Prepare booking data for Kafka message"""
@@ -110,6 +384,7 @@ class BookingDAO:
             "id": booking.id,
             "user_id": booking.user_id,
             "ticket_id": booking.ticket_id,
+            "group_id": booking.group_id,
             "status": booking.status.value,
             "created_at": booking.created_at.isoformat() if booking.created_at else None,
             "confirmed_at": booking.confirmed_at.isoformat() if booking.confirmed_at else None,
@@ -125,101 +400,216 @@ class BookingDAO:
             "email": user.email
         }
 
-    def _send_booking_event(self, event_type: str, booking: Booking, user: User):
-        """Send booking event to Kafka"""
-        try:
-            booking_data = self._prepare_booking_data(booking)
-            user_data = self._prepare_user_data(user)
-            
-            booking_producer.send_booking_event(event_type, booking_data, user_data)
-        except Exception as e:
-            print(f"Failed to send booking event: {e}")
+    def _stage_booking_event(self, event_type: str, booking: Booking, user: User):
+        """Add a booking event to the outbox; it is published once the current transaction commits"""
+        self.db.add(OutboxEvent(
+            topic=booking_producer.topic,
+            key=str(booking.id),
+            event_type=event_type,
+            payload={
+                "event_id": uuid.uuid4().hex,
+                "event_type": event_type,
+                "timestamp": datetime.utcnow().isoformat(),
+                "booking": self._prepare_booking_data(booking),
+                "user": self._prepare_user_data(user)
+            }
+        ))
+
+    def _stage_booking_group_event(self, event_type: str, group_id: str, bookings: List[Booking], user: User):
+        """Add one outbox event describing a group of bookings"""
+        self.db.add(OutboxEvent(
+            topic=booking_producer.topic,
+            # Use group_id as key so the whole group lands on one partition
+            key=group_id,
+            event_type=event_type,
+            payload={
+                "event_id": uuid.uuid4().hex,
+                "event_type": event_type,
+                "timestamp": datetime.utcnow().isoformat(),
+                "group_id": group_id,
+                "bookings": [self._prepare_booking_data(booking) for booking in bookings],
+                "user": self._prepare_user_data(user)
+            }
+        ))
 
     async def confirm_booking(self, booking_id: int, user_id: int) -> Optional[Booking]:
-        """Confirm a booking"""
-        booking = self.get_booking_by_id(booking_id, user_id)
-        
-        if not booking or booking.status != BookingStatus.reserved:
-            return None
+        """Confirm a live reservation: ticket reserved -> sold and booking -> confirmed in one statement"""
+        now = datetime.utcnow()
         
-        # Check if booking has expired
-        if datetime.utcnow() > booking.expires_at:
-            booking.status = BookingStatus.expired
-            self.db.commit()
+        # Only the hold that reserved the ticket can sell it
+        sold = (
+            update(Ticket)
+            .where(
+                Booking.id == booking_id,
+                Booking.user_id == user_id,
+                Booking.status == BookingStatus.reserved,
+                Booking.expires_at > now,
+                Ticket.id == Booking.ticket_id,
+                Ticket.status == TicketStatus.reserved,
+                or_(Booking.lock_token.is_(None), Ticket.fence_token == Booking.lock_token)
+            )
+            .values(status=TicketStatus.sold, user_id=user_id)
+            .returning(Ticket.id)
+            .cte("sold")
+        )
+        result = await self.db.execute(
+            update(Booking)
+            .where(Booking.id == booking_id, Booking.ticket_id == sold.c.id)
+            .values(status=BookingStatus.confirmed, confirmed_at=now)
+            .returning(Booking)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        booking = result.scalars().first()
+        if not booking:
+            await self.db.rollback()
             return None
         
-        # Get user data for Kafka message
-        user = self.db.query(User).filter(User.id == user_id).first()
-        
-        # Update ticket status to sold
-        ticket = self.db.query(Ticket).filter(Ticket.id == booking.ticket_id).first()
-        if ticket:
-            ticket.status = TicketStatus.sold
-            ticket.user_id = user_id
-        
-        # Update booking status
-        booking.status = BookingStatus.confirmed
-        booking.confirmed_at = datetime.utcnow()
+        # The user is normally already in the session from authentication
+        user = await self.db.get(User, user_id)
+        self._stage_booking_event("booking_confirmed", booking, user)
+        await self.db.commit()
         
-        self.db.commit()
-        self.db.refresh(booking)
+        await self.redis_client.zrem(BOOKING_EXPIRY_KEY, booking.id)
         
-        # Send Kafka event
-        if user:
-            self._send_booking_event("booking_confirmed", booking, user)
+        # Mark the seat sold before the lock release below can free it
+        await self.inventory.set_states([booking.ticket_id], SeatState.sold)
+        seat_allocator.mark_sold([booking.ticket_id])
         
         # Release the Redis lock
-        await self.release_ticket_lock(booking.ticket_id)
+        await self.release_ticket_lock(booking.ticket_id, booking.user_id, booking.lock_token)
         
         return booking
 
     async def cancel_booking(self, booking_id: int, user_id: int) -> Optional[Booking]:
-        """Cancel a booking"""
-        booking = self.get_booking_by_id(booking_id, user_id)
-        
-        if not booking or booking.status != BookingStatus.reserved:
+        """Cancel a live reservation: ticket back to available and booking -> cancelled in one statement"""
+        freed = (
+            update(Ticket)
+            .where(
+                Booking.id == booking_id,
+                Booking.user_id == user_id,
+                Booking.status == BookingStatus.reserved,
+                Ticket.id == Booking.ticket_id,
+                Ticket.status == TicketStatus.reserved,
+                or_(Booking.lock_token.is_(None), Ticket.fence_token == Booking.lock_token)
+            )
+            .values(status=TicketStatus.available)
+            .returning(Ticket.id, Ticket.show_id)
+            .cte("freed")
+        )
+        result = await self.db.execute(
+            update(Booking)
+            .where(Booking.id == booking_id, Booking.ticket_id == freed.c.id)
+            .values(status=BookingStatus.cancelled, cancelled_at=datetime.utcnow())
+            .returning(Booking, freed.c.show_id)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        row = result.first()
+        if not row:
+            await self.db.rollback()
             return None
+        booking, show_id = row
         
-        # Get user data for Kafka message
-        user = self.db.query(User).filter(User.id == user_id).first()
-        
-        # Update booking status
-        booking.status = BookingStatus.cancelled
-        booking.cancelled_at = datetime.utcnow()
+        user = await self.db.get(User, user_id)
+        self._stage_booking_event("booking_cancelled", booking, user)
+        await self.db.commit()
         
-        self.db.commit()
-        self.db.refresh(booking)
-        
-        # Send Kafka event
-        if user:
-            self._send_booking_event("booking_cancelled", booking, user)
+        await self.redis_client.zrem(BOOKING_EXPIRY_KEY, booking.id)
+        await self.availability.released([show_id])
         
         # Release the Redis lock
-        await self.release_ticket_lock(booking.ticket_id)
+        await self.release_ticket_lock(booking.ticket_id, booking.user_id, booking.lock_token)
         
         return booking
 
-    def get_expired_bookings(self) -> List[Booking]:
-        """Get all expired bookings that need to be cleaned up"""
-        return self.db.query(Booking).filter(
-            Booking.status == BookingStatus.reserved,
-            Booking.expires_at < datetime.utcnow()
-        ).all()
-
-    async def cleanup_expired_bookings(self):
-        """Clean up expired bookings and release their locks"""
-        expired_bookings = self.get_expired_bookings()
-        
-        for booking in expired_bookings:
-            # Update booking status
-            booking.status = BookingStatus.expired
-            
-            # Release the Redis lock
-            await self.release_ticket_lock(booking.ticket_id)
-        
-        if expired_bookings:
-            self.db.commit()
-
-    async def close_redis_connection(self):
-        """Close Redis connection"""
-        await self.redis_client.close()
+    @staticmethod
+    def _expire_statement(*criteria):
+        """Statement expiring the reserved bookings matching criteria and freeing their tickets"""
+        expired = (
+            update(Booking)
+            .where(Booking.status == BookingStatus.reserved, *criteria)
+            .values(status=BookingStatus.expired)
+            .returning(Booking.id, Booking.ticket_id, Booking.user_id, Booking.lock_token)
+            .cte("expired")
+        )
+        freed = (
+            update(Ticket)
+            .where(
+                Ticket.id == expired.c.ticket_id,
+                Ticket.status == TicketStatus.reserved,
+                or_(expired.c.lock_token.is_(None), Ticket.fence_token == expired.c.lock_token)
+            )
+            .values(status=TicketStatus.available)
+            .returning(Ticket.id, Ticket.show_id)
+            .cte("freed")
+        )
+        return (
+            select(expired.c.id, expired.c.ticket_id, expired.c.user_id, expired.c.lock_token, freed.c.show_id)
+            .outerjoin(freed, freed.c.id == expired.c.ticket_id)
+        )
+
+    async def _expire_where(self, *criteria) -> int:
+        """Expire the reserved bookings matching criteria and free their tickets in one statement,
+        then release their holds"""
+        result = await self.db.execute(self._expire_statement(*criteria))
+        rows = result.all()
+        await self.db.commit()
+        
+        if rows:
+            await self.release_holds([(row.ticket_id, row.user_id, row.lock_token) for row in rows])
+            await self.redis_client.zrem(BOOKING_EXPIRY_KEY, *[row.id for row in rows])
+            await self.availability.released(row.show_id for row in rows if row.show_id is not None)
+        
+        return len(rows)
+
+    @staticmethod
+    def _overdue_chunk(chunk_size: int):
+        """Ids of up to chunk_size overdue reservations"""
+        # SKIP LOCKED lets several sweepers work side by side without blocking
+        return (
+            select(Booking.id)
+            .where(
+                Booking.status == BookingStatus.reserved,
+                Booking.expires_at < datetime.utcnow()
+            )
+            .limit(chunk_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+
+    async def cleanup_expired_bookings(self, chunk_size: int = 1000) -> int:
+        """Expire every overdue reservation in chunks; returns how many were expired"""
+        total = 0
+        while True:
+            expired = await self._expire_where(Booking.id.in_(self._overdue_chunk(chunk_size)))
+            total += expired
+            if expired < chunk_size:
+                break
+        
+        BOOKINGS_EXPIRED.labels(source="cleanup").inc(total)
+        BOOKING_CLEANUP_ROWS.observe(total)
+        return total
+
+    async def expire_due_bookings(self, batch_size: int) -> int:
+        """Expire up to batch_size holds whose expires_at has passed; returns how many were due"""
+        due = await self._pop_due_script(
+            keys=[BOOKING_EXPIRY_KEY],
+            args=[self._epoch(datetime.utcnow()), batch_size]
+        )
+        if not due:
+            return 0
+        
+        booking_ids = [int(booking_id) for booking_id in due]
+        try:
+            expired = await self._expire_where(Booking.id.in_(booking_ids))
+        except Exception:
+            # Put them back so the next tick retries
+            await self.redis_client.zadd(BOOKING_EXPIRY_KEY, {booking_id: 0 for booking_id in booking_ids})
+            raise
+        
+        BOOKINGS_EXPIRED.labels(source="queue").inc(expired)
+        return len(booking_ids)
+
+    @staticmethod
+    def _epoch(moment: datetime) -> float:
+        """Epoch seconds for a naive UTC datetime"""
+        return moment.replace(tzinfo=timezone.utc).timestamp()
@@ -1,26 +1,30 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.user import Role
 from schemas.user import RoleCreate
 
 class RoleDAO:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_by_name(self, name: str):
-        return self.db.query(Role).filter(Role.name == name).first()
+    async def get_by_name(self, name: str):
+        result = await self.db.execute(select(Role).where(Role.name == name))
+        return result.scalars().first()
 
-    def get_by_id(self, role_id: int):
-        return self.db.query(Role).filter(Role.id == role_id).first()
+    async def get_by_id(self, role_id: int):
+        return await self.db.get(Role, role_id)
 
-    def create(self, role: RoleCreate):
+    async def create(self, role: RoleCreate):
         db_role = Role(name=role.name)
         self.db.add(db_role)
-        self.db.commit()
-        self.db.refresh(db_role)
+        await self.db.commit()
+        await self.db.refresh(db_role)
         return db_role
 
-    def get_all(self):
-        return self.db.query(Role).all()
+    async def get_all(self):
+        result = await self.db.execute(select(Role))
+        return result.scalars().all()
 
-    def get_multi(self, skip: int = 0, limit: int = 10):
-        return self.db.query(Role).offset(skip).limit(limit).all()
+    async def get_multi(self, skip: int = 0, limit: int = 10):
+        result = await self.db.execute(select(Role).offset(skip).limit(limit))
+        return result.scalars().all()
@@ -0,0 +1,275 @@
+from enum import IntEnum
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, exists, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+import redis.asyncio as redis
+from models.booking import Booking, BookingStatus
+from models.ticket import Ticket, TicketStatus
+from daos.show_availability import ShowAvailabilityDAO
+
+
+class SeatState(IntEnum):
+    available = 0
+    held = 1
+    sold = 2
+    removed = 3
+
+
+TICKET_STATUS_TO_SEAT_STATE = {
+    TicketStatus.available: SeatState.available,
+    TicketStatus.reserved: SeatState.held,
+    TicketStatus.sold: SeatState.sold,
+}
+
+# ticket_id -> "<show_id>:<ordinal>" for every indexed ticket
+SEAT_INDEX_KEY = "seat_index"
+
+# Lua helper shared by every script that addresses a seat by ticket id.
+# Returns the show's bitfield key and the "#<ordinal>" offset, or nil when the
+# ticket has not been indexed yet.
+LOCATE_SEAT_LUA = """
+local function locate_seat(index_key, ticket_id)
+    local loc = redis.call('HGET', index_key, ticket_id)
+    if not loc then
+        return nil
+    end
+    local sep = string.find(loc, ':', 1, true)
+    return 'seatmap:' .. string.sub(loc, 1, sep - 1), '#' .. string.sub(loc, sep + 1)
+end
+"""
+
+# KEYS[1] = seat index. ARGV[1] = new state, ARGV[2] = expected current state
+# (-1 for any), ARGV[3..] = ticket ids. Returns the number of seats changed.
+SET_SEAT_STATES_SCRIPT = LOCATE_SEAT_LUA + """
+local state = tonumber(ARGV[1])
+local expected = tonumber(ARGV[2])
+local changed = 0
+for i = 3, #ARGV do
+    local seatmap, ordinal = locate_seat(KEYS[1], ARGV[i])
+    if seatmap then
+        local current = redis.call('BITFIELD', seatmap, 'GET', 'u2', ordinal)[1]
+        if expected < 0 or current == expected then
+            redis.call('BITFIELD', seatmap, 'SET', 'u2', ordinal, state)
+            changed = changed + 1
+        end
+    end
+end
+return changed
+"""
+
+# KEYS[1] = seat index. ARGV = ticket ids. Returns one state per ticket, -1 if unindexed.
+GET_SEAT_STATES_SCRIPT = LOCATE_SEAT_LUA + """
+local states = {}
+for i = 1, #ARGV do
+    local seatmap, ordinal = locate_seat(KEYS[1], ARGV[i])
+    if seatmap then
+        states[i] = redis.call('BITFIELD', seatmap, 'GET', 'u2', ordinal)[1]
+    else
+        states[i] = -1
+    end
+end
+return states
+"""
+
+# KEYS[1] = seat index, KEYS[2] = seatmap:<show>, KEYS[3] = its ticket hash,
+# KEYS[4] = its ordinal counter. ARGV = show id, ticket id, state. Returns -1
+# without adding anything when the show's seat map has not been built: a map
+# holding only the new seat would hide every other seat of the show.
+ADD_SEAT_SCRIPT = """
+if redis.call('EXISTS', KEYS[4]) == 0 then
+    return -1
+end
+local ordinal = redis.call('INCR', KEYS[4]) - 1
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[1] .. ':' .. ordinal)
+redis.call('HSET', KEYS[3], ordinal, ARGV[2])
+redis.call('BITFIELD', KEYS[2], 'SET', 'u2', '#' .. ordinal, ARGV[3])
+return ordinal
+"""
+
+
+# KEYS = fencing counters, ARGV = the matching fence_token from Postgres.
+# Raises each counter to at least that token; never lowers one.
+RAISE_FENCES_SCRIPT = """
+for i = 1, #KEYS do
+    if tonumber(redis.call('GET', KEYS[i]) or '-1') < tonumber(ARGV[i]) then
+        redis.call('SET', KEYS[i], ARGV[i])
+    end
+end
+return #KEYS
+"""
+
+
+def fence_key(ticket_id: int) -> str:
+    """Redis counter that issues a ticket's hold fencing tokens (see BookingDAO.hold_tickets)"""
+    return f"ticket_fence:{ticket_id}"
+
+
+def pack_seat_states(states: List[int]) -> bytes:
+    """Pack 2-bit states in Redis BITFIELD u2 order (most significant bits first)"""
+    packed = bytearray((len(states) + 3) // 4)
+    for ordinal, state in enumerate(states):
+        packed[ordinal // 4] |= (int(state) & 0b11) << (6 - 2 * (ordinal % 4))
+    return bytes(packed)
+
+
+def unpack_seat_states(packed: bytes, count: int) -> List[int]:
+    """Inverse of pack_seat_states"""
+    return [
+        (packed[ordinal // 4] >> (6 - 2 * (ordinal % 4))) & 0b11 if ordinal // 4 < len(packed) else 0
+        for ordinal in range(count)
+    ]
+
+
+class SeatInventoryDAO:
+    """Per-show seat state bitmap kept in Redis, 2 bits per seat ordinal"""
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+        self._set_states_script = redis_client.register_script(SET_SEAT_STATES_SCRIPT)
+        self._get_states_script = redis_client.register_script(GET_SEAT_STATES_SCRIPT)
+        self._add_seat_script = redis_client.register_script(ADD_SEAT_SCRIPT)
+        self._raise_fences_script = redis_client.register_script(RAISE_FENCES_SCRIPT)
+
+    @staticmethod
+    def seatmap_key(show_id: int) -> str:
+        return f"seatmap:{show_id}"
+
+    @staticmethod
+    def seat_tickets_key(show_id: int) -> str:
+        return f"seatmap:{show_id}:tickets"
+
+    @staticmethod
+    def seat_counter_key(show_id: int) -> str:
+        return f"seatmap:{show_id}:next"
+
+    async def set_states(
+        self,
+        ticket_ids: Iterable[int],
+        state: SeatState,
+        expected: Optional[SeatState] = None
+    ) -> int:
+        """Move seats to a new state, optionally only from an expected state"""
+        ticket_ids = list(ticket_ids)
+        if not ticket_ids:
+            return 0
+        expected_arg = -1 if expected is None else int(expected)
+        result = await self._set_states_script(
+            keys=[SEAT_INDEX_KEY],
+            args=[int(state), expected_arg, *ticket_ids]
+        )
+        return int(result)
+
+    async def get_states(self, ticket_ids: List[int]) -> Dict[int, Optional[SeatState]]:
+        """Look up the current state of each ticket (None when not indexed)"""
+        if not ticket_ids:
+            return {}
+        result = await self._get_states_script(keys=[SEAT_INDEX_KEY], args=ticket_ids)
+        return {
+            ticket_id: SeatState(int(state)) if int(state) >= 0 else None
+            for ticket_id, state in zip(ticket_ids, result)
+        }
+
+    async def add_ticket(self, show_id: int, ticket_id: int, state: SeatState) -> int:
+        """Append a ticket to its show's seat map and return its ordinal (-1 if the map is not built)"""
+        result = await self._add_seat_script(
+            keys=[
+                SEAT_INDEX_KEY,
+                self.seatmap_key(show_id),
+                self.seat_tickets_key(show_id),
+                self.seat_counter_key(show_id)
+            ],
+            args=[show_id, ticket_id, int(state)]
+        )
+        return int(result)
+
+    async def remove_ticket(self, ticket_id: int):
+        """Mark a deleted ticket's seat as removed and drop it from the index"""
+        await self.set_states([ticket_id], SeatState.removed)
+        await self.redis_client.hdel(SEAT_INDEX_KEY, ticket_id)
+
+    async def index_show(self, show_id: int, tickets: List[Tuple[int, SeatState]]):
+        """Replace a show's seat map with the given (ticket_id, state) list, in ordinal order"""
+        old_ticket_ids = await self.redis_client.hvals(self.seat_tickets_key(show_id))
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            if old_ticket_ids:
+                pipe.hdel(SEAT_INDEX_KEY, *old_ticket_ids)
+            pipe.delete(
+                self.seatmap_key(show_id),
+                self.seat_tickets_key(show_id),
+                self.seat_counter_key(show_id)
+            )
+            if tickets:
+                pipe.set(self.seatmap_key(show_id), pack_seat_states([state for _, state in tickets]))
+                pipe.hset(SEAT_INDEX_KEY, mapping={
+                    ticket_id: f"{show_id}:{ordinal}" for ordinal, (ticket_id, _) in enumerate(tickets)
+                })
+                pipe.hset(self.seat_tickets_key(show_id), mapping={
+                    ordinal: ticket_id for ordinal, (ticket_id, _) in enumerate(tickets)
+                })
+            pipe.set(self.seat_counter_key(show_id), len(tickets))
+            await pipe.execute()
+
+    async def raise_fence_tokens(self, fence_tokens: Dict[int, int], batch_size: int = 1000):
+        """Bring fencing counters up to the tokens Postgres has seen (ticket_id -> fence_token)"""
+        items = list(fence_tokens.items())
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            await self._raise_fences_script(
+                keys=[fence_key(ticket_id) for ticket_id, _ in batch],
+                args=[token for _, token in batch]
+            )
+
+    async def get_seat_map(self, show_id: int) -> List[dict]:
+        """Return every seat of a show with its current state, in ordinal order"""
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.get(self.seatmap_key(show_id))
+            pipe.hgetall(self.seat_tickets_key(show_id))
+            packed, ticket_map = await pipe.execute()
+
+        if not ticket_map:
+            return []
+
+        ordinals = {int(ordinal): int(ticket_id) for ordinal, ticket_id in ticket_map.items()}
+        states = unpack_seat_states(packed or b"", max(ordinals) + 1)
+        return [
+            {"ticket_id": ordinals[ordinal], "state": SeatState(states[ordinal]).name}
+            for ordinal in sorted(ordinals)
+        ]
+
+    async def rebuild_from_db(self, db: AsyncSession, show_id: Optional[int] = None) -> int:
+        """Rebuild seat maps, availability and fencing counters from Postgres (one show, or every show).
+        Returns tickets indexed."""
+        active_hold = exists().where(and_(
+            Booking.ticket_id == Ticket.id,
+            Booking.status == BookingStatus.reserved,
+            Booking.expires_at > datetime.utcnow()
+        ))
+        query = select(Ticket.show_id, Ticket.id, Ticket.status, Ticket.fence_token, active_hold.label("held"))
+        if show_id is not None:
+            query = query.where(Ticket.show_id == show_id)
+        result = await db.execute(query.order_by(Ticket.show_id, Ticket.id))
+
+        shows: Dict[int, List[Tuple[int, SeatState]]] = {}
+        fence_tokens: Dict[int, int] = {}
+        for row in result:
+            fence_tokens[row.id] = row.fence_token
+            state = TICKET_STATUS_TO_SEAT_STATE[row.status]
+            if state == SeatState.available and row.held:
+                state = SeatState.held
+            shows.setdefault(row.show_id, []).append((row.id, state))
+
+        if show_id is not None:
+            shows.setdefault(show_id, [])
+
+        for indexed_show_id, tickets in shows.items():
+            await self.index_show(indexed_show_id, tickets)
+        await self.raise_fence_tokens(fence_tokens)
+        
+        await ShowAvailabilityDAO(self.redis_client).reset({
+            indexed_show_id: sum(1 for _, state in tickets if state == SeatState.available)
+            for indexed_show_id, tickets in shows.items()
+        })
+
+        return sum(len(tickets) for tickets in shows.values())
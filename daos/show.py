@@ -1,14 +1,39 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.show import Show
 from models.ticket import Ticket, TicketStatus
-from schemas.show import ShowUpdate
+from schemas.show import ShowOut, ShowUpdate
+from daos.seat_inventory import SeatInventoryDAO, SeatState
+from daos.show_availability import ShowAvailabilityDAO
+from core.cache import ReadThroughCache
+from core.config import settings
+from core.pagination import estimated_count, keyset_page
+from typing import Optional
+import redis.asyncio as redis
+
+
+def show_cache(redis_client: redis.Redis) -> ReadThroughCache:
+    """Cache of show details (ShowOut as JSON) keyed by show id"""
+    return ReadThroughCache(
+        redis_client,
+        "show",
+        ttl=settings.SHOW_CACHE_TTL_SECONDS,
+        negative_ttl=settings.SHOW_CACHE_NEGATIVE_TTL_SECONDS,
+        jitter=settings.SHOW_CACHE_TTL_JITTER,
+        local_entries=settings.SHOW_CACHE_LOCAL_ENTRIES if settings.LOCAL_CACHE_ENABLED else 0,
+        local_seconds=settings.SHOW_CACHE_LOCAL_SECONDS
+    )
 
 
 class ShowDAO:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession, redis_client: Optional[redis.Redis] = None):
         self.db = db
+        # Seat inventory is kept in sync by mutations when a Redis client is given
+        self.inventory = SeatInventoryDAO(redis_client) if redis_client is not None else None
+        self.availability = ShowAvailabilityDAO(redis_client) if redis_client is not None else None
+        self.cache = show_cache(redis_client) if redis_client is not None else None
 
-    def create_show_with_tickets(self, show_data, total_tickets: int):
+    async def create_show_with_tickets(self, show_data, total_tickets: int):
         show = Show(
             name=show_data.name,
             location=show_data.location,
@@ -19,8 +44,9 @@ class ShowDAO:
             performer=show_data.performer,
         )
         self.db.add(show)
-        self.db.flush()  # Get the show ID without committing
+        await self.db.flush()  # Get the show ID without committing
 
+        tickets = []
         for ticket_class in show_data.ticket_classes:
             for i in range(ticket_class.quantity):
                 # Generate seat identifier (e.g., "VIP-001", "Regular-002")
@@ -32,18 +58,57 @@ class ShowDAO:
                     seat=seat
                 )
                 self.db.add(db_ticket)
+                tickets.append(db_ticket)
+
+        await self.db.commit()
+        await self.db.refresh(show)
 
-        self.db.commit()
-        self.db.refresh(show)
+        if self.inventory:
+            # Seat ordinals follow the generation order of the seat identifiers
+            await self.inventory.index_show(
+                show.id, [(ticket.id, SeatState.available) for ticket in tickets])
+        if self.availability:
+            await self.availability.reset({show.id: total_tickets})
+        if self.cache:
+            # The id may have been looked up (and cached as missing) before it existed
+            await self.cache.invalidate(str(show.id))
         return show
 
-    def get_show_by_id(self, show_id: int):
+    async def get_show_by_id(self, show_id: int):
         """Get a show by its ID"""
-        return self.db.query(Show).filter(Show.id == show_id).first()
+        return await self.db.get(Show, show_id)
+
+    async def get_show_detail_cached(self, show_id: int) -> Optional[dict]:
+        """Show as ShowOut JSON through the read-through cache; None if it does not exist"""
+        async def load():
+            show = await self.get_show_by_id(show_id)
+            return ShowOut.model_validate(show).model_dump(mode="json") if show else None
+
+        if not self.cache:
+            return await load()
+        return await self.cache.get(str(show_id), load)
+
+    async def count_shows(self) -> int:
+        """Count all shows"""
+        result = await self.db.execute(select(func.count()).select_from(Show))
+        return result.scalar_one()
+
+    async def estimate_show_count(self) -> int:
+        """Approximate number of shows, without scanning the table"""
+        return await estimated_count(self.db, Show)
+
+    async def list_shows(self, skip: int = 0, limit: int = 10):
+        """Get shows with offset pagination (compatibility path)"""
+        result = await self.db.execute(select(Show).order_by(Show.id).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    async def list_shows_page(self, limit: int = 10, cursor: Optional[str] = None):
+        """Get a page of shows after cursor, and the cursor of the next page"""
+        return await keyset_page(self.db, select(Show), [Show.id], limit, cursor)
 
-    def update_show(self, show_id: int, show_update: ShowUpdate):
+    async def update_show(self, show_id: int, show_update: ShowUpdate):
         """Update a show with the provided data"""
-        show = self.get_show_by_id(show_id)
+        show = await self.get_show_by_id(show_id)
         if not show:
             return None
         
@@ -52,6 +117,8 @@ class ShowDAO:
         for field, value in update_data.items():
             setattr(show, field, value)
         
-        self.db.commit()
-        self.db.refresh(show)
+        await self.db.commit()
+        await self.db.refresh(show)
+        if self.cache:
+            await self.cache.invalidate(str(show_id))
         return show
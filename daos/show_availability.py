@@ -0,0 +1,156 @@
+import random
+from collections import Counter
+from typing import Dict, Iterable, Mapping
+from sqlalchemy import select, update, func, values, column, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+import redis.asyncio as redis
+from core.config import settings
+from models.show import Show
+from models.ticket import Ticket, TicketStatus
+
+# Show ids whose counter changed since it was last written back to Postgres
+AVAILABILITY_DIRTY_KEY = "availability:dirty"
+AVAILABILITY_FLUSHER_LOCK_KEY = "availability:flusher"
+
+# KEYS[1..n] = counters, KEYS[n+1] = dirty set. ARGV[1..n] = deltas,
+# ARGV[n+1..2n] = show ids. Counters that are not loaded are left alone; they
+# are recomputed from Postgres on the next read. INCRBY keeps the TTL.
+ADJUST_AVAILABILITY_SCRIPT = """
+local n = #KEYS - 1
+local adjusted = 0
+for i = 1, n do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('INCRBY', KEYS[i], ARGV[i])
+        redis.call('SADD', KEYS[n + 1], ARGV[n + i])
+        adjusted = adjusted + 1
+    end
+end
+return adjusted
+"""
+
+
+class ShowAvailabilityDAO:
+    """Live per-show count of tickets still for sale, one Redis counter per show.
+
+    Every booking transition adjusts the counter atomically instead of
+    updating the shows row, so sales of one show never queue on a row lock.
+    shows.available_tickets is a write-back copy refreshed by flush_to_db.
+
+    A change made while a counter is being loaded from Postgres can be
+    missed (the load counts before it commits, the adjustment finds no
+    counter yet). Counters therefore expire after
+    AVAILABILITY_COUNTER_TTL_SECONDS and are counted again, which bounds how
+    long such drift lasts.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+        self._adjust_script = redis_client.register_script(ADJUST_AVAILABILITY_SCRIPT)
+
+    @staticmethod
+    def counter_key(show_id: int) -> str:
+        return f"availability:{show_id}"
+
+    @staticmethod
+    def counter_ttl() -> int:
+        # Jittered so counters loaded together are not all recounted together
+        return int(settings.AVAILABILITY_COUNTER_TTL_SECONDS * (1 + random.uniform(0, 0.1)))
+
+    async def adjust(self, deltas: Mapping[int, int]) -> int:
+        """Apply show_id -> delta changes in one round trip"""
+        deltas = {show_id: delta for show_id, delta in deltas.items() if delta}
+        if not deltas:
+            return 0
+        show_ids = list(deltas)
+        result = await self._adjust_script(
+            keys=[self.counter_key(show_id) for show_id in show_ids] + [AVAILABILITY_DIRTY_KEY],
+            args=[deltas[show_id] for show_id in show_ids] + show_ids
+        )
+        return int(result)
+
+    async def taken(self, show_ids: Iterable[int]) -> int:
+        """One ticket of each listed show (repeats allowed) stopped being available"""
+        return await self.adjust({show_id: -count for show_id, count in Counter(show_ids).items()})
+
+    async def released(self, show_ids: Iterable[int]) -> int:
+        """One ticket of each listed show (repeats allowed) is available again"""
+        return await self.adjust(Counter(show_ids))
+
+    async def reset(self, counts: Mapping[int, int]):
+        """Overwrite counters with known-good values"""
+        if not counts:
+            return
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            for show_id, count in counts.items():
+                pipe.set(self.counter_key(show_id), count, ex=self.counter_ttl())
+            pipe.sadd(AVAILABILITY_DIRTY_KEY, *counts.keys())
+            await pipe.execute()
+
+    async def get_many(self, db: AsyncSession, show_ids: Iterable[int]) -> Dict[int, int]:
+        """Live counts for the given shows, loading missing counters from Postgres"""
+        show_ids = list(dict.fromkeys(show_ids))
+        if not show_ids:
+            return {}
+        cached = await self.redis_client.mget([self.counter_key(show_id) for show_id in show_ids])
+        counts = {show_id: int(value) for show_id, value in zip(show_ids, cached) if value is not None}
+
+        missing = [show_id for show_id in show_ids if show_id not in counts]
+        if missing:
+            loaded = await self.count_from_db(db, missing)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for show_id in missing:
+                    # NX: keep a counter another request loaded (and adjusted) meanwhile
+                    pipe.set(self.counter_key(show_id), loaded[show_id], nx=True, ex=self.counter_ttl())
+                pipe.sadd(AVAILABILITY_DIRTY_KEY, *missing)
+                for show_id in missing:
+                    pipe.get(self.counter_key(show_id))
+                results = await pipe.execute()
+            for show_id, value in zip(missing, results[-len(missing):]):
+                counts[show_id] = int(value) if value is not None else loaded[show_id]
+        return counts
+
+    async def get(self, db: AsyncSession, show_id: int) -> int:
+        return (await self.get_many(db, [show_id]))[show_id]
+
+    @staticmethod
+    async def count_from_db(db: AsyncSession, show_ids: Iterable[int]) -> Dict[int, int]:
+        """Available tickets per show (reserved tickets are not for sale)"""
+        show_ids = list(show_ids)
+        result = await db.execute(
+            select(Ticket.show_id, func.count())
+            .where(Ticket.show_id.in_(show_ids), Ticket.status == TicketStatus.available)
+            .group_by(Ticket.show_id)
+        )
+        counts = {show_id: 0 for show_id in show_ids}
+        counts.update({show_id: count for show_id, count in result.all()})
+        return counts
+
+    async def flush_to_db(self, db: AsyncSession, batch_size: int) -> int:
+        """Write up to batch_size changed counters back to shows.available_tickets"""
+        show_ids = [int(show_id) for show_id in await self.redis_client.spop(AVAILABILITY_DIRTY_KEY, batch_size)]
+        if not show_ids:
+            return 0
+
+        try:
+            cached = await self.redis_client.mget([self.counter_key(show_id) for show_id in show_ids])
+            # Expired counters are skipped: the read that loads them again marks them dirty
+            rows = [(show_id, int(value)) for show_id, value in zip(show_ids, cached) if value is not None]
+            if rows:
+                counts = values(
+                    column("id", Integer),
+                    column("available_tickets", Integer),
+                    name="counts"
+                ).data(rows)
+                await db.execute(
+                    update(Show)
+                    .where(Show.id == counts.c.id)
+                    .values(available_tickets=counts.c.available_tickets)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except Exception:
+            await db.rollback()
+            # Keep them dirty so the next flush retries
+            await self.redis_client.sadd(AVAILABILITY_DIRTY_KEY, *show_ids)
+            raise
+        return len(show_ids)
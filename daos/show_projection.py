@@ -0,0 +1,106 @@
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+import redis
+
+# Highest ticket CDC offset applied, per partition
+PROJECTION_OFFSETS_KEY = "show_projection:offsets"
+
+
+def ticket_class(seat: Optional[str]) -> str:
+    """Class part of a generated seat identifier ("VIP-001" -> "VIP")"""
+    if not seat:
+        return "general"
+    return seat.rsplit("-", 1)[0] if "-" in seat else seat
+
+
+def ticket_contribution(row: Optional[Dict[str, Any]]) -> Counter:
+    """Projection fields a ticket row counts towards: only tickets for sale count"""
+    if not row or row.get("status") != "available" or row.get("show_id") is None:
+        return Counter()
+    return Counter({
+        f"class:{ticket_class(row.get('seat'))}": 1,
+        f"price:{float(row.get('price') or 0):.2f}": 1,
+    })
+
+
+def projection_fields(raw: Dict[Any, Any]) -> Dict[str, Any]:
+    """Search document fields from a projection hash"""
+    by_class, prices = {}, []
+    for field, count in raw.items():
+        field = field.decode() if isinstance(field, bytes) else field
+        count = int(count)
+        if count <= 0:
+            continue
+        kind, _, value = field.partition(":")
+        if kind == "class":
+            by_class[value] = count
+        elif kind == "price":
+            prices.append(float(value))
+    available = sum(by_class.values())
+    return {
+        "available_by_class": by_class,
+        "available_tickets": available,
+        "min_price": min(prices, default=None),
+        "max_price": max(prices, default=None),
+        "sold_out": available == 0,
+    }
+
+
+class ShowProjectionDAO:
+    """Per-show availability projection built from ticket change events.
+
+    One Redis hash per show counts the tickets for sale per class
+    ("class:VIP") and per price ("price:50.00"). Each batch of events is
+    applied in a single MULTI together with the per-partition offset
+    watermark, so a redelivered event is never counted twice. Uses the
+    sync client: it runs on the projection consumer's thread.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+
+    @staticmethod
+    def projection_key(show_id: int) -> str:
+        return f"show_projection:{show_id}"
+
+    def apply(self, messages: Iterable[Any]) -> List[int]:
+        """Apply Debezium ticket events (Kafka messages); returns the shows whose projection changed"""
+        applied = {
+            int(partition): int(offset)
+            for partition, offset in self.redis_client.hgetall(PROJECTION_OFFSETS_KEY).items()
+        }
+        deltas: Dict[int, Counter] = defaultdict(Counter)
+        watermarks: Dict[int, int] = {}
+        for message in messages:
+            if message.offset <= applied.get(message.partition, -1):
+                continue
+            watermarks[message.partition] = max(message.offset, watermarks.get(message.partition, -1))
+            value = message.value
+            if not value:
+                continue
+            before, after = value.get("before"), value.get("after")
+            for row, sign in ((before, -1), (after, 1)):
+                for field, count in ticket_contribution(row).items():
+                    deltas[row["show_id"]][field] += sign * count
+
+        if not watermarks:
+            return []
+        with self.redis_client.pipeline(transaction=True) as pipe:
+            for show_id, fields in deltas.items():
+                for field, delta in fields.items():
+                    if delta:
+                        pipe.hincrby(self.projection_key(show_id), field, delta)
+            pipe.hset(PROJECTION_OFFSETS_KEY, mapping=watermarks)
+            pipe.execute()
+        return [show_id for show_id, fields in deltas.items() if any(fields.values())]
+
+    def get_many(self, show_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Search document fields per show; shows with no ticket events yet are left out"""
+        show_ids = list(dict.fromkeys(show_ids))
+        if not show_ids:
+            return {}
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            for show_id in show_ids:
+                pipe.hgetall(self.projection_key(show_id))
+            results = pipe.execute()
+        return {show_id: projection_fields(raw) for show_id, raw in zip(show_ids, results) if raw}
@@ -0,0 +1,223 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from prometheus_client import Counter
+import redis.asyncio as redis
+from core.cache import MISSING, LocalCache
+from core.config import settings
+from core.elasticsearch import ELASTICSEARCH_SHOWS_INDEX
+from core.pagination import decode_cursor, encode_cursor
+
+SHOW_SEARCH_CACHE = Counter(
+    'show_search_cache_total', 'Show search queries by query-cache outcome', ['outcome'])
+SHOW_AUTOCOMPLETE_CACHE = Counter(
+    'show_autocomplete_cache_total', 'Autocomplete lookups by prefix-cache outcome', ['outcome'])
+
+TEXT_FIELDS = ["name^3", "performer^2", "description", "location"]
+
+# Completion fields and the suggestion type each one yields
+SUGGEST_FIELDS = {"name_suggest": "show", "performer_suggest": "performer"}
+
+# Indexing bookkeeping and suggester inputs, never returned by search
+INTERNAL_FIELDS = [*SUGGEST_FIELDS, "cdc_offset"]
+
+SHOWS_MAPPING = {
+    "properties": {
+        "id": {"type": "integer"},
+        "name": {"type": "text"},
+        "location": {"type": "text"},
+        "start_time": {"type": "date"},
+        "description": {"type": "text"},
+        "performer": {"type": "text"},
+        "name_suggest": {"type": "completion"},
+        "performer_suggest": {"type": "completion"},
+        # Ticket availability projection (daos.show_projection)
+        "available_by_class": {"type": "flattened"},
+        "available_tickets": {"type": "integer"},
+        "min_price": {"type": "scaled_float", "scaling_factor": 100},
+        "max_price": {"type": "scaled_float", "scaling_factor": 100},
+        "sold_out": {"type": "boolean"},
+        # Offset of the last CDC event applied (services.shows_consumer)
+        "cdc_offset": {"type": "long", "index": False}
+    }
+}
+
+
+def suggest_inputs(text: Optional[str]) -> List[str]:
+    """Completion inputs for a phrase: the phrase from each word on, so a later word also matches"""
+    words = (text or "").split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def show_document(show_id: int, name: str, location: str, start_time: str,
+                  description: Optional[str], performer: Optional[str]) -> Dict[str, Any]:
+    """Document indexed for a show in the shows index"""
+    return {
+        "id": show_id,
+        "name": name,
+        "location": location,
+        "start_time": start_time,
+        "description": description,
+        "performer": performer,
+        "name_suggest": {"input": suggest_inputs(name)},
+        "performer_suggest": {"input": suggest_inputs(performer)}
+    }
+
+
+class ShowSearchDAO:
+    """Full-text show search against the Elasticsearch shows index.
+
+    Queries are normalised (case, whitespace, parameter order) and their
+    result pages cached in Redis for `cache_ttl` seconds, so a popular
+    search costs one Elasticsearch round trip per TTL. Autocomplete needs
+    neither: it is cached in process.
+    """
+
+    def __init__(self, search_client, redis_client: Optional[redis.Redis] = None, cache_ttl: int = 0):
+        self.search_client = search_client
+        self.redis_client = redis_client
+        self.cache_ttl = cache_ttl
+
+    @staticmethod
+    def normalize(q: Optional[str], location: Optional[str], starts_after: Optional[datetime],
+                  starts_before: Optional[datetime], size: int, cursor: Optional[str],
+                  available_only: bool = False, max_price: Optional[float] = None) -> Dict[str, Any]:
+        def text(value):
+            value = " ".join((value or "").lower().split())
+            return value or None
+
+        return {
+            "q": text(q),
+            "location": text(location),
+            "starts_after": starts_after.isoformat() if starts_after else None,
+            "starts_before": starts_before.isoformat() if starts_before else None,
+            "available_only": available_only,
+            "max_price": max_price,
+            "size": size,
+            "cursor": cursor,
+        }
+
+    @staticmethod
+    def build_request(params: Dict[str, Any]) -> Dict[str, Any]:
+        must, filters = [], []
+        if params["q"]:
+            must.append({"multi_match": {"query": params["q"], "fields": TEXT_FIELDS, "operator": "and"}})
+        if params["location"]:
+            filters.append({"match": {"location": {"query": params["location"], "operator": "and"}}})
+        start_range = {}
+        if params["starts_after"]:
+            start_range["gte"] = params["starts_after"]
+        if params["starts_before"]:
+            start_range["lte"] = params["starts_before"]
+        if start_range:
+            filters.append({"range": {"start_time": start_range}})
+        if params["available_only"]:
+            filters.append({"range": {"available_tickets": {"gt": 0}}})
+        if params["max_price"] is not None:
+            # Cheapest ticket still for sale: "available under $50"
+            filters.append({"range": {"min_price": {"lte": params["max_price"]}}})
+
+        # id breaks ties so search_after never skips or repeats a hit
+        if params["q"]:
+            sort = [{"_score": "desc"}, {"id": "asc"}]
+        else:
+            sort = [{"start_time": "asc"}, {"id": "asc"}]
+
+        request = {
+            "query": {"bool": {"must": must, "filter": filters}},
+            "source_excludes": INTERNAL_FIELDS,
+            "sort": sort,
+            "size": params["size"],
+            "track_total_hits": False,
+        }
+        if params["cursor"]:
+            search_after = decode_cursor(params["cursor"])
+            # Every sort value here (score, epoch millis, id) is a number. Anything else
+            # is a cursor from some other listing, which Elasticsearch would reject
+            if len(search_after) != len(sort) or not all(
+                    isinstance(value, (int, float)) and not isinstance(value, bool) for value in search_after):
+                raise ValueError("Invalid cursor")
+            request["search_after"] = search_after
+        return request
+
+    @staticmethod
+    def cache_key(params: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+        return f"show_search:{digest}"
+
+    async def search(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """One page of matching show documents and the cursor for the next page"""
+        request = self.build_request(params)
+        key = self.cache_key(params)
+        cached = await self.redis_client.get(key)
+        if cached:
+            SHOW_SEARCH_CACHE.labels(outcome="hit").inc()
+            return json.loads(cached)
+        SHOW_SEARCH_CACHE.labels(outcome="miss").inc()
+
+        response = await self.search_client.search(index=ELASTICSEARCH_SHOWS_INDEX, **request)
+        hits = response["hits"]["hits"]
+        page = {
+            "data": [
+                {field: value for field, value in hit["_source"].items() if field not in INTERNAL_FIELDS}
+                for hit in hits
+            ],
+            # A short page is the last one
+            "next_cursor": encode_cursor(hits[-1]["sort"]) if len(hits) == params["size"] else None,
+        }
+        await self.redis_client.set(key, json.dumps(page), ex=self.cache_ttl)
+        return page
+
+    async def suggest(self, prefix: str, size: int) -> List[Dict[str, Any]]:
+        """Show names and performers starting with prefix (or with a later word starting with it).
+
+        Answered by the completion suggesters alone: no query phase, no
+        Postgres. Hot prefixes are served from suggestion_cache.
+        """
+        prefix = " ".join(prefix.lower().split())
+        cache_key = (prefix, size)
+        cached = suggestion_cache.get(cache_key)
+        if cached is not MISSING:
+            SHOW_AUTOCOMPLETE_CACHE.labels(outcome="hit").inc()
+            return cached
+        SHOW_AUTOCOMPLETE_CACHE.labels(outcome="miss").inc()
+
+        response = await self.search_client.search(
+            index=ELASTICSEARCH_SHOWS_INDEX,
+            suggest={
+                field: {"prefix": prefix, "completion": {"field": field, "size": size, "skip_duplicates": True}}
+                for field in SUGGEST_FIELDS
+            },
+            source=["id", "name", "performer"],
+            size=0
+        )
+
+        suggestions, seen = [], set()
+        options = [
+            (SUGGEST_FIELDS[field], option)
+            for field, entries in response["suggest"].items()
+            for entry in entries
+            for option in entry["options"]
+        ]
+        # Score first; on ties show names before performers
+        options.sort(key=lambda pair: (-pair[1].get("_score", 0), pair[0] != "show"))
+        for kind, option in options:
+            source = option.get("_source", {})
+            text = source.get("name") if kind == "show" else source.get("performer")
+            if not text or (kind, text.lower()) in seen:
+                continue
+            seen.add((kind, text.lower()))
+            suggestion = {"type": kind, "text": text}
+            if kind == "show":
+                suggestion["show_id"] = source.get("id")
+            suggestions.append(suggestion)
+            if len(suggestions) == size:
+                break
+
+        suggestion_cache.set(cache_key, suggestions)
+        return suggestions
+
+
+# Per-process autocomplete cache
+suggestion_cache = LocalCache("autocomplete", settings.AUTOCOMPLETE_CACHE_SIZE, settings.AUTOCOMPLETE_CACHE_SECONDS)
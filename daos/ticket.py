@@ -1,32 +1,49 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from models.ticket import Ticket, TicketStatus
 from models.show import Show
 from schemas.ticket import TicketCreate, TicketUpdate
-from typing import List, Optional
+from typing import List, Optional, Tuple
+import redis.asyncio as redis
+from daos.seat_inventory import SeatInventoryDAO, TICKET_STATUS_TO_SEAT_STATE
+from daos.show_availability import ShowAvailabilityDAO
+from core.pagination import keyset_page
+from daos.show import show_cache
 
 
 class TicketDAO:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession, redis_client: Optional[redis.Redis] = None):
         self.db = db
+        # Seat inventory is kept in sync by mutations when a Redis client is given
+        self.inventory = SeatInventoryDAO(redis_client) if redis_client is not None else None
+        self.availability = ShowAvailabilityDAO(redis_client) if redis_client is not None else None
+        # total_tickets is part of the cached show; availability is overlaid live, so
+        # status changes need no invalidation
+        self.show_cache = show_cache(redis_client) if redis_client is not None else None
     
-    def get_tickets_by_show_id(self, show_id: int) -> List[Ticket]:
+    async def get_tickets_by_show_id(self, show_id: int) -> List[Ticket]:
         """Get all tickets for a specific show"""
-        return self.db.query(Ticket).filter(Ticket.show_id == show_id).all()
+        result = await self.db.execute(select(Ticket).where(Ticket.show_id == show_id))
+        return result.scalars().all()
 
-    def get_ticket_by_id(self, ticket_id: int) -> Optional[Ticket]:
+    async def get_ticket_by_id(self, ticket_id: int) -> Optional[Ticket]:
         """Get a ticket by its ID"""
-        return self.db.query(Ticket).filter(Ticket.id == ticket_id).first()
+        return await self.db.get(Ticket, ticket_id)
 
-    def get_ticket_with_show_details(self, ticket_id: int) -> Optional[Ticket]:
+    async def get_ticket_with_show_details(self, ticket_id: int) -> Optional[Ticket]:
         """Get a ticket with show details loaded"""
-        return self.db.query(Ticket).options(
-            joinedload(Ticket.show)
-        ).filter(Ticket.id == ticket_id).first()
+        result = await self.db.execute(
+            select(Ticket).options(
+                joinedload(Ticket.show)
+            ).where(Ticket.id == ticket_id)
+        )
+        return result.scalars().first()
 
-    def create_ticket(self, ticket_data: TicketCreate) -> Ticket:
+    async def create_ticket(self, ticket_data: TicketCreate) -> Ticket:
         """Create a new ticket"""
         # Validate that the show exists
-        show = self.db.query(Show).filter(Show.id == ticket_data.show_id).first()
+        show = await self.db.get(Show, ticket_data.show_id)
         if not show:
             raise ValueError(f"Show with ID {ticket_data.show_id} not found")
         
@@ -39,20 +56,23 @@ class TicketDAO:
         )
         
         self.db.add(ticket)
-        self.db.commit()
-        self.db.refresh(ticket)
+        # Availability is counted in Redis; only the total lives on the show row
+        await self._adjust_total(ticket_data.show_id, 1)
+        await self.db.commit()
+        await self.db.refresh(ticket)
         
-        # Update show ticket counts
-        show.total_tickets += 1
-        if ticket.status == TicketStatus.available:
-            show.available_tickets += 1
-        self.db.commit()
+        if self.inventory:
+            await self.inventory.add_ticket(ticket.show_id, ticket.id, TICKET_STATUS_TO_SEAT_STATE[ticket.status])
+        if self.availability and ticket.status == TicketStatus.available:
+            await self.availability.released([ticket.show_id])
+        if self.show_cache:
+            await self.show_cache.invalidate(str(ticket.show_id))
         
         return ticket
 
-    def update_ticket(self, ticket_id: int, ticket_update: TicketUpdate) -> Optional[Ticket]:
+    async def update_ticket(self, ticket_id: int, ticket_update: TicketUpdate) -> Optional[Ticket]:
         """Update a ticket"""
-        ticket = self.get_ticket_by_id(ticket_id)
+        ticket = await self.get_ticket_by_id(ticket_id)
         if not ticket:
             return None
         
@@ -67,49 +87,107 @@ class TicketDAO:
             else:
                 setattr(ticket, field, value)
         
-        self.db.commit()
-        self.db.refresh(ticket)
+        await self.db.commit()
+        await self.db.refresh(ticket)
         
-        # Update show ticket counts if status changed
+        # Update show availability if status changed
         if "status" in update_data and old_status != ticket.status:
-            show = self.db.query(Show).filter(Show.id == ticket.show_id).first()
-            if show:
+            if self.availability:
                 if old_status == TicketStatus.available:
-                    show.available_tickets -= 1
+                    await self.availability.taken([ticket.show_id])
                 elif ticket.status == TicketStatus.available:
-                    show.available_tickets += 1
-                self.db.commit()
+                    await self.availability.released([ticket.show_id])
+            
+            if self.inventory:
+                await self.inventory.set_states([ticket.id], TICKET_STATUS_TO_SEAT_STATE[ticket.status])
         
         return ticket
 
-    def delete_ticket(self, ticket_id: int) -> bool:
+    async def delete_ticket(self, ticket_id: int) -> bool:
         """Delete a ticket"""
-        ticket = self.get_ticket_by_id(ticket_id)
+        ticket = await self.get_ticket_by_id(ticket_id)
         if not ticket:
             return False
         
-        # Update show ticket counts
-        show = self.db.query(Show).filter(Show.id == ticket.show_id).first()
-        if show:
-            show.total_tickets -= 1
-            if ticket.status == TicketStatus.available:
-                show.available_tickets -= 1
-            self.db.commit()
+        show_id = ticket.show_id
+        was_available = ticket.status == TicketStatus.available
         
         # Delete the ticket
-        self.db.delete(ticket)
-        self.db.commit()
+        await self._adjust_total(show_id, -1)
+        await self.db.delete(ticket)
+        await self.db.commit()
+        
+        if self.inventory:
+            await self.inventory.remove_ticket(ticket_id)
+        if self.availability and was_available:
+            await self.availability.taken([show_id])
+        if self.show_cache:
+            await self.show_cache.invalidate(str(show_id))
         
         return True
 
-    def get_all_tickets(self, skip: int = 0, limit: int = 100) -> List[Ticket]:
+    async def _adjust_total(self, show_id: int, delta: int):
+        """Change a show's total_tickets in place rather than read-modify-write"""
+        await self.db.execute(
+            update(Show)
+            .where(Show.id == show_id)
+            .values(total_tickets=Show.total_tickets + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get_all_tickets(self, skip: int = 0, limit: int = 100) -> List[Ticket]:
         """Get all tickets with pagination"""
-        return self.db.query(Ticket).offset(skip).limit(limit).all()
+        result = await self.db.execute(select(Ticket).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    @staticmethod
+    def _ticket_query(
+        show_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        status: Optional[TicketStatus] = None
+    ):
+        query = select(Ticket)
+        
+        if show_id:
+            query = query.where(Ticket.show_id == show_id)
+        
+        if user_id:
+            query = query.where(Ticket.user_id == user_id)
+        
+        if status:
+            query = query.where(Ticket.status == status)
+        return query
+
+    async def list_tickets(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        show_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        status: Optional[TicketStatus] = None
+    ) -> List[Ticket]:
+        """Get tickets with optional filtering and offset pagination (compatibility path)"""
+        query = self._ticket_query(show_id, user_id, status).order_by(Ticket.id)
+        result = await self.db.execute(query.offset(skip).limit(limit))
+        return result.scalars().all()
+
+    async def list_tickets_page(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        show_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        status: Optional[TicketStatus] = None
+    ) -> Tuple[List[Ticket], Optional[str]]:
+        """Get a page of tickets after cursor, and the cursor of the next page"""
+        return await keyset_page(self.db, self._ticket_query(show_id, user_id, status), [Ticket.id], limit, cursor)
 
-    def get_tickets_by_user_id(self, user_id: int) -> List[Ticket]:
+    async def get_tickets_by_user_id(self, user_id: int) -> List[Ticket]:
         """Get all tickets for a specific user"""
-        return self.db.query(Ticket).filter(Ticket.user_id == user_id).all()
+        result = await self.db.execute(select(Ticket).where(Ticket.user_id == user_id))
+        return result.scalars().all()
 
-    def get_tickets_by_status(self, status: TicketStatus) -> List[Ticket]:
+    async def get_tickets_by_status(self, status: TicketStatus) -> List[Ticket]:
         """Get all tickets with a specific status"""
-        return self.db.query(Ticket).filter(Ticket.status == status).all()
+        result = await self.db.execute(select(Ticket).where(Ticket.status == status))
+        return result.scalars().all()
@@ -1,52 +1,69 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from models.user import User, Role
 from schemas.user import UserCreate
+from core.pagination import keyset_page
+from typing import Optional
 
 class UserDAO:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_by_email(self, email: str):
-        return self.db.query(User).filter(User.email == email).first()
+    async def get_by_email(self, email: str):
+        result = await self.db.execute(
+            select(User).options(selectinload(User.roles)).where(User.email == email)
+        )
+        return result.scalars().first()
 
-    def create(self, user: UserCreate):
-        db_user = User(email=user.email, name=user.name, hashed_password=user.password)
+    async def create(self, user: UserCreate):
+        db_user = User(email=user.email, name=user.name, hashed_password=user.password, roles=[])
         self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
+        await self.db.commit()
         return db_user
 
-    def get_multi(self, skip: int = 0, limit: int = 10):
-        return self.db.query(User).offset(skip).limit(limit).all()
+    async def get_multi(self, skip: int = 0, limit: int = 10):
+        result = await self.db.execute(select(User).offset(skip).limit(limit))
+        return result.scalars().all()
 
-    def assign_role(self, user_id: int, role_id: int):
+    async def assign_role(self, user_id: int, role_id: int):
         """Assign a role to a user"""
-        user = self.db.query(User).filter(User.id == user_id).first()
-        role = self.db.query(Role).filter(Role.id == role_id).first()
+        user = await self.get_user_with_roles(user_id)
+        role = await self.db.get(Role, role_id)
         
         if user and role:
             if role not in user.roles:
                 user.roles.append(role)
-                self.db.commit()
+                await self.db.commit()
                 return True
         return False
 
-    def remove_role(self, user_id: int, role_id: int):
+    async def remove_role(self, user_id: int, role_id: int):
         """Remove a role from a user"""
-        user = self.db.query(User).filter(User.id == user_id).first()
-        role = self.db.query(Role).filter(Role.id == role_id).first()
+        user = await self.get_user_with_roles(user_id)
+        role = await self.db.get(Role, role_id)
         
         if user and role:
             if role in user.roles:
                 user.roles.remove(role)
-                self.db.commit()
+                await self.db.commit()
                 return True
         return False
 
-    def get_user_with_roles(self, user_id: int):
+    async def get_user_with_roles(self, user_id: int):
         """Get a user with their roles loaded"""
-        return self.db.query(User).filter(User.id == user_id).first()
+        result = await self.db.execute(
+            select(User).options(selectinload(User.roles)).where(User.id == user_id)
+        )
+        return result.scalars().first()
 
-    def get_users_with_roles(self, skip: int = 0, limit: int = 10):
-        """Get users with their roles loaded"""
-        return self.db.query(User).offset(skip).limit(limit).all()
+    async def get_users_with_roles(self, skip: int = 0, limit: int = 10):
+        """Get users with their roles loaded (offset pagination, compatibility path)"""
+        result = await self.db.execute(
+            select(User).options(selectinload(User.roles)).order_by(User.id).offset(skip).limit(limit)
+        )
+        return result.scalars().all()
+
+    async def get_users_with_roles_page(self, limit: int = 10, cursor: Optional[str] = None):
+        """Get a page of users with their roles after cursor, and the cursor of the next page"""
+        return await keyset_page(self.db, select(User).options(selectinload(User.roles)), [User.id], limit, cursor)
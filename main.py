@@ -11,17 +11,28 @@ from opentelemetry.exporter.prometheus import PrometheusMetricReader
 from opentelemetry.sdk.metrics import MeterProvider
 from opentelemetry import trace
 import sqlalchemy as sa
-import redis.asyncio as redis
 import os
-from api import auth, show, ticket, booking
-from core.database import engine, Base, seed_roles
+from api import auth, show, ticket, booking, waiting_room
+from core.database import engine, async_engine, run_migrations, seed_roles
 from contextlib import asynccontextmanager
 from services.shows_consumer import start_consumer_thread
+from services.ticket_projection_consumer import start_projection_consumer_thread
 import time
 import asyncio
 from daos.booking import BookingDAO
+from daos.show_availability import ShowAvailabilityDAO, AVAILABILITY_FLUSHER_LOCK_KEY
 from services.booking_consumer import booking_consumer
-from core.database import SessionLocal
+from core.database import AsyncSessionLocal
+from core.redis import init_redis, close_redis, get_redis
+from core.config import settings
+from core.cache import listen_for_invalidations
+from services.waiting_room import waiting_room as waiting_room_service
+from services.outbox_relay import outbox_relay
+from services.booking_kafka import booking_producer
+from core.elasticsearch import async_es_client, ELASTICSEARCH_SHOWS_INDEX
+from models.show import Show
+from models.ticket import Ticket, TicketStatus
+from daos.show_search import show_document
 import requests
 from kafka import KafkaProducer
 
@@ -63,49 +74,137 @@ def wait_for_kafka():
     
     raise Exception("Kafka failed to start within expected time")
 
+async def expire_bookings_task():
+    """Background task that expires holds within seconds of their expires_at"""
+    while True:
+        due = 0
+        try:
+            async with AsyncSessionLocal() as db:
+                dao = BookingDAO(db, get_redis())
+                due = await dao.expire_due_bookings(settings.BOOKING_EXPIRY_BATCH_SIZE)
+        except Exception as e:
+            print(f"Error in expiry task: {e}")
+        
+        # Keep draining while whole batches are due, otherwise wait for the next tick
+        if due < settings.BOOKING_EXPIRY_BATCH_SIZE:
+            await asyncio.sleep(settings.BOOKING_EXPIRY_SWEEP_SECONDS)
+
+
 async def cleanup_expired_bookings_task():
-    """Background task to clean up expired bookings every 5 minutes"""
+    """Background safety net: full scan for expired holds missing from the expiry queue"""
     while True:
+        await asyncio.sleep(settings.BOOKING_EXPIRY_RECONCILE_SECONDS)
         try:
-            db = SessionLocal()
-            dao = BookingDAO(db)
-            await dao.cleanup_expired_bookings()
-            await dao.close_redis_connection()
-            db.close()
+            async with AsyncSessionLocal() as db:
+                dao = BookingDAO(db, get_redis())
+                await dao.cleanup_expired_bookings(settings.BOOKING_CLEANUP_CHUNK_SIZE)
         except Exception as e:
             print(f"Error in cleanup task: {e}")
-        
-        # Wait 5 minutes before next cleanup
-        await asyncio.sleep(300)
+
+
+async def availability_writeback_task():
+    """Background task that copies changed Redis availability counters to shows.available_tickets"""
+    while True:
+        await asyncio.sleep(settings.AVAILABILITY_FLUSH_SECONDS)
+        try:
+            redis_client = get_redis()
+            # One worker writes back per interval
+            acquired = await redis_client.set(
+                AVAILABILITY_FLUSHER_LOCK_KEY, 1, nx=True, px=int(settings.AVAILABILITY_FLUSH_SECONDS * 1000))
+            if not acquired:
+                continue
+            dao = ShowAvailabilityDAO(redis_client)
+            async with AsyncSessionLocal() as db:
+                while await dao.flush_to_db(db, settings.AVAILABILITY_FLUSH_BATCH_SIZE) == settings.AVAILABILITY_FLUSH_BATCH_SIZE:
+                    pass
+        except Exception as e:
+            print(f"Error in availability write-back task: {e}")
+
+
+async def seed_search_double():
+    """Load every show into the in-memory search double (SEARCH_BACKEND=memory).
+
+    No ticket projection consumer runs in this mode, so the availability
+    fields are counted once here and are not kept up to date.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            sa.select(Ticket.show_id, sa.func.count(), sa.func.min(Ticket.price), sa.func.max(Ticket.price))
+            .where(Ticket.status == TicketStatus.available)
+            .group_by(Ticket.show_id)
+        )
+        availability = {
+            show_id: {"available_tickets": count, "min_price": float(min_price), "max_price": float(max_price)}
+            for show_id, count, min_price, max_price in result
+        }
+        shows = await db.stream_scalars(sa.select(Show))
+        async for show in shows:
+            fields = availability.get(show.id, {"available_tickets": 0, "min_price": None, "max_price": None})
+            await async_es_client.index(index=ELASTICSEARCH_SHOWS_INDEX, id=show.id, document={
+                **show_document(show.id, show.name, show.location, show.start_time.isoformat(),
+                                show.description, show.performer),
+                **fields,
+                "sold_out": fields["available_tickets"] == 0
+            })
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("Starting FastAPI application...")
     
     print("Checking dependencies...")
-    wait_for_elasticsearch()
+    if settings.SEARCH_BACKEND != "memory":
+        wait_for_elasticsearch()
     wait_for_kafka()
     
     print("All dependencies are ready!")
 
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Shared Redis connection pool for the whole process
+    await init_redis()
+
+    # Bring the schema up to the latest migration
+    run_migrations()
     
     # Seed roles table
     seed_roles()
-    start_consumer_thread()
-
-    # Start background cleanup task
+    if settings.SEARCH_BACKEND == "memory":
+        await seed_search_double()
+    else:
+        start_consumer_thread()
+        start_projection_consumer_thread()
+
+    # Drop entries other workers invalidate from this worker's in-process caches
+    if settings.LOCAL_CACHE_ENABLED:
+        asyncio.create_task(listen_for_invalidations(get_redis()))
+
+    # Start background expiry tasks
+    asyncio.create_task(expire_bookings_task())
     asyncio.create_task(cleanup_expired_bookings_task())
+    asyncio.create_task(availability_writeback_task())
+
+    # Publish booking events committed to the outbox
+    await booking_producer.start()
+    asyncio.create_task(outbox_relay.run())
+
+    # Admit users from waiting room queues at their configured rate
+    asyncio.create_task(waiting_room_service.run_admission_loop(get_redis()))
 
     # Start booking event consumer
     asyncio.create_task(asyncio.to_thread(booking_consumer.start_consuming))
     yield
 
+    # Deliver whatever the relay already handed to the producer
+    await booking_producer.close()
+    await async_es_client.close()
+    await close_redis()
+    await async_engine.dispose()
+
 app = FastAPI(lifespan=lifespan)
 app.include_router(auth.router)
 app.include_router(show.router)
 app.include_router(ticket.router)
 app.include_router(booking.router)
+app.include_router(waiting_room.router)
 
 
 # Prometheus metrics
@@ -129,10 +228,6 @@ def root():
     return {"message": "Hello world, FastAPI!"}
 
 
-# Redis setup
-REDIS_URL = os.getenv("REDIS_URL")
-redis_client = redis.from_url(REDIS_URL)
-
 # OpenTelemetry setup
 resource = Resource(attributes={SERVICE_NAME: "fastapi-app"})
 tracer_provider = TracerProvider(resource=resource)
@@ -141,7 +236,7 @@ trace.set_tracer_provider(tracer_provider)
 # Instrumentations
 FastAPIInstrumentor.instrument_app(app)
 RedisInstrumentor().instrument()
-SQLAlchemyInstrumentor().instrument(engine=engine)
+SQLAlchemyInstrumentor().instrument(engines=[engine, async_engine.sync_engine])
 
 # Prometheus metrics exporter
 metric_reader = PrometheusMetricReader()
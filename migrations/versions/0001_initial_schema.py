@@ -0,0 +1,89 @@
+"""Initial schema, as previously created by Base.metadata.create_all
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_initial_schema"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ticket_status = sa.Enum("available", "reserved", "sold", name="ticketstatus")
+booking_status = sa.Enum("reserved", "confirmed", "cancelled", "expired", name="bookingstatus")
+
+
+def upgrade():
+    op.create_table(
+        "roles",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True),
+    )
+    op.create_index("ix_roles_id", "roles", ["id"])
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "user_roles",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("role_id", sa.Integer(), sa.ForeignKey("roles.id"), primary_key=True),
+    )
+
+    op.create_table(
+        "shows",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("location", sa.String(), nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("total_tickets", sa.Integer(), nullable=False),
+        sa.Column("available_tickets", sa.Integer(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("performer", sa.String(), nullable=True),
+    )
+    op.create_index("ix_shows_id", "shows", ["id"])
+
+    op.create_table(
+        "tickets",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("show_id", sa.Integer(), sa.ForeignKey("shows.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("status", ticket_status, nullable=False),
+        sa.Column("price", sa.Numeric(10, 2), nullable=False),
+        sa.Column("seat", sa.String(), nullable=True),
+    )
+    op.create_index("ix_tickets_id", "tickets", ["id"])
+
+    op.create_table(
+        "bookings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("tickets.id"), nullable=False),
+        sa.Column("status", booking_status, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("confirmed_at", sa.DateTime(), nullable=True),
+        sa.Column("cancelled_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_bookings_id", "bookings", ["id"])
+
+
+def downgrade():
+    op.drop_table("bookings")
+    op.drop_table("tickets")
+    op.drop_table("shows")
+    op.drop_table("user_roles")
+    op.drop_table("users")
+    op.drop_table("roles")
+    booking_status.drop(op.get_bind(), checkfirst=True)
+    ticket_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,26 @@
+"""Fencing tokens for Redis holds and batch booking groups
+
+Revision ID: 0002_hold_fencing_columns
+Revises: 0001_initial_schema
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0002_hold_fencing_columns"
+down_revision = "0001_initial_schema"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # IF NOT EXISTS: databases created by create_all after these columns were
+    # added to the models are stamped at 0001 but already have them
+    op.execute("ALTER TABLE tickets ADD COLUMN IF NOT EXISTS fence_token BIGINT NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE bookings ADD COLUMN IF NOT EXISTS lock_token BIGINT")
+    op.execute("ALTER TABLE bookings ADD COLUMN IF NOT EXISTS group_id VARCHAR")
+
+
+def downgrade():
+    op.drop_column("bookings", "group_id")
+    op.drop_column("bookings", "lock_token")
+    op.drop_column("tickets", "fence_token")
@@ -0,0 +1,45 @@
+"""Indexes for the booking, ticket and expiry hot paths
+
+Revision ID: 0003_hot_path_indexes
+Revises: 0002_hold_fencing_columns
+Create Date: 2026-10-17
+
+Built CONCURRENTLY so existing deployments keep taking bookings while the
+indexes are created.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_hot_path_indexes"
+down_revision = "0002_hold_fencing_columns"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_bookings_reserved_expires_at", "bookings", ["expires_at"], "status = 'reserved'"),
+    ("ix_bookings_status_expires_at", "bookings", ["status", "expires_at"], None),
+    ("ix_bookings_user_id_created_at", "bookings", ["user_id", "created_at"], None),
+    ("ix_bookings_ticket_id", "bookings", ["ticket_id"], None),
+    ("ix_tickets_show_id_status", "tickets", ["show_id", "status"], None),
+    ("ix_tickets_show_id_available", "tickets", ["show_id", "id"], "status = 'available'"),
+    ("ix_tickets_user_id", "tickets", ["user_id"], None),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
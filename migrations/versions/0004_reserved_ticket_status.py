@@ -0,0 +1,37 @@
+"""Mark tickets under a live reservation as reserved
+
+Revision ID: 0004_reserved_ticket_status
+Revises: 0003_hot_path_indexes
+Create Date: 2026-10-17
+
+Booking transitions are now conditional on the ticket status
+(available -> reserved -> sold/available). Reservations made before that
+left their ticket available; move them over so they can still be
+confirmed, cancelled and expired.
+"""
+from alembic import op
+
+revision = "0004_reserved_ticket_status"
+down_revision = "0003_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        UPDATE tickets SET status = 'reserved'
+        FROM bookings
+        WHERE bookings.ticket_id = tickets.id
+          AND bookings.status = 'reserved'
+          AND tickets.status = 'available'
+    """)
+
+
+def downgrade():
+    op.execute("""
+        UPDATE tickets SET status = 'available'
+        FROM bookings
+        WHERE bookings.ticket_id = tickets.id
+          AND bookings.status = 'reserved'
+          AND tickets.status = 'reserved'
+    """)
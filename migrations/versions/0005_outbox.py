@@ -0,0 +1,31 @@
+"""Transactional outbox for booking events
+
+Revision ID: 0005_outbox
+Revises: 0004_reserved_ticket_status
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005_outbox"
+down_revision = "0004_reserved_ticket_status"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "outbox",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("topic", sa.String(), nullable=False),
+        sa.Column("key", sa.String(), nullable=True),
+        sa.Column("event_type", sa.String(), nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_outbox_created_at", "outbox", ["created_at"])
+
+
+def downgrade():
+    op.drop_table("outbox")
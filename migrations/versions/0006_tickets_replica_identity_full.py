@@ -0,0 +1,25 @@
+"""Log full before images of ticket rows
+
+Revision ID: 0006_tickets_replica_identity_full
+Revises: 0005_outbox
+Create Date: 2026-10-17
+
+The ticket projection consumer turns Debezium change events into per-show
+availability deltas, which needs the status, price and seat a ticket had
+before each update or delete. With the default replica identity only the
+primary key is logged.
+"""
+from alembic import op
+
+revision = "0006_tickets_replica_identity_full"
+down_revision = "0005_outbox"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE tickets REPLICA IDENTITY FULL")
+
+
+def downgrade():
+    op.execute("ALTER TABLE tickets REPLICA IDENTITY DEFAULT")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Enum as SQLEnum, DateTime, String
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey, Enum as SQLEnum, DateTime, String, Index, text
 from enum import Enum
 from sqlalchemy.orm import relationship
 from core.database import Base
@@ -12,6 +12,13 @@ class BookingStatus(str, Enum):
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Expiry sweeps only ever look at live reservations
+        Index("ix_bookings_reserved_expires_at", "expires_at", postgresql_where=text("status = 'reserved'")),
+        Index("ix_bookings_status_expires_at", "status", "expires_at"),
+        Index("ix_bookings_user_id_created_at", "user_id", "created_at"),
+        Index("ix_bookings_ticket_id", "ticket_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -21,6 +28,8 @@ class Booking(Base):
     confirmed_at = Column(DateTime, nullable=True)
     cancelled_at = Column(DateTime, nullable=True)
     expires_at = Column(DateTime, nullable=False)  # When the reservation expires
+    lock_token = Column(BigInteger, nullable=True)  # Fencing token of the Redis hold
+    group_id = Column(String, nullable=True)  # Shared by bookings made in one batch
     
     # Relationships
     user = relationship("User", backref="bookings")
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, BigInteger, String, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from core.database import Base
+from datetime import datetime
+
+class OutboxEvent(Base):
+    """Event written in the same transaction as the change it describes,
+    published to Kafka afterwards by the outbox relay"""
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index("ix_outbox_created_at", "created_at"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    topic = Column(String, nullable=False)
+    key = Column(String, nullable=True)  # Kafka message key; events with one key stay ordered
+    event_type = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Enum as SQLEnum, String, Numeric
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey, Enum as SQLEnum, String, Numeric, Index, text
 from enum import Enum
 from sqlalchemy.orm import relationship
 from core.database import Base
@@ -10,6 +10,12 @@ class TicketStatus(str, Enum):
 
 class Ticket(Base):
     __tablename__ = "tickets"
+    __table_args__ = (
+        Index("ix_tickets_show_id_status", "show_id", "status"),
+        # Seat lookups for a show only care about what is still for sale
+        Index("ix_tickets_show_id_available", "show_id", "id", postgresql_where=text("status = 'available'")),
+        Index("ix_tickets_user_id", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     show_id = Column(Integer, ForeignKey("shows.id"), nullable=False)
@@ -17,5 +23,7 @@ class Ticket(Base):
     status = Column(SQLEnum(TicketStatus), default=TicketStatus.available, nullable=False)
     price = Column(Numeric(10, 2), nullable=False)
     seat = Column(String, nullable=True)
+    # Highest fencing token from a Redis hold that has written to this ticket
+    fence_token = Column(BigInteger, default=0, server_default="0", nullable=False)
 
     show = relationship("Show", back_populates="tickets")
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, Field, ConfigDict, field_validator
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 
@@ -8,10 +8,22 @@ class BookingCreate(BaseModel):
     ticket_id: int = Field(..., description="ID of the ticket to book")
 
 
+class BookingBatchCreate(BaseModel):
+    ticket_ids: List[int] = Field(..., min_length=1, max_length=10, description="IDs of the tickets to book together")
+
+    @field_validator("ticket_ids")
+    @classmethod
+    def ticket_ids_unique(cls, ticket_ids: List[int]) -> List[int]:
+        if len(set(ticket_ids)) != len(ticket_ids):
+            raise ValueError("ticket_ids must not contain duplicates")
+        return ticket_ids
+
+
 class BookingOut(BaseModel):
     id: int
     user_id: int
     ticket_id: int
+    group_id: Optional[str] = None
     status: str
     created_at: datetime
     confirmed_at: Optional[datetime]
@@ -30,10 +42,23 @@ class BookingDetailOut(BookingOut):
     show_start_time: Optional[datetime] = None
 
 
+class BestAvailableRequest(BaseModel):
+    show_id: int
+    ticket_class: str = Field(..., description="Ticket class, e.g. VIP")
+    quantity: int = Field(..., ge=1, le=10)
+    allow_split: bool = Field(False, description="Accept non-adjacent seats when no block is free")
+
+
+class BookingBatchOut(BaseModel):
+    group_id: str
+    bookings: list[BookingOut]
+
+
 class BookingListResponse(BaseModel):
-    total_count: int
-    current_page: int
+    total_count: int  # cached for up to COUNT_CACHE_SECONDS
     total_pages: int
+    current_page: Optional[int] = None  # offset pagination only
+    next_cursor: Optional[str] = None  # cursor pagination only
     data: list[BookingOut]
 
 
@@ -0,0 +1,204 @@
+"""Fail when a hot DAO query stops using an index.
+
+Runs the DAO methods on the booking/ticket hot paths against a seeded
+database, captures the SQL they emit and EXPLAINs each statement. Any
+sequential scan that applies a filter (i.e. a WHERE clause Postgres had no
+index for) is reported and the command exits non-zero. Writes made by the
+DAOs are rolled back; statements whose DAO method also writes to Redis are
+run on their own instead.
+
+Point DATABASE_URL/REDIS_URL at a scratch environment; --seed inserts
+synthetic users, shows, tickets and bookings and ANALYZEs them first.
+
+Usage:
+    python -m scripts.check_query_plans --seed
+    python -m scripts.check_query_plans
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import async_engine, run_migrations
+from core.pagination import encode_cursor
+from core.redis import init_redis, close_redis
+from daos.booking import BookingDAO
+from daos.show import ShowDAO
+from daos.show_availability import ShowAvailabilityDAO
+from daos.ticket import TicketDAO
+from daos.user import UserDAO
+from models.booking import Booking
+from models.ticket import TicketStatus
+import models.show  # noqa: F401  (register every mapper used by the queries)
+import models.user  # noqa: F401
+
+SEED_STATEMENTS = [
+    """
+    INSERT INTO users (name, email, hashed_password)
+    SELECT 'Plan User ' || g, 'plan-user-' || g || '@example.com', 'not-a-password'
+    FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO shows (name, location, start_time, total_tickets, available_tickets, performer)
+    SELECT 'Plan Show ' || g, 'Hall ' || (g % 20), now() + g * interval '1 day',
+           :tickets_per_show, :tickets_per_show, 'Performer ' || (g % 50)
+    FROM generate_series(1, :shows) g
+    """,
+    """
+    INSERT INTO tickets (show_id, user_id, status, price, seat, fence_token)
+    SELECT s.id,
+           CASE WHEN t % 10 = 0 THEN u.first_id + (s.id * t) % :users END,
+           (CASE WHEN t % 10 = 0 THEN 'sold' ELSE 'available' END)::ticketstatus,
+           50, 'Regular-' || lpad(t::text, 3, '0'), 0
+    FROM shows s
+    CROSS JOIN generate_series(1, :tickets_per_show) t
+    CROSS JOIN (SELECT min(id) AS first_id FROM users WHERE email LIKE 'plan-user-%') u
+    WHERE s.name LIKE 'Plan Show %'
+    """,
+    """
+    INSERT INTO bookings (user_id, ticket_id, status, created_at, confirmed_at, expires_at)
+    SELECT t.user_id, t.id, 'confirmed', now() - interval '1 day', now() - interval '1 day',
+           now() - interval '1 day' + interval '10 minutes'
+    FROM tickets t
+    WHERE t.status = 'sold' AND t.seat LIKE 'Regular-%'
+    """,
+    """
+    INSERT INTO bookings (user_id, ticket_id, status, created_at, expires_at)
+    SELECT u.first_id + t.id % :users, t.id, 'reserved', now() - interval '20 minutes',
+           now() - interval '10 minutes'
+    FROM tickets t
+    CROSS JOIN (SELECT min(id) AS first_id FROM users WHERE email LIKE 'plan-user-%') u
+    WHERE t.status = 'available' AND t.id % 97 = 0
+    """,
+    """
+    UPDATE tickets SET status = 'reserved'
+    FROM bookings
+    WHERE bookings.ticket_id = tickets.id AND bookings.status = 'reserved'
+    """,
+]
+
+
+async def seed(users: int, shows: int, tickets_per_show: int):
+    params = {"users": users, "shows": shows, "tickets_per_show": tickets_per_show}
+    async with async_engine.begin() as conn:
+        for statement in SEED_STATEMENTS:
+            await conn.execute(text(statement), params)
+    async with async_engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE"))
+    await async_engine.dispose()
+    print(f"Seeded {users} users, {shows} shows, {shows * tickets_per_show} tickets")
+
+
+async def sample_ids(db: AsyncSession) -> dict:
+    row = (await db.execute(text(
+        "SELECT b.id AS booking_id, b.user_id, t.show_id, u.email "
+        "FROM bookings b JOIN tickets t ON t.id = b.ticket_id JOIN users u ON u.id = b.user_id "
+        "ORDER BY b.id DESC LIMIT 1"
+    ))).one()
+    return dict(row._mapping)
+
+
+def checks(ids: dict, redis_client):
+    """(name, coroutine factory) for every DAO query on a hot path"""
+    return [
+        ("users.get_by_email", lambda db: UserDAO(db).get_by_email(ids["email"])),
+        ("shows.get_show_by_id", lambda db: ShowDAO(db).get_show_by_id(ids["show_id"])),
+        ("availability.count_from_db", lambda db: ShowAvailabilityDAO.count_from_db(db, [ids["show_id"]])),
+        ("tickets.get_tickets_by_show_id", lambda db: TicketDAO(db).get_tickets_by_show_id(ids["show_id"])),
+        ("tickets.list_tickets", lambda db: TicketDAO(db).list_tickets(
+            show_id=ids["show_id"], status=TicketStatus.available)),
+        ("tickets.get_tickets_by_user_id", lambda db: TicketDAO(db).get_tickets_by_user_id(ids["user_id"])),
+        ("bookings.get_user_bookings", lambda db: BookingDAO(db, redis_client).get_user_bookings(ids["user_id"])),
+        ("tickets.list_tickets_page", lambda db: TicketDAO(db).list_tickets_page(
+            cursor=encode_cursor([0]), show_id=ids["show_id"], status=TicketStatus.available)),
+        ("bookings.get_user_bookings_page", lambda db: BookingDAO(db, redis_client).get_user_bookings_page(
+            ids["user_id"], cursor=encode_cursor([datetime.utcnow(), 2 ** 31 - 1]))),
+        ("bookings.count_user_bookings", lambda db: BookingDAO(db, redis_client).count_user_bookings(ids["user_id"])),
+        ("bookings.get_booking_with_details", lambda db: BookingDAO(db, redis_client).get_booking_with_details(
+            ids["booking_id"], ids["user_id"])),
+        # Only the statement: the DAO method would also release holds and adjust counters in Redis
+        ("bookings.cleanup_expired_bookings", lambda db: db.execute(
+            BookingDAO._expire_statement(Booking.id.in_(BookingDAO._overdue_chunk(100))))),
+    ]
+
+
+def seq_scans(plan: dict) -> List[str]:
+    """Relations read by a filtered sequential scan anywhere in a JSON plan"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and "Filter" in plan:
+        found.append(f"{plan.get('Relation Name')} (filter: {plan['Filter']})")
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def check() -> int:
+    redis_client = await init_redis()
+    captured: List[Tuple[str, str, object]] = []
+    current = {"name": None}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if current["name"] and not executemany and verb in ("SELECT", "UPDATE", "DELETE", "WITH"):
+            captured.append((current["name"], statement, parameters))
+
+    failures = 0
+    try:
+        async with async_engine.connect() as conn:
+            outer = await conn.begin()
+            # DAO commits only release a savepoint; everything is rolled back below
+            db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+            try:
+                ids = await sample_ids(db)
+                event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+                try:
+                    for name, run in checks(ids, redis_client):
+                        current["name"] = name
+                        await run(db)
+                finally:
+                    current["name"] = None
+                    event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+                for name, statement, parameters in captured:
+                    result = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+                    plan = result.scalar()
+                    plan = json.loads(plan) if isinstance(plan, str) else plan
+                    scans = seq_scans(plan[0]["Plan"])
+                    if scans:
+                        failures += 1
+                        print(f"FAIL {name}: sequential scan on {', '.join(scans)}")
+                        print(f"     {' '.join(statement.split())}")
+                    else:
+                        print(f"ok   {name}")
+            finally:
+                await db.close()
+                await outer.rollback()
+    finally:
+        await close_redis()
+        await async_engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN hot DAO queries and fail on sequential scans")
+    parser.add_argument("--seed", action="store_true", help="Migrate and insert synthetic data first")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--shows", type=int, default=200)
+    parser.add_argument("--tickets-per-show", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.seed:
+        run_migrations()
+        asyncio.run(seed(args.users, args.shows, args.tickets_per_show))
+    failures = asyncio.run(check())
+    if failures:
+        print(f"{failures} quer{'y' if failures == 1 else 'ies'} fell back to a sequential scan")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
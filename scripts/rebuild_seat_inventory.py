@@ -0,0 +1,38 @@
+"""Rebuild the Redis seat inventory from Postgres.
+
+Also raises the hold fencing counters to the tokens stored on the tickets,
+which is needed after Redis lost them (flush, failover, restore).
+
+Usage:
+    python -m scripts.rebuild_seat_inventory             # every show
+    python -m scripts.rebuild_seat_inventory --show-id 7 # a single show
+"""
+import argparse
+import asyncio
+from core.database import AsyncSessionLocal, async_engine
+from core.redis import init_redis, close_redis
+from daos.seat_inventory import SeatInventoryDAO
+import models.show  # noqa: F401  (register every mapper used by the queries)
+import models.user  # noqa: F401
+
+
+async def rebuild(show_id=None):
+    redis_client = await init_redis()
+    try:
+        async with AsyncSessionLocal() as db:
+            indexed = await SeatInventoryDAO(redis_client).rebuild_from_db(db, show_id)
+        print(f"Rebuilt seat inventory: {indexed} tickets indexed")
+    finally:
+        await close_redis()
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the Redis seat inventory from Postgres")
+    parser.add_argument("--show-id", type=int, default=None, help="Only rebuild this show")
+    args = parser.parse_args()
+    asyncio.run(rebuild(args.show_id))
+
+
+if __name__ == "__main__":
+    main()
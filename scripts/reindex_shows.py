@@ -0,0 +1,211 @@
+"""Rebuild the Elasticsearch shows index without search downtime.
+
+Creates the next versioned index (shows_v2, shows_v3, ...) with the current
+mapping and backfills it from Postgres: the show ids are split into ranges
+and every worker streams its range through a server-side cursor into bulk
+requests. The shows CDC topic is then replayed into the new index from the
+offsets noted before the backfill began, until it is within --max-lag
+events of the head. The shows alias is then swapped to the new index in one
+atomic update, and the events that reached the old index meanwhile are
+replayed as well. The CDC consumer writes through the alias throughout.
+
+Documents carry the offset of their last CDC event (backfilled ones none),
+so replaying an event older than what the index holds is a no-op. A concrete index named like the alias (from before aliases were
+used) is deleted by the swap; earlier versioned indices are kept for
+rollback and can be deleted once the new one has been checked.
+
+Usage:
+    python -m scripts.reindex_shows
+    python -m scripts.reindex_shows --workers 8 --batch-size 2000
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+from typing import Dict, List, Tuple
+from elasticsearch import AsyncElasticsearch
+from kafka import KafkaConsumer, TopicPartition
+from sqlalchemy import func, select
+from core.database import async_engine
+from core.elasticsearch import ELASTICSEARCH_URL, ELASTICSEARCH_SHOWS_INDEX, es_client
+from daos.show_search import SHOWS_MAPPING, show_document
+from models.show import Show
+from services.shows_consumer import KAFKA_BOOTSTRAP_SERVERS, SHOWS_TOPIC, add_action, flush_until_done, projection_dao
+
+
+def current_indices() -> Tuple[List[str], bool]:
+    """Indices the shows name resolves to, and whether it is an alias"""
+    if es_client.indices.exists_alias(name=ELASTICSEARCH_SHOWS_INDEX):
+        return list(es_client.indices.get_alias(name=ELASTICSEARCH_SHOWS_INDEX)), True
+    if es_client.indices.exists(index=ELASTICSEARCH_SHOWS_INDEX):
+        return [ELASTICSEARCH_SHOWS_INDEX], False
+    return [], False
+
+
+def next_index_name() -> str:
+    pattern = re.compile(rf"^{re.escape(ELASTICSEARCH_SHOWS_INDEX)}_v(\d+)$")
+    versions = [
+        int(match.group(1))
+        for match in map(pattern.match, es_client.indices.get(index=f"{ELASTICSEARCH_SHOWS_INDEX}*"))
+        if match
+    ]
+    # The pre-alias index counts as v1
+    return f"{ELASTICSEARCH_SHOWS_INDEX}_v{max(versions, default=1) + 1}"
+
+
+def create_index(name: str):
+    es_client.indices.create(index=name, body={
+        "mappings": SHOWS_MAPPING,
+        # No refreshes or replicas while bulk loading; restored before the swap
+        "settings": {"refresh_interval": "-1", "number_of_replicas": 0}
+    })
+
+
+def finish_index(name: str, replicas: int):
+    es_client.indices.put_settings(index=name, body={
+        "index": {"refresh_interval": None, "number_of_replicas": replicas}
+    })
+    es_client.indices.refresh(index=name)
+
+
+def cdc_consumer() -> Tuple[KafkaConsumer, List[TopicPartition]]:
+    """Consumer outside the shows consumer group, assigned every partition of the CDC topic"""
+    consumer = KafkaConsumer(
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        value_deserializer=lambda m: json.loads(m.decode('utf-8')) if m else None,
+        enable_auto_commit=False
+    )
+    partitions = [
+        TopicPartition(SHOWS_TOPIC, partition) for partition in consumer.partitions_for_topic(SHOWS_TOPIC) or ()
+    ]
+    consumer.assign(partitions)
+    return consumer, partitions
+
+
+def replay(consumer: KafkaConsumer, index: str, until: Dict[TopicPartition, int], batch_size: int) -> int:
+    """Apply CDC events to index until every partition reaches the given offset"""
+    replayed = 0
+    while any(consumer.position(partition) < offset for partition, offset in until.items()):
+        pending = {}
+        for partition, records in consumer.poll(timeout_ms=500, max_records=batch_size).items():
+            for message in records:
+                if message.offset < until[partition]:
+                    add_action(pending, message)
+                    replayed += 1
+            if records and records[-1].offset >= until[partition]:
+                # Overshot: the rest is for a later replay
+                consumer.seek(partition, until[partition])
+        flush_until_done(pending, index=index)
+    return replayed
+
+
+def lag(consumer: KafkaConsumer, partitions: List[TopicPartition]) -> int:
+    return sum(offset - consumer.position(partition) for partition, offset in consumer.end_offsets(partitions).items())
+
+
+async def backfill_range(client: AsyncElasticsearch, index: str, first_id: int, last_id: int, batch_size: int) -> int:
+    """Stream shows first_id..last_id through a server-side cursor into bulk requests"""
+    indexed = 0
+    async with async_engine.connect() as connection:
+        result = await connection.stream(
+            select(Show.id, Show.name, Show.location, Show.start_time, Show.description, Show.performer)
+            .where(Show.id.between(first_id, last_id))
+            .execution_options(yield_per=batch_size)
+        )
+        async for rows in result.partitions(batch_size):
+            projections = await asyncio.to_thread(projection_dao().get_many, [row.id for row in rows])
+            operations = []
+            for row in rows:
+                # The CDC replay only starts once the backfill is done, so nothing newer is there yet
+                operations.append({"index": {"_index": index, "_id": row.id}})
+                operations.append({
+                    **show_document(row.id, row.name, row.location, row.start_time.isoformat(),
+                                    row.description, row.performer),
+                    **projections.get(row.id, {})
+                })
+            response = await client.bulk(operations=operations)
+            if response["errors"]:
+                failed = next(item for item in response["items"] if item["index"].get("status", 500) >= 300)
+                raise RuntimeError(f"Backfill of {index} failed: {failed['index'].get('error')}")
+            indexed += len(rows)
+    return indexed
+
+
+async def backfill(index: str, workers: int, batch_size: int) -> int:
+    async with async_engine.connect() as connection:
+        first_id, last_id = (await connection.execute(select(func.min(Show.id), func.max(Show.id)))).one()
+    if first_id is None:
+        return 0
+
+    span = (last_id - first_id) // workers + 1
+    ranges = [(start, min(start + span - 1, last_id)) for start in range(first_id, last_id + 1, span)]
+    client = AsyncElasticsearch(ELASTICSEARCH_URL)
+    try:
+        counts = await asyncio.gather(*[
+            backfill_range(client, index, start, end, batch_size) for start, end in ranges
+        ])
+    finally:
+        await client.close()
+        await async_engine.dispose()
+    return sum(counts)
+
+
+def swap_alias(new_index: str, old_indices: List[str], is_alias: bool):
+    actions = [{"add": {"index": new_index, "alias": ELASTICSEARCH_SHOWS_INDEX}}]
+    if is_alias:
+        actions += [{"remove": {"index": old, "alias": ELASTICSEARCH_SHOWS_INDEX}} for old in old_indices]
+    else:
+        # The alias cannot be created while an index holds its name
+        actions += [{"remove_index": {"index": old}} for old in old_indices]
+    es_client.indices.update_aliases(body={"actions": actions})
+
+
+def reindex(workers: int, batch_size: int, max_lag: int, replicas: int):
+    old_indices, is_alias = current_indices()
+    new_index = next_index_name()
+    print(f"Building {new_index} (currently serving: {', '.join(old_indices) or 'nothing'})")
+    create_index(new_index)
+
+    consumer, partitions = cdc_consumer()
+    # Everything up to these offsets is committed in Postgres, so the backfill includes it
+    start_offsets = consumer.end_offsets(partitions)
+    for partition, offset in start_offsets.items():
+        consumer.seek(partition, offset)
+
+    started = time.monotonic()
+    indexed = asyncio.run(backfill(new_index, workers, batch_size))
+    print(f"Backfilled {indexed} shows in {time.monotonic() - started:.1f}s")
+
+    while True:
+        replayed = replay(consumer, new_index, consumer.end_offsets(partitions), batch_size)
+        remaining = lag(consumer, partitions)
+        print(f"Replayed {replayed} change events, {remaining} behind")
+        if remaining <= max_lag:
+            break
+
+    finish_index(new_index, replicas)
+    swap_offsets = consumer.end_offsets(partitions)
+    swap_alias(new_index, old_indices, is_alias)
+    print(f"{ELASTICSEARCH_SHOWS_INDEX} now points at {new_index}")
+
+    # Changes the consumer wrote to the old index before the swap
+    replayed = replay(consumer, new_index, swap_offsets, batch_size)
+    consumer.close()
+    print(f"Replayed {replayed} change events written during the swap")
+    if is_alias:
+        print(f"Previous indices kept for rollback: {', '.join(old_indices)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the Elasticsearch shows index behind its alias")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel backfill workers")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per bulk request")
+    parser.add_argument("--max-lag", type=int, default=100, help="CDC events the new index may trail by at the swap")
+    parser.add_argument("--replicas", type=int, default=1, help="Replicas of the new index once built")
+    args = parser.parse_args()
+    reindex(args.workers, args.batch_size, args.max_lag, args.replicas)
+
+
+if __name__ == "__main__":
+    main()
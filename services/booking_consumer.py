@@ -1,19 +1,54 @@
 import json
-import asyncio
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
 from kafka import KafkaConsumer
 from kafka.errors import KafkaError
+from prometheus_client import Counter, Histogram
 import os
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import time
+import redis
+from core.config import settings
+from services.notifier import Notification, Notifier, get_notifier
+from services.notification_coalescer import NotificationCoalescer, UserDigest
+
+BOOKING_EVENTS_PROCESSED = Counter(
+    'booking_events_processed_total', 'Booking events handled by the consumer', ['outcome'])
+BOOKING_EVENT_BATCH_SECONDS = Histogram(
+    'booking_event_batch_seconds', 'Time to notify and commit one coalescing window of booking events')
+NOTIFICATIONS_SENT = Counter(
+    'booking_notifications_sent_total', 'Notifications sent for booking events', ['kind'])
+
+# Processed event ids, so redelivered events do not notify twice
+PROCESSED_EVENT_KEY = "booking_events:processed:{}"
+
 
 class BookingEventConsumer:
-    def __init__(self):
+    """Consumes booking events and notifies users.
+
+    Events are buffered for BOOKING_NOTIFICATION_WINDOW_SECONDS and folded
+    into one digest per user (see NotificationCoalescer). Digests are sent
+    on single-threaded lanes picked by user id, so one user's mail goes out
+    in order while different users proceed in parallel. Offsets are
+    committed only once every digest of the window has been sent.
+    """
+
+    def __init__(self, notifier: Optional[Notifier] = None, workers: int = settings.BOOKING_CONSUMER_WORKERS):
         self.bootstrap_servers = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
         self.topic = os.getenv("BOOKING_TOPIC", "booking-events")
         self.consumer = None
         self.running = False
-    
+        self.notifier = notifier
+        self.workers = workers
+        self.coalescer = NotificationCoalescer(
+            window_seconds=settings.BOOKING_NOTIFICATION_WINDOW_SECONDS,
+            max_events=settings.BOOKING_NOTIFICATION_MAX_BUFFERED
+        )
+        self._lanes: List[ThreadPoolExecutor] = []
+        self._redis = None
+        self._uncommitted = False
+
     def _get_consumer(self):
         """Get or create Kafka consumer"""
         if self.consumer is None:
@@ -23,137 +58,260 @@ class BookingEventConsumer:
                 value_deserializer=lambda m: json.loads(m.decode('utf-8')),
                 key_deserializer=lambda k: k.decode('utf-8') if k else None,
                 auto_offset_reset='latest',
-                enable_auto_commit=True,
+                enable_auto_commit=False,
+                max_poll_records=settings.BOOKING_CONSUMER_MAX_POLL_RECORDS,
                 group_id='booking-email-service',
                 consumer_timeout_ms=1000
             )
         return self.consumer
-    
-    def process_booking_event(self, message: Dict[str, Any]):
-        """Process a booking event and send email notification"""
-        try:
-            event_type = message.get("event_type")
-            booking_data = message.get("booking", {})
-            user_data = message.get("user", {})
-            
-            print(f"Processing booking event: {event_type}")
-            print(f"Booking ID: {booking_data.get('id')}")
-            print(f"User: {user_data.get('name')} ({user_data.get('email')})")
-            
-            # Send email notification based on event type
-            if event_type == "booking_created":
-                self._send_booking_confirmation_email(user_data, booking_data)
-            elif event_type == "booking_confirmed":
-                self._send_booking_confirmed_email(user_data, booking_data)
-            elif event_type == "booking_cancelled":
-                self._send_booking_cancelled_email(user_data, booking_data)
-            else:
-                print(f"Unknown event type: {event_type}")
-                
-        except Exception as e:
-            print(f"Error processing booking event: {e}")
-    
-    def _send_booking_confirmation_email(self, user_data: Dict[str, Any], booking_data: Dict[str, Any]):
-        """Send booking confirmation email (mocked)"""
-        print("=" * 60)
-        print("📧 EMAIL NOTIFICATION: Booking Confirmation")
-        print("=" * 60)
-        print(f"To: {user_data.get('email')}")
-        print(f"Subject: Booking Confirmation - Booking #{booking_data.get('id')}")
-        print()
-        print(f"Dear {user_data.get('name')},")
-        print()
-        print(f"Your booking has been successfully created!")
-        print(f"Booking ID: {booking_data.get('id')}")
-        print(f"Ticket ID: {booking_data.get('ticket_id')}")
-        print(f"Status: {booking_data.get('status')}")
-        print(f"Created: {booking_data.get('created_at')}")
-        print(f"Expires: {booking_data.get('expires_at')}")
-        print()
-        print("Please confirm your booking within 10 minutes to secure your ticket.")
-        print("If you don't confirm within this time, your reservation will expire.")
-        print()
-        print("Thank you for choosing our service!")
-        print("=" * 60)
-    
-    def _send_booking_confirmed_email(self, user_data: Dict[str, Any], booking_data: Dict[str, Any]):
-        """Send booking confirmed email (mocked)"""
-        print("=" * 60)
-        print("📧 EMAIL NOTIFICATION: Booking Confirmed")
-        print("=" * 60)
-        print(f"To: {user_data.get('email')}")
-        print(f"Subject: Booking Confirmed - Booking #{booking_data.get('id')}")
-        print()
-        print(f"Dear {user_data.get('name')},")
-        print()
-        print(f"Great news! Your booking has been confirmed!")
-        print(f"Booking ID: {booking_data.get('id')}")
-        print(f"Ticket ID: {booking_data.get('ticket_id')}")
-        print(f"Status: {booking_data.get('status')}")
-        print(f"Confirmed: {booking_data.get('confirmed_at')}")
-        print()
-        print("Your ticket is now secured and ready for the event.")
-        print("Please arrive at the venue at least 30 minutes before the show starts.")
-        print()
-        print("We look forward to seeing you at the event!")
-        print("=" * 60)
-    
-    def _send_booking_cancelled_email(self, user_data: Dict[str, Any], booking_data: Dict[str, Any]):
-        """Send booking cancelled email (mocked)"""
-        print("=" * 60)
-        print("📧 EMAIL NOTIFICATION: Booking Cancelled")
-        print("=" * 60)
-        print(f"To: {user_data.get('email')}")
-        print(f"Subject: Booking Cancelled - Booking #{booking_data.get('id')}")
-        print()
-        print(f"Dear {user_data.get('name')},")
-        print()
-        print(f"Your booking has been cancelled as requested.")
-        print(f"Booking ID: {booking_data.get('id')}")
-        print(f"Ticket ID: {booking_data.get('ticket_id')}")
-        print(f"Status: {booking_data.get('status')}")
-        print(f"Cancelled: {booking_data.get('cancelled_at')}")
-        print()
-        print("The ticket has been released and is now available for other customers.")
-        print("If you have any questions, please contact our support team.")
-        print()
-        print("We hope to serve you again in the future!")
-        print("=" * 60)
-    
+
+    def _get_redis(self):
+        """Sync client for the dedup markers (the consumer runs on threads, not the event loop)"""
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(settings.REDIS_URL)
+        return self._redis
+
+    def _lane(self, key: Optional[str]) -> ThreadPoolExecutor:
+        return self._lanes[zlib.crc32((key or "").encode('utf-8')) % len(self._lanes)]
+
+    def buffer_events(self, messages: List[Dict[str, Any]]):
+        """Add polled events to the coalescer, skipping event ids already notified"""
+        event_ids = [message.get("event_id") for message in messages]
+        known = [event_id for event_id in event_ids if event_id]
+        seen = set()
+        if known:
+            with self._get_redis().pipeline(transaction=False) as pipe:
+                for event_id in known:
+                    pipe.exists(PROCESSED_EVENT_KEY.format(event_id))
+                seen = {event_id for event_id, flag in zip(known, pipe.execute()) if flag}
+
+        for message, event_id in zip(messages, event_ids):
+            if event_id in seen:
+                BOOKING_EVENTS_PROCESSED.labels(outcome="duplicate").inc()
+            elif not self.coalescer.add(message):
+                print(f"Unknown event type: {message.get('event_type')}")
+
+    def handle_digest(self, digest: UserDigest):
+        """Send one user's digest, retrying transient failures, then mark its events processed"""
+        for attempt in range(settings.BOOKING_CONSUMER_MAX_ATTEMPTS):
+            try:
+                kind, notification = self._digest_email(digest)
+                self.notifier.send(notification)
+                break
+            except Exception as e:
+                if attempt + 1 == settings.BOOKING_CONSUMER_MAX_ATTEMPTS:
+                    BOOKING_EVENTS_PROCESSED.labels(outcome="failed").inc(digest.event_count)
+                    print(f"Giving up on notifying user {digest.user.get('id')}: {e}")
+                    return
+                time.sleep(0.5 * 2 ** attempt)
+
+        NOTIFICATIONS_SENT.labels(kind=kind).inc()
+        BOOKING_EVENTS_PROCESSED.labels(outcome="processed").inc(digest.event_count)
+        if digest.event_ids:
+            with self._get_redis().pipeline(transaction=False) as pipe:
+                for event_id in digest.event_ids:
+                    pipe.set(PROCESSED_EVENT_KEY.format(event_id), 1, ex=settings.BOOKING_CONSUMER_DEDUP_TTL)
+                pipe.execute()
+
+    def _digest_email(self, digest: UserDigest):
+        """Pick the email for a digest: the usual single-event mail when one suffices"""
+        user_data, bookings = digest.user, digest.bookings
+        statuses = {booking.get("status") for booking in bookings}
+        group_ids = {booking.get("group_id") for booking in bookings}
+
+        if len(bookings) == 1:
+            booking_data = bookings[0]
+            if booking_data.get("status") == "confirmed":
+                return "confirmed", self._booking_confirmed_email(user_data, booking_data)
+            if booking_data.get("status") == "cancelled":
+                return "cancelled", self._booking_cancelled_email(user_data, booking_data)
+            return "created", self._booking_created_email(user_data, booking_data)
+        if statuses == {"reserved"} and len(group_ids) == 1 and None not in group_ids:
+            return "group_created", self._booking_group_created_email(user_data, group_ids.pop(), bookings)
+        return "digest", self._booking_digest_email(user_data, bookings)
+
+    def _booking_created_email(self, user_data: Dict[str, Any], booking_data: Dict[str, Any]) -> Notification:
+        """Booking confirmation email"""
+        return Notification(
+            to=user_data.get('email'),
+            subject=f"Booking Confirmation - Booking #{booking_data.get('id')}",
+            body="\n".join([
+                f"Dear {user_data.get('name')},",
+                "",
+                "Your booking has been successfully created!",
+                f"Booking ID: {booking_data.get('id')}",
+                f"Ticket ID: {booking_data.get('ticket_id')}",
+                f"Status: {booking_data.get('status')}",
+                f"Created: {booking_data.get('created_at')}",
+                f"Expires: {booking_data.get('expires_at')}",
+                "",
+                "Please confirm your booking within 10 minutes to secure your ticket.",
+                "If you don't confirm within this time, your reservation will expire.",
+                "",
+                "Thank you for choosing our service!",
+            ])
+        )
+
+    def _booking_group_created_email(self, user_data: Dict[str, Any], group_id: str, bookings_data: List[Dict[str, Any]]) -> Notification:
+        """One confirmation email for a group booking"""
+        lines = [
+            f"Dear {user_data.get('name')},",
+            "",
+            "Your group booking has been successfully created!",
+            f"Group ID: {group_id}",
+        ]
+        for booking_data in bookings_data:
+            lines.append(f"  Booking #{booking_data.get('id')} - Ticket ID: {booking_data.get('ticket_id')}")
+        if bookings_data:
+            lines.append(f"Expires: {bookings_data[0].get('expires_at')}")
+        lines += [
+            "",
+            "Please confirm your bookings within 10 minutes to secure your tickets.",
+            "If you don't confirm within this time, your reservations will expire.",
+            "",
+            "Thank you for choosing our service!",
+        ]
+        return Notification(
+            to=user_data.get('email'),
+            subject=f"Booking Confirmation - {len(bookings_data)} tickets",
+            body="\n".join(lines)
+        )
+
+    def _booking_confirmed_email(self, user_data: Dict[str, Any], booking_data: Dict[str, Any]) -> Notification:
+        """Booking confirmed email"""
+        return Notification(
+            to=user_data.get('email'),
+            subject=f"Booking Confirmed - Booking #{booking_data.get('id')}",
+            body="\n".join([
+                f"Dear {user_data.get('name')},",
+                "",
+                "Great news! Your booking has been confirmed!",
+                f"Booking ID: {booking_data.get('id')}",
+                f"Ticket ID: {booking_data.get('ticket_id')}",
+                f"Status: {booking_data.get('status')}",
+                f"Confirmed: {booking_data.get('confirmed_at')}",
+                "",
+                "Your ticket is now secured and ready for the event.",
+                "Please arrive at the venue at least 30 minutes before the show starts.",
+                "",
+                "We look forward to seeing you at the event!",
+            ])
+        )
+
+    def _booking_cancelled_email(self, user_data: Dict[str, Any], booking_data: Dict[str, Any]) -> Notification:
+        """Booking cancelled email"""
+        return Notification(
+            to=user_data.get('email'),
+            subject=f"Booking Cancelled - Booking #{booking_data.get('id')}",
+            body="\n".join([
+                f"Dear {user_data.get('name')},",
+                "",
+                "Your booking has been cancelled as requested.",
+                f"Booking ID: {booking_data.get('id')}",
+                f"Ticket ID: {booking_data.get('ticket_id')}",
+                f"Status: {booking_data.get('status')}",
+                f"Cancelled: {booking_data.get('cancelled_at')}",
+                "",
+                "The ticket has been released and is now available for other customers.",
+                "If you have any questions, please contact our support team.",
+                "",
+                "We hope to serve you again in the future!",
+            ])
+        )
+
+    def _booking_digest_email(self, user_data: Dict[str, Any], bookings_data: List[Dict[str, Any]]) -> Notification:
+        """One email summarising several bookings that changed within a window"""
+        sections = [("confirmed", "Confirmed"), ("reserved", "Reserved - please confirm within 10 minutes"),
+                    ("cancelled", "Cancelled")]
+        lines = [
+            f"Dear {user_data.get('name')},",
+            "",
+            "Here is the latest on your bookings:",
+        ]
+        for status, title in sections:
+            matching = [booking for booking in bookings_data if booking.get("status") == status]
+            if matching:
+                lines += ["", f"{title}:"]
+                for booking_data in matching:
+                    lines.append(f"  Booking #{booking_data.get('id')} - Ticket ID: {booking_data.get('ticket_id')}")
+        lines += [
+            "",
+            "Thank you for choosing our service!",
+        ]
+        return Notification(
+            to=user_data.get('email'),
+            subject=f"Your bookings - {len(bookings_data)} updates",
+            body="\n".join(lines)
+        )
+
+    def _flush(self):
+        """Send every buffered digest, wait for all of them, then commit the offsets behind them"""
+        started = time.monotonic()
+        futures = [
+            self._lane(str(digest.user.get("id"))).submit(self.handle_digest, digest)
+            for digest in self.coalescer.drain()
+        ]
+        wait(futures)
+        self.consumer.commit()
+        self._uncommitted = False
+        BOOKING_EVENT_BATCH_SECONDS.observe(time.monotonic() - started)
+
     def start_consuming(self):
         """Start consuming booking events"""
         print("Starting booking event consumer...")
         self.running = True
-        
+        if self.notifier is None:
+            self.notifier = get_notifier()
+        self._lanes = [ThreadPoolExecutor(max_workers=1) for _ in range(self.workers)]
+
         try:
             consumer = self._get_consumer()
-            
+
             while self.running:
                 try:
                     # Poll for messages
-                    message_batch = consumer.poll(timeout_ms=1000)
-                    
-                    for topic_partition, messages in message_batch.items():
-                        for message in messages:
-                            self.process_booking_event(message.value)
-                            
+                    message_batch = consumer.poll(timeout_ms=200)
+                    messages = [message.value for records in message_batch.values() for message in records]
+                    if messages:
+                        self.buffer_events(messages)
+                        self._uncommitted = True
+
+                    # Only once the window's digests are out are its offsets safe to commit
+                    if self.coalescer.due() or (self._uncommitted and not len(self.coalescer)):
+                        self._flush()
+
+                except KafkaError as e:
+                    # e.g. a rebalance during commit: the window is redelivered and deduplicated
+                    print(f"Kafka error in consumer loop: {e}")
+                    time.sleep(1)
                 except Exception as e:
                     print(f"Error in consumer loop: {e}")
-                    time.sleep(1) 
-                    
+                    time.sleep(1)
+
         except KeyboardInterrupt:
             print("Stopping booking event consumer...")
         except Exception as e:
             print(f"Error in booking consumer: {e}")
         finally:
             self.stop_consuming()
-    
+
     def stop_consuming(self):
         """Stop consuming events"""
         self.running = False
+        if self.consumer and self._lanes and len(self.coalescer):
+            # Send what the window has so far rather than hold it until the next start
+            try:
+                self._flush()
+            except Exception as e:
+                print(f"Error flushing buffered notifications: {e}")
         if self.consumer:
             self.consumer.close()
             self.consumer = None
+        for lane in self._lanes:
+            lane.shutdown(wait=True)
+        self._lanes = []
+        if self.notifier:
+            self.notifier.close()
         print("Booking event consumer stopped.")
 
 # Global consumer instance
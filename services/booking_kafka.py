@@ -1,17 +1,41 @@
 import json
 import asyncio
+import time
 from kafka import KafkaProducer
 from kafka.errors import KafkaError
-from typing import Dict, Any
+from prometheus_client import Counter, Gauge, Histogram
+from typing import Dict, Any, Optional
 import os
-from datetime import datetime
+from core.config import settings
+
+KAFKA_PRODUCE_LATENCY = Histogram(
+    'kafka_produce_latency_seconds', 'Time from send() to broker acknowledgement',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+KAFKA_PRODUCER_QUEUE_DEPTH = Gauge(
+    'kafka_producer_queue_depth', 'Messages sent but not yet acknowledged')
+KAFKA_MESSAGES_PRODUCED = Counter(
+    'kafka_messages_produced_total', 'Messages acknowledged by the broker', ['topic'])
+KAFKA_PRODUCE_ERRORS = Counter(
+    'kafka_produce_errors_total', 'Messages the broker failed to accept', ['topic'])
+
 
 class BookingKafkaProducer:
+    """Non-blocking, batching Kafka producer for booking events.
+
+    send() hands the message to kafka-python's background sender and returns
+    an asyncio future that the delivery callbacks resolve, so no caller waits
+    on a round trip per message. Messages are batched for up to
+    KAFKA_LINGER_MS and compressed. At most KAFKA_MAX_PENDING messages can
+    be unacknowledged; further send() calls wait for room (backpressure).
+    """
+
     def __init__(self):
         self.bootstrap_servers = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
         self.topic = os.getenv("BOOKING_TOPIC", "booking-events")
         self.producer = None
-    
+        self._pending: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
     def _get_producer(self):
         """Get or create Kafka producer"""
         if self.producer is None:
@@ -21,49 +45,75 @@ class BookingKafkaProducer:
                 key_serializer=lambda k: k.encode('utf-8') if k else None,
                 retries=3,
                 retry_backoff_ms=100,
-                request_timeout_ms=5000
+                request_timeout_ms=5000,
+                # One request in flight per broker so retries cannot reorder a key's events
+                max_in_flight_requests_per_connection=1,
+                linger_ms=settings.KAFKA_LINGER_MS,
+                batch_size=settings.KAFKA_BATCH_SIZE,
+                compression_type=settings.KAFKA_COMPRESSION_TYPE,
+                buffer_memory=settings.KAFKA_BUFFER_MEMORY,
+                max_block_ms=settings.KAFKA_MAX_BLOCK_MS
             )
         return self.producer
-    
-    def send_booking_event(self, event_type: str, booking_data: Dict[str, Any], user_data: Dict[str, Any]):
-        """Send booking event to Kafka"""
+
+    async def start(self):
+        """Connect to the brokers off the event loop (called from main.lifespan)"""
+        self._loop = asyncio.get_running_loop()
+        self._pending = asyncio.Semaphore(settings.KAFKA_MAX_PENDING)
+        producer = await asyncio.to_thread(self._get_producer)
+        # Fetch topic metadata now so the first send() does not block on it
+        await asyncio.to_thread(producer.partitions_for, self.topic)
+
+    async def send(self, topic: str, key: Optional[str], value: Dict[str, Any]) -> asyncio.Future:
+        """Queue a message; the returned future resolves with its metadata once acknowledged"""
+        if self._pending is None:
+            await self.start()
+        await self._pending.acquire()
+        KAFKA_PRODUCER_QUEUE_DEPTH.inc()
+
+        delivered = self._loop.create_future()
+        started = time.monotonic()
+
+        def settle(result=None, error=None):
+            # Runs on the event loop; kafka-python calls back from its sender thread
+            self._pending.release()
+            KAFKA_PRODUCER_QUEUE_DEPTH.dec()
+            if error is None:
+                KAFKA_PRODUCE_LATENCY.observe(time.monotonic() - started)
+                KAFKA_MESSAGES_PRODUCED.labels(topic=topic).inc()
+                if not delivered.done():
+                    delivered.set_result(result)
+            else:
+                KAFKA_PRODUCE_ERRORS.labels(topic=topic).inc()
+                if not delivered.done():
+                    delivered.set_exception(error)
+
+        if self.producer is None:
+            settle(error=KafkaError("Producer is closed"))
+            return delivered
         try:
-            producer = self._get_producer()
-            
-            # Create event message
-            event_message = {
-                "event_type": event_type,
-                "timestamp": datetime.utcnow().isoformat(),
-                "booking": booking_data,
-                "user": user_data
-            }
-            
-            # Use booking_id as key for partitioning
-            key = str(booking_data.get("id", "unknown"))
-            
-            # Send message
-            future = producer.send(
-                self.topic,
-                key=key,
-                value=event_message
-            )
-            
-            # Wait for confirmation
-            record_metadata = future.get(timeout=10)
-            print(f"Booking event sent successfully: {event_type} for booking {booking_data.get('id')}")
-            return True
-            
+            # send() can block for up to KAFKA_MAX_BLOCK_MS on metadata or a full
+            # buffer: wait for it off the event loop, so only this caller waits
+            future = await asyncio.to_thread(self.producer.send, topic, key=key, value=value)
         except KafkaError as e:
-            print(f"Failed to send booking event: {e}")
-            return False
-        except Exception as e:
-            print(f"Unexpected error sending booking event: {e}")
-            return False
-    
-    def close(self):
-        """Close the producer"""
+            # Buffer full for longer than KAFKA_MAX_BLOCK_MS, or serialization failed
+            settle(error=e)
+            return delivered
+
+        future.add_callback(lambda metadata: self._loop.call_soon_threadsafe(settle, metadata))
+        future.add_errback(lambda exc: self._loop.call_soon_threadsafe(lambda: settle(error=exc)))
+        return delivered
+
+    async def flush(self, timeout: Optional[float] = None):
+        """Wait for every queued message to be sent"""
+        if self.producer:
+            await asyncio.to_thread(self.producer.flush, timeout)
+
+    async def close(self):
+        """Flush outstanding messages and close the producer (called on shutdown)"""
         if self.producer:
-            self.producer.close()
+            await self.flush(timeout=settings.KAFKA_SHUTDOWN_FLUSH_SECONDS)
+            await asyncio.to_thread(self.producer.close)
             self.producer = None
 
 # Global producer instance
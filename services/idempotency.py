@@ -0,0 +1,162 @@
+import asyncio
+import functools
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Optional, Type
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from prometheus_client import Counter
+from pydantic import BaseModel
+import redis.asyncio as redis
+from core.config import settings
+
+IDEMPOTENCY_REQUESTS = Counter(
+    'idempotency_requests_total', 'Requests carrying an Idempotency-Key', ['outcome'])
+
+# Responses that mean "not now" rather than "never": a retry with the same key
+# should run again instead of replaying them
+RETRYABLE_STATUS_CODES = {
+    status.HTTP_403_FORBIDDEN,  # waiting room admission
+    status.HTTP_409_CONFLICT,  # seat held by someone else
+    status.HTTP_429_TOO_MANY_REQUESTS,
+}
+
+# Request arguments that legitimately change between retries
+UNFINGERPRINTED_ARGS = {"idempotency_key", "x_admission_token"}
+
+
+class IdempotencyStore:
+    """Records the outcome of mutations by Idempotency-Key in Redis.
+
+    The first request with a key marks it in flight and runs; its status code
+    and body are stored for `ttl` seconds. Duplicates arriving meanwhile poll
+    for that outcome, later ones get it replayed without running the handler.
+    Server errors and RETRYABLE_STATUS_CODES are not stored.
+    """
+
+    def __init__(self, ttl: int, in_flight_ttl: int, wait_seconds: float, poll_seconds: float = 0.05):
+        self.ttl = ttl
+        self.in_flight_ttl = in_flight_ttl
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+
+    @staticmethod
+    def _record_key(user_id: int, scope: str, key: str) -> str:
+        return f"idempotency:{user_id}:{scope}:{key}"
+
+    async def run(
+        self,
+        redis_client: redis.Redis,
+        user_id: int,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        handler: Callable[[], Awaitable[Any]],
+        response_model: Optional[Type[BaseModel]] = None,
+        status_code: int = status.HTTP_200_OK
+    ) -> JSONResponse:
+        record_key = self._record_key(user_id, scope, key)
+        deadline = time.monotonic() + self.wait_seconds
+
+        while True:
+            in_flight = json.dumps({"state": "in_flight", "fingerprint": fingerprint})
+            if await redis_client.set(record_key, in_flight, nx=True, ex=self.in_flight_ttl):
+                break
+
+            raw = await redis_client.get(record_key)
+            if raw is None:
+                # The first attempt failed and gave the key up; take it over
+                continue
+            record = json.loads(raw)
+            if record["fingerprint"] != fingerprint:
+                IDEMPOTENCY_REQUESTS.labels(outcome="mismatch").inc()
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used for a different request"
+                )
+            if record["state"] == "done":
+                IDEMPOTENCY_REQUESTS.labels(outcome="replayed").inc()
+                return JSONResponse(
+                    record["body"], status_code=record["status"], headers={"Idempotent-Replayed": "true"})
+            if time.monotonic() >= deadline:
+                IDEMPOTENCY_REQUESTS.labels(outcome="in_flight").inc()
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress"
+                )
+            await asyncio.sleep(self.poll_seconds)
+
+        IDEMPOTENCY_REQUESTS.labels(outcome="executed").inc()
+        try:
+            result = await handler()
+        except HTTPException as exc:
+            if exc.status_code < 500 and exc.status_code not in RETRYABLE_STATUS_CODES:
+                await self._store(redis_client, record_key, fingerprint, exc.status_code, {"detail": exc.detail})
+            else:
+                await redis_client.delete(record_key)
+            raise
+        except BaseException:
+            await redis_client.delete(record_key)
+            raise
+
+        if response_model is not None:
+            result = response_model.model_validate(result, from_attributes=True)
+        body = jsonable_encoder(result)
+        await self._store(redis_client, record_key, fingerprint, status_code, body)
+        return JSONResponse(body, status_code=status_code)
+
+    async def _store(self, redis_client: redis.Redis, record_key: str, fingerprint: str, status_code: int, body):
+        record = {"state": "done", "fingerprint": fingerprint, "status": status_code, "body": body}
+        await redis_client.set(record_key, json.dumps(record), ex=self.ttl)
+
+
+def request_fingerprint(scope: str, arguments: dict) -> str:
+    """Stable hash of an endpoint's path/body arguments"""
+    payload = {}
+    for name, value in sorted(arguments.items()):
+        if name in UNFINGERPRINTED_ARGS:
+            continue
+        if isinstance(value, BaseModel):
+            payload[name] = value.model_dump(mode="json")
+        elif isinstance(value, (int, float, str, bool)):
+            payload[name] = value
+    return hashlib.sha256(json.dumps([scope, payload], sort_keys=True).encode()).hexdigest()
+
+
+def idempotent(response_model: Optional[Type[BaseModel]] = None, status_code: int = status.HTTP_200_OK):
+    """Make a route honour the Idempotency-Key header.
+
+    The route must take `idempotency_key`, `redis_client` and `current_user`
+    arguments. Requests without the header run unchanged.
+    """
+    def decorator(endpoint):
+        scope = endpoint.__name__
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            key = kwargs.get("idempotency_key")
+            if not key:
+                return await endpoint(*args, **kwargs)
+            return await idempotency_store.run(
+                kwargs["redis_client"],
+                kwargs["current_user"].id,
+                scope,
+                key,
+                request_fingerprint(scope, kwargs),
+                lambda: endpoint(*args, **kwargs),
+                response_model=response_model,
+                status_code=status_code
+            )
+
+        return wrapper
+    return decorator
+
+
+# Global idempotency store
+idempotency_store = IdempotencyStore(
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+    in_flight_ttl=settings.IDEMPOTENCY_IN_FLIGHT_SECONDS,
+    wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS
+)
@@ -0,0 +1,87 @@
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+from prometheus_client import Counter
+
+BOOKING_EVENTS_COALESCED = Counter(
+    'booking_events_coalesced_total', 'Booking events folded into another notification')
+
+# Booking status each event type leaves behind, for events from older producers
+EVENT_STATUS = {
+    "booking_created": "reserved",
+    "booking_group_created": "reserved",
+    "booking_confirmed": "confirmed",
+    "booking_cancelled": "cancelled",
+}
+
+
+class UserDigest(NamedTuple):
+    """Everything that happened to one user's bookings during a window"""
+    user: Dict[str, Any]
+    bookings: List[Dict[str, Any]]  # latest known data per booking, in first-seen order
+    event_ids: List[str]
+    event_count: int
+
+
+class NotificationCoalescer:
+    """Buffers booking events per user and folds them into one digest each.
+
+    Later events for a booking replace earlier ones (created then confirmed
+    is just confirmed). A user's bookings from the whole window, including
+    every seat of a group, end up in a single digest. Not thread-safe: used
+    from the consumer's poll loop only.
+    """
+
+    def __init__(self, window_seconds: float, max_events: int):
+        self.window_seconds = window_seconds
+        self.max_events = max_events
+        self._users: Dict[Any, Dict[str, Any]] = {}
+        self._events = 0
+        self._opened_at: Optional[float] = None
+
+    def __len__(self):
+        return self._events
+
+    def add(self, message: Dict[str, Any]) -> bool:
+        """Buffer one event; returns False for event types that do not notify"""
+        event_type = message.get("event_type")
+        if event_type not in EVENT_STATUS:
+            return False
+        user = message.get("user") or {}
+        if event_type == "booking_group_created":
+            bookings = message.get("bookings", [])
+        else:
+            bookings = [message.get("booking", {})]
+
+        entry = self._users.setdefault(user.get("id"), {"user": user, "bookings": {}, "event_ids": [], "events": 0})
+        entry["user"] = user
+        for booking in bookings:
+            booking = dict(booking)
+            booking.setdefault("status", EVENT_STATUS[event_type])
+            entry["bookings"][booking.get("id")] = booking
+        if message.get("event_id"):
+            entry["event_ids"].append(message["event_id"])
+        entry["events"] += 1
+
+        self._events += 1
+        if self._opened_at is None:
+            self._opened_at = time.monotonic()
+        return True
+
+    def due(self) -> bool:
+        """True once the oldest buffered event has waited a full window (or the buffer is full)"""
+        if not self._events:
+            return False
+        return self._events >= self.max_events or time.monotonic() - self._opened_at >= self.window_seconds
+
+    def drain(self) -> List[UserDigest]:
+        """Hand out one digest per user and empty the buffer"""
+        digests = []
+        for entry in self._users.values():
+            bookings = list(entry["bookings"].values())
+            digests.append(UserDigest(entry["user"], bookings, entry["event_ids"], entry["events"]))
+            # Events beyond one per digest never became an email of their own
+            BOOKING_EVENTS_COALESCED.inc(entry["events"] - 1)
+        self._users = {}
+        self._events = 0
+        self._opened_at = None
+        return digests
@@ -0,0 +1,109 @@
+import smtplib
+import threading
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from typing import NamedTuple
+from core.config import settings
+
+
+class Notification(NamedTuple):
+    to: str
+    subject: str
+    body: str
+
+
+class Notifier(ABC):
+    """Delivers notifications to users; implementations must be thread-safe"""
+
+    @abstractmethod
+    def send(self, notification: Notification):
+        """Deliver one notification, raising on failure so the caller can retry"""
+
+    def close(self):
+        pass
+
+
+class ConsoleNotifier(Notifier):
+    """Logs a one-line summary per notification (local development without SMTP)"""
+
+    def send(self, notification: Notification):
+        print(f"📧 {notification.to}: {notification.subject}")
+
+
+class SmtpNotifier(Notifier):
+    """Sends email over SMTP, keeping one connection open per worker thread"""
+
+    def __init__(self, host: str, port: int, sender: str, username: str = "", password: str = "",
+                 starttls: bool = False, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def _connection(self) -> smtplib.SMTP:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                connection.starttls()
+            if self.username:
+                connection.login(self.username, self.password)
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _drop_connection(self):
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            with self._connections_lock:
+                if connection in self._connections:
+                    self._connections.remove(connection)
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def send(self, notification: Notification):
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = notification.to
+        message["Subject"] = notification.subject
+        message.set_content(notification.body)
+
+        try:
+            self._connection().send_message(message)
+        except (smtplib.SMTPServerDisconnected, OSError):
+            # Stale pooled connection: reconnect once, then let the error propagate
+            self._drop_connection()
+            self._connection().send_message(message)
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                connection.quit()
+            except Exception:
+                pass
+
+
+def get_notifier() -> Notifier:
+    """Notifier backend selected by NOTIFIER_BACKEND ("console" or "smtp")"""
+    if settings.NOTIFIER_BACKEND == "smtp":
+        return SmtpNotifier(
+            host=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            sender=settings.SMTP_SENDER,
+            username=settings.SMTP_USERNAME,
+            password=settings.SMTP_PASSWORD,
+            starttls=settings.SMTP_STARTTLS
+        )
+    return ConsoleNotifier()
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime
+from prometheus_client import Counter, Gauge
+from sqlalchemy import select, delete, func, text
+from core.config import settings
+from core.database import AsyncSessionLocal
+from models.outbox import OutboxEvent
+from services.booking_kafka import booking_producer
+
+# Arbitrary pg_advisory_xact_lock key: one relay publishes at a time so events
+# with the same key reach Kafka in commit order
+OUTBOX_RELAY_LOCK_KEY = 7_242_020
+
+OUTBOX_PUBLISHED = Counter(
+    'outbox_events_published_total', 'Outbox events published to Kafka')
+OUTBOX_RELAY_LAG = Gauge(
+    'outbox_relay_lag_seconds', 'Age of the oldest outbox event not yet published')
+OUTBOX_PENDING = Gauge(
+    'outbox_pending_events', 'Outbox events waiting to be published')
+
+
+class OutboxRelay:
+    """Drains the outbox table to Kafka in id order, in batches"""
+
+    def __init__(self, batch_size: int, poll_seconds: float):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+
+    async def relay_batch(self) -> int:
+        """Publish up to batch_size events and delete them; returns how many were published"""
+        async with AsyncSessionLocal() as db:
+            locked = await db.scalar(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": OUTBOX_RELAY_LOCK_KEY})
+            if not locked:
+                return 0
+
+            result = await db.execute(
+                select(OutboxEvent).order_by(OutboxEvent.id).limit(self.batch_size)
+            )
+            events = result.scalars().all()
+            if not events:
+                OUTBOX_RELAY_LAG.set(0)
+                OUTBOX_PENDING.set(0)
+                return 0
+
+            OUTBOX_RELAY_LAG.set((datetime.utcnow() - events[0].created_at).total_seconds())
+            futures = [await booking_producer.send(event.topic, event.key, event.payload) for event in events]
+            results = await asyncio.gather(*futures, return_exceptions=True)
+            # Only the prefix before the first failure is done; the rest is retried in order
+            delivered = 0
+            for result in results:
+                if isinstance(result, BaseException):
+                    print(f"Failed to publish outbox event: {result}")
+                    break
+                delivered += 1
+            if delivered:
+                await db.execute(
+                    delete(OutboxEvent).where(OutboxEvent.id.in_([event.id for event in events[:delivered]]))
+                )
+            OUTBOX_PENDING.set(await db.scalar(select(func.count()).select_from(OutboxEvent)))
+            await db.commit()
+
+        OUTBOX_PUBLISHED.inc(delivered)
+        return delivered
+
+    async def run(self):
+        """Background task: keep draining while full batches are waiting, otherwise poll"""
+        while True:
+            published = 0
+            try:
+                published = await self.relay_batch()
+            except Exception as e:
+                print(f"Error in outbox relay: {e}")
+            if published < self.batch_size:
+                await asyncio.sleep(self.poll_seconds)
+
+
+# Global relay instance
+outbox_relay = OutboxRelay(
+    batch_size=settings.OUTBOX_RELAY_BATCH_SIZE,
+    poll_seconds=settings.OUTBOX_RELAY_POLL_SECONDS
+)
@@ -0,0 +1,253 @@
+import asyncio
+import time
+from bisect import bisect_right, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import redis.asyncio as redis
+from core.cache import LOCAL_CACHE_ENTRIES, LOCAL_CACHE_EVICTIONS
+from core.config import settings
+from daos.seat_inventory import SeatInventoryDAO
+from models.ticket import Ticket, TicketStatus
+
+
+def parse_seat(seat: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Split a generated seat identifier like "VIP-007" into ("VIP", 7)"""
+    if not seat:
+        return None
+    ticket_class, _, number = seat.rpartition("-")
+    if not ticket_class or not number.isdigit():
+        return None
+    return ticket_class, int(number)
+
+
+class FreeRuns:
+    """Free seat numbers of one ticket class, kept as sorted disjoint [start, end] runs"""
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: Dict[int, int] = {}
+
+    def _add_run(self, start: int, end: int):
+        insort(self.starts, start)
+        self.ends[start] = end
+
+    def _remove_run(self, start: int):
+        self.starts.pop(bisect_right(self.starts, start) - 1)
+        del self.ends[start]
+
+    def _run_containing(self, number: int) -> Optional[int]:
+        idx = bisect_right(self.starts, number) - 1
+        if idx >= 0 and self.ends[self.starts[idx]] >= number:
+            return self.starts[idx]
+        return None
+
+    def add(self, number: int):
+        """Mark a seat free, merging it with neighbouring runs"""
+        if self._run_containing(number) is not None:
+            return
+        left = self._run_containing(number - 1)
+        right = number + 1 if (number + 1) in self.ends else None
+
+        start, end = number, number
+        if left is not None:
+            start = left
+            self._remove_run(left)
+        if right is not None:
+            end = self.ends[right]
+            self._remove_run(right)
+        self._add_run(start, end)
+
+    def remove(self, number: int):
+        """Mark a seat taken, splitting the run it belongs to"""
+        start = self._run_containing(number)
+        if start is None:
+            return
+        end = self.ends[start]
+        self._remove_run(start)
+        if start <= number - 1:
+            self._add_run(start, number - 1)
+        if number + 1 <= end:
+            self._add_run(number + 1, end)
+
+    def find_adjacent(self, quantity: int) -> Optional[List[int]]:
+        """Lowest-numbered block of `quantity` adjacent free seats"""
+        for start in self.starts:
+            if self.ends[start] - start + 1 >= quantity:
+                return list(range(start, start + quantity))
+        return None
+
+    def find_any(self, quantity: int) -> Optional[List[int]]:
+        """Lowest-numbered `quantity` free seats, adjacent or not"""
+        numbers: List[int] = []
+        for start in self.starts:
+            for number in range(start, self.ends[start] + 1):
+                numbers.append(number)
+                if len(numbers) == quantity:
+                    return numbers
+        return None
+
+
+class ShowSeatIndex:
+    """Free-run index for every ticket class of one show"""
+
+    def __init__(self, show_id: int):
+        self.show_id = show_id
+        self.runs: Dict[str, FreeRuns] = {}
+        self.seats: Dict[int, Tuple[str, int]] = {}  # ticket_id -> (class, number)
+        self.tickets: Dict[Tuple[str, int], int] = {}  # (class, number) -> ticket_id
+        self.sold: Set[int] = set()
+        self.loaded_at = 0.0
+
+    def load(self, seats: Iterable[Tuple[int, str, int]], free: Set[int], sold: Set[int]):
+        """Reset from (ticket_id, class, number) triples and the free/sold ticket sets"""
+        self.runs = {}
+        self.seats = {}
+        self.tickets = {}
+        self.sold = set(sold)
+        for ticket_id, ticket_class, number in seats:
+            self.seats[ticket_id] = (ticket_class, number)
+            self.tickets[(ticket_class, number)] = ticket_id
+            runs = self.runs.setdefault(ticket_class, FreeRuns())
+            if ticket_id in free:
+                runs.add(number)
+        self.loaded_at = time.monotonic()
+
+    def take(self, ticket_id: int, sold: bool = False):
+        seat = self.seats.get(ticket_id)
+        if seat:
+            self.runs[seat[0]].remove(seat[1])
+            if sold:
+                self.sold.add(ticket_id)
+
+    def free(self, ticket_id: int):
+        seat = self.seats.get(ticket_id)
+        if seat and ticket_id not in self.sold:
+            self.runs[seat[0]].add(seat[1])
+
+
+class SeatAllocator:
+    """Per-worker best-available allocator over contiguous runs of free seats.
+
+    The index only steers which seats are tried; the Redis hold script and the
+    fenced DB write stay authoritative. Transitions made by this worker update
+    it immediately and it re-reads the Redis seat inventory every
+    ALLOCATOR_REFRESH_SECONDS to pick up other workers' changes. At most
+    max_shows indices are kept; the least recently used one is dropped.
+    """
+
+    def __init__(self, refresh_seconds: float, max_shows: int):
+        self.refresh_seconds = refresh_seconds
+        self.max_shows = max_shows
+        self.shows: "OrderedDict[int, ShowSeatIndex]" = OrderedDict()
+        self.ticket_shows: Dict[int, int] = {}
+        self._load_locks: Dict[int, asyncio.Lock] = {}
+
+    def _store(self, index: ShowSeatIndex):
+        self.shows[index.show_id] = index
+        self.shows.move_to_end(index.show_id)
+        while len(self.shows) > self.max_shows:
+            show_id, evicted = self.shows.popitem(last=False)
+            for ticket_id in evicted.seats:
+                if self.ticket_shows.get(ticket_id) == show_id:
+                    del self.ticket_shows[ticket_id]
+            lock = self._load_locks.get(show_id)
+            if lock is not None and not lock.locked():
+                del self._load_locks[show_id]
+            LOCAL_CACHE_EVICTIONS.labels(cache="seat_allocator", reason="capacity").inc()
+        LOCAL_CACHE_ENTRIES.labels(cache="seat_allocator").set(len(self.shows))
+
+    async def _ensure_loaded(self, db: AsyncSession, redis_client: redis.Redis, show_id: int) -> ShowSeatIndex:
+        index = self.shows.get(show_id)
+        if index and time.monotonic() - index.loaded_at < self.refresh_seconds:
+            self.shows.move_to_end(show_id)
+            return index
+
+        lock = self._load_locks.setdefault(show_id, asyncio.Lock())
+        async with lock:
+            index = self.shows.get(show_id)
+            if index and time.monotonic() - index.loaded_at < self.refresh_seconds:
+                return index
+
+            result = await db.execute(
+                select(Ticket.id, Ticket.seat, Ticket.status).where(Ticket.show_id == show_id)
+            )
+            rows = result.all()
+            seats = []
+            for row in rows:
+                parsed = parse_seat(row.seat)
+                if parsed:
+                    seats.append((row.id, parsed[0], parsed[1]))
+
+            # Prefer live states from the Redis seat inventory, fall back to Postgres
+            seat_map = await SeatInventoryDAO(redis_client).get_seat_map(show_id)
+            if seat_map:
+                free = {seat["ticket_id"] for seat in seat_map if seat["state"] == "available"}
+                sold = {seat["ticket_id"] for seat in seat_map if seat["state"] == "sold"}
+            else:
+                free = {row.id for row in rows if row.status == TicketStatus.available}
+                sold = {row.id for row in rows if row.status == TicketStatus.sold}
+
+            index = index or ShowSeatIndex(show_id)
+            index.load(seats, free, sold)
+            for ticket_id, _, _ in seats:
+                self.ticket_shows[ticket_id] = show_id
+            self._store(index)
+            return index
+
+    async def allocate(
+        self,
+        db: AsyncSession,
+        redis_client: redis.Redis,
+        show_id: int,
+        ticket_class: str,
+        quantity: int,
+        allow_split: bool = False
+    ) -> Optional[List[int]]:
+        """Pick the best available seats and mark them held locally; returns ticket ids.
+
+        Callers check that the show exists first: every show id seen gets an index.
+        """
+        index = await self._ensure_loaded(db, redis_client, show_id)
+        runs = index.runs.get(ticket_class)
+        if not runs:
+            return None
+
+        numbers = runs.find_adjacent(quantity)
+        if numbers is None and allow_split:
+            numbers = runs.find_any(quantity)
+        if numbers is None:
+            return None
+
+        ticket_ids = [index.tickets[(ticket_class, number)] for number in numbers]
+        # Take them now so concurrent requests on this worker pick other seats
+        self.mark_held(ticket_ids)
+        return ticket_ids
+
+    def _index_for(self, ticket_id: int) -> Optional[ShowSeatIndex]:
+        show_id = self.ticket_shows.get(ticket_id)
+        return self.shows.get(show_id) if show_id is not None else None
+
+    def mark_held(self, ticket_ids: Iterable[int]):
+        for ticket_id in ticket_ids:
+            index = self._index_for(ticket_id)
+            if index:
+                index.take(ticket_id)
+
+    def mark_sold(self, ticket_ids: Iterable[int]):
+        for ticket_id in ticket_ids:
+            index = self._index_for(ticket_id)
+            if index:
+                index.take(ticket_id, sold=True)
+
+    def mark_released(self, ticket_ids: Iterable[int]):
+        """Return seats to the free runs (sold seats stay taken)"""
+        for ticket_id in ticket_ids:
+            index = self._index_for(ticket_id)
+            if index:
+                index.free(ticket_id)
+
+
+# Global allocator instance
+seat_allocator = SeatAllocator(settings.ALLOCATOR_REFRESH_SECONDS, settings.ALLOCATOR_MAX_SHOWS)
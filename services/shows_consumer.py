@@ -1,63 +1,212 @@
 from kafka import KafkaConsumer
+from prometheus_client import Counter, Gauge, Histogram
 import json
 import threading
+import time
 import os
 import datetime
-from core.elasticsearch import es_client
+import redis
+from core.config import settings
+from core.elasticsearch import es_client, ELASTICSEARCH_SHOWS_INDEX
+from daos.show_projection import ShowProjectionDAO
+from daos.show_search import SHOWS_MAPPING, show_document
 
 KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
 SHOWS_TOPIC = os.getenv("SHOWS_TOPIC", "pgserver.public.shows")
-ELASTICSEARCH_SHOWS_INDEX = os.getenv("ELASTICSEARCH_SHOWS_INDEX", "shows")
 
-consumer = KafkaConsumer(
-    SHOWS_TOPIC,
-    bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
-    value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-    auto_offset_reset='earliest',
-    enable_auto_commit=True,
-    group_id='shows-consumer-group'
-)
+SHOWS_INDEXED = Counter(
+    'shows_indexed_total', 'Show documents written to Elasticsearch', ['op'])
+SHOWS_INDEX_ERRORS = Counter(
+    'shows_index_errors_total', 'Show documents Elasticsearch rejected', ['op'])
+SHOWS_BULK_SECONDS = Histogram(
+    'shows_bulk_flush_seconds', 'Time to flush one bulk request of show documents')
+SHOWS_INDEX_LAG = Gauge(
+    'shows_index_lag_seconds', 'Age of the newest database change indexed, measured from its commit')
+
+# Item statuses worth resending in the next bulk request (409: concurrent
+# projection updates outlasted retry_on_conflict)
+RETRYABLE_BULK_STATUSES = {409, 429, 502, 503, 504}
+
+# Applies a change event unless the document already holds a newer one.
+# The CDC offset is kept in _source rather than as an external version: the
+# ticket projection consumer partially updates the same documents, and every
+# update bumps the internal version past the topic offsets. Fields not in
+# params.doc (the availability projection) are left as they are.
+SHOW_CHANGE_SCRIPT = """
+if (ctx._source.cdc_offset != null && params.offset != null && ctx._source.cdc_offset > params.offset) {
+    ctx.op = 'noop';
+} else if (params.delete) {
+    ctx.op = 'delete';
+} else {
+    ctx._source.putAll(params.doc);
+    ctx._source.cdc_offset = params.offset;
+}
+"""
+
+
+_projections = None
+
+
+def projection_dao() -> ShowProjectionDAO:
+    global _projections
+    if _projections is None:
+        _projections = ShowProjectionDAO(redis.Redis.from_url(settings.REDIS_URL))
+    return _projections
+
+
+def create_consumer():
+    return KafkaConsumer(
+        SHOWS_TOPIC,
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        # Tombstones that follow Debezium deletes have no value
+        value_deserializer=lambda m: json.loads(m.decode('utf-8')) if m else None,
+        auto_offset_reset='earliest',
+        enable_auto_commit=False,
+        max_poll_records=settings.SHOWS_INDEX_BULK_SIZE,
+        group_id='shows-consumer-group'
+    )
 
 
 def ensure_index():
-    if not es_client.indices.exists(index='shows'):
-        mapping = {
-            "mappings": {
-                "properties": {
-                    "id": {"type": "integer"},
-                    "name": {"type": "text"},
-                    "location": {"type": "text"},
-                    "start_time": {"type": "date"},
-                    "description": {"type": "text"},
-                    "performer": {"type": "text"}
-                }
-            }
-        }
-        es_client.indices.create(index=ELASTICSEARCH_SHOWS_INDEX,
-                                 body=mapping, ignore=400)
+    """Make sure the shows alias resolves to an index with the current mapping.
+
+    A fresh cluster gets shows_v1 behind the alias. An index created before
+    aliases were used (a concrete index named like the alias) is kept until
+    scripts.reindex_shows replaces it.
+    """
+    if es_client.indices.exists(index=ELASTICSEARCH_SHOWS_INDEX):
+        # New fields (e.g. the completion suggesters) can be added in place;
+        # documents indexed before get them on their next change or a reindex
+        es_client.indices.put_mapping(index=ELASTICSEARCH_SHOWS_INDEX, body=SHOWS_MAPPING)
+    else:
+        es_client.indices.create(index=f"{ELASTICSEARCH_SHOWS_INDEX}_v1",
+                                 body={"mappings": SHOWS_MAPPING,
+                                       "aliases": {ELASTICSEARCH_SHOWS_INDEX: {}}},
+                                 ignore=400)
+
+
+def debezium_show_document(after):
+    return show_document(
+        after.get("id"),
+        after.get("name"),
+        after.get("location"),
+        datetime.datetime.fromtimestamp(after.get("start_time") / 1_000_000).isoformat(),
+        after.get("description"),
+        after.get("performer")
+    )
+
+
+def bulk_action(value, offset=None):
+    """(show id, action) for one Debezium change event, or None if it carries nothing to index.
+
+    The event's Kafka offset is stored with the document: a show's events
+    share a partition, so a replayed older event can never overwrite a newer one.
+    """
+    if not value:
+        return None
+    after = value.get("after")
+    if after:
+        return after["id"], {"op": "index", "doc": debezium_show_document(after), "offset": offset}
+    before = value.get("before")
+    if value.get("op") == "d" and before:
+        return before["id"], {"op": "delete", "offset": offset}
+    return None
+
+
+def flush(pending, index=ELASTICSEARCH_SHOWS_INDEX):
+    """Send pending actions as one bulk request of scripted updates; returns the ones to try again"""
+    # A show indexed for the first time gets the availability projection the
+    # ticket projection consumer could not push to it yet
+    projections = projection_dao().get_many(
+        [show_id for show_id, action in pending.items() if action["op"] == "index"])
+    operations = []
+    for show_id, action in pending.items():
+        operations.append({"update": {"_index": index, "_id": show_id, "retry_on_conflict": 3}})
+        script = {"source": SHOW_CHANGE_SCRIPT, "params": {
+            "offset": action.get("offset"),
+            "delete": action["op"] == "delete",
+            "doc": {**action.get("doc", {}), **projections.get(show_id, {})}
+        }}
+        if action["op"] == "index":
+            operations.append({"script": script, "scripted_upsert": True, "upsert": {}})
+        else:
+            operations.append({"script": script})
+
+    started = time.monotonic()
+    response = es_client.bulk(operations=operations)
+    SHOWS_BULK_SECONDS.observe(time.monotonic() - started)
+
+    retry = {}
+    for show_id, item in zip(pending, response["items"]):
+        op, result = pending[show_id]["op"], item["update"]
+        status = result.get("status", 500)
+        if 200 <= status < 300 or (op == "delete" and status == 404):
+            SHOWS_INDEXED.labels(op=op).inc()
+        elif status in RETRYABLE_BULK_STATUSES:
+            retry[show_id] = pending[show_id]
+        else:
+            SHOWS_INDEX_ERRORS.labels(op=op).inc()
+            print(f"⚠️ Elasticsearch rejected {op} of show {show_id}: {result.get('error')}")
+    return retry
+
+
+def flush_until_done(pending, index=ELASTICSEARCH_SHOWS_INDEX):
+    """Flush, retrying throttled items and unreachable clusters with backoff, until nothing is left"""
+    attempt = 0
+    while pending:
+        try:
+            pending = flush(pending, index)
+        except Exception as e:
+            print(f"⚠️ Bulk indexing failed: {e}")
+        if pending:
+            time.sleep(min(0.5 * 2 ** attempt, 30))
+            attempt += 1
+
+
+def add_action(pending, message):
+    """Buffer one message's action; a later change to the same show supersedes an earlier one"""
+    action = bulk_action(message.value, message.offset)
+    if action is None:
+        return
+    show_id, action = action
+    pending.pop(show_id, None)
+    pending[show_id] = action
 
 
 def consume_and_index():
     ensure_index()
-    for message in consumer:
-        value = message.value
-
-        after = value.get("after")
-        if after:
-            doc = {
-                "id": after.get("id"),
-                "name": after.get("name"),
-                "location": after.get("location"),
-                "start_time": datetime.datetime.fromtimestamp(after.get("start_time") / 1_000_000).isoformat(),
-                "description": after.get("description"),
-                "performer": after.get("performer")
-            }
-
-            es_client.index(index=ELASTICSEARCH_SHOWS_INDEX,
-                            id=after["id"], document=doc)
-            print(f"✅ Indexed to {ELASTICSEARCH_SHOWS_INDEX}: {doc}")
-        else:
-            print("⚠️ Skipped message without 'after' data")
+    consumer = create_consumer()
+    # Keyed by show id
+    pending = {}
+    newest_change_ms = None
+    uncommitted = False
+    flush_started = time.monotonic()
+
+    while True:
+        batch = consumer.poll(timeout_ms=200)
+        for records in batch.values():
+            for message in records:
+                uncommitted = True
+                add_action(pending, message)
+                if message.value:
+                    newest_change_ms = message.value.get("ts_ms") or newest_change_ms
+
+        if not uncommitted:
+            flush_started = time.monotonic()
+            continue
+        if len(pending) < settings.SHOWS_INDEX_BULK_SIZE \
+                and time.monotonic() - flush_started < settings.SHOWS_INDEX_FLUSH_SECONDS:
+            continue
+
+        # Writes go through the alias, so a reindex swap redirects them
+        flush_until_done(pending)
+        # Offsets move only once everything read so far is in the index
+        consumer.commit()
+        if newest_change_ms:
+            SHOWS_INDEX_LAG.set(max(time.time() - newest_change_ms / 1000, 0))
+        pending = {}
+        uncommitted = False
+        flush_started = time.monotonic()
 
 
 def start_consumer_thread():
@@ -0,0 +1,119 @@
+from kafka import KafkaConsumer
+from prometheus_client import Counter, Gauge, Histogram
+import json
+import threading
+import time
+import os
+import redis
+from core.config import settings
+from core.elasticsearch import es_client, ELASTICSEARCH_SHOWS_INDEX
+from daos.show_projection import ShowProjectionDAO
+
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
+TICKETS_TOPIC = os.getenv("TICKETS_TOPIC", "pgserver.public.tickets")
+
+TICKET_EVENTS_PROJECTED = Counter(
+    'ticket_events_projected_total', 'Ticket change events read by the projection consumer')
+SHOW_PROJECTIONS_PUSHED = Counter(
+    'show_projections_pushed_total', 'Show availability projections written to Elasticsearch', ['outcome'])
+TICKET_PROJECTION_BATCH_SECONDS = Histogram(
+    'ticket_projection_batch_seconds', 'Time to apply one batch of ticket events to Redis and Elasticsearch')
+TICKET_PROJECTION_LAG = Gauge(
+    'ticket_projection_lag_seconds', 'Age of the newest ticket change projected, measured from its commit')
+
+
+def create_consumer():
+    return KafkaConsumer(
+        TICKETS_TOPIC,
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        value_deserializer=lambda m: json.loads(m.decode('utf-8')) if m else None,
+        auto_offset_reset='earliest',
+        enable_auto_commit=False,
+        max_poll_records=settings.TICKET_PROJECTION_BATCH_SIZE,
+        group_id='ticket-projection-group'
+    )
+
+
+def push_projections(projections):
+    """Partially update show documents with their availability fields.
+
+    Shows not indexed yet are skipped: the shows consumer merges the
+    projection in when it indexes them.
+    """
+    if not projections:
+        return
+    operations = []
+    for show_id, fields in projections.items():
+        operations.append({"update": {"_index": ELASTICSEARCH_SHOWS_INDEX, "_id": show_id, "retry_on_conflict": 3}})
+        operations.append({"doc": fields})
+    response = es_client.bulk(operations=operations)
+    for item in response["items"]:
+        status = item["update"].get("status", 500)
+        if 200 <= status < 300:
+            SHOW_PROJECTIONS_PUSHED.labels(outcome="updated").inc()
+        elif status == 404:
+            SHOW_PROJECTIONS_PUSHED.labels(outcome="not_indexed").inc()
+        else:
+            SHOW_PROJECTIONS_PUSHED.labels(outcome="failed").inc()
+            print(f"⚠️ Elasticsearch rejected projection of show {item['update'].get('_id')}: "
+                  f"{item['update'].get('error')}")
+
+
+def apply_batch(dao, messages):
+    """Fold a batch into the Redis projections, then push the changed ones to Elasticsearch"""
+    started = time.monotonic()
+    show_ids = dao.apply(messages)
+    attempt = 0
+    while True:
+        try:
+            # Re-read after applying: the hash is the source of truth, so a retry is idempotent
+            push_projections(dao.get_many(show_ids))
+            break
+        except Exception as e:
+            print(f"⚠️ Pushing show projections failed: {e}")
+            time.sleep(min(0.5 * 2 ** attempt, 30))
+            attempt += 1
+    TICKET_PROJECTION_BATCH_SECONDS.observe(time.monotonic() - started)
+
+
+def consume_and_project():
+    consumer = create_consumer()
+    dao = ShowProjectionDAO(redis.Redis.from_url(settings.REDIS_URL))
+    messages = []
+    newest_change_ms = None
+    batch_started = time.monotonic()
+
+    while True:
+        batch = consumer.poll(timeout_ms=200)
+        for records in batch.values():
+            messages.extend(records)
+            for message in records:
+                if message.value:
+                    newest_change_ms = message.value.get("ts_ms") or newest_change_ms
+
+        if not messages:
+            batch_started = time.monotonic()
+            continue
+        if len(messages) < settings.TICKET_PROJECTION_BATCH_SIZE \
+                and time.monotonic() - batch_started < settings.TICKET_PROJECTION_FLUSH_SECONDS:
+            continue
+
+        try:
+            apply_batch(dao, messages)
+        except Exception as e:
+            # Redis unreachable: nothing was applied, retry the same batch
+            print(f"⚠️ Applying ticket events failed: {e}")
+            time.sleep(1)
+            continue
+        # Offsets move only once the batch is in Redis and Elasticsearch
+        consumer.commit()
+        TICKET_EVENTS_PROJECTED.inc(len(messages))
+        if newest_change_ms:
+            TICKET_PROJECTION_LAG.set(max(time.time() - newest_change_ms / 1000, 0))
+        messages = []
+        batch_started = time.monotonic()
+
+
+def start_projection_consumer_thread():
+    thread = threading.Thread(target=consume_and_project, daemon=True)
+    thread.start()
@@ -0,0 +1,224 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+from jose import JWTError, jwt
+from prometheus_client import Counter, Gauge
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import redis.asyncio as redis
+from core.config import settings
+from daos.seat_inventory import SEAT_INDEX_KEY
+from models.ticket import Ticket
+
+# show_id -> admissions per second, for every show behind the waiting room
+GATED_SHOWS_KEY = "waiting_room:gated"
+ADMITTER_LOCK_KEY = "waiting_room:admitter"
+
+WAITING_ROOM_ADMITTED = Counter(
+    'waiting_room_admitted_total', 'Users admitted from a waiting room queue')
+WAITING_ROOM_QUEUE_DEPTH = Gauge(
+    'waiting_room_queue_depth', 'Users waiting across all gated shows')
+
+# KEYS[1] = queue, KEYS[2] = sequence counter, KEYS[3] = admitted token key.
+# ARGV[1] = user id. Returns {1, token} if already admitted, else {0, rank}.
+JOIN_QUEUE_SCRIPT = """
+local token = redis.call('GET', KEYS[3])
+if token then
+    return {1, token}
+end
+local rank = redis.call('ZRANK', KEYS[1], ARGV[1])
+if not rank then
+    redis.call('ZADD', KEYS[1], 'NX', redis.call('INCR', KEYS[2]), ARGV[1])
+    rank = redis.call('ZRANK', KEYS[1], ARGV[1])
+end
+return {0, rank}
+"""
+
+
+class WaitingRoom:
+    """Redis-backed FIFO admission queue per show, issuing signed admission tokens"""
+
+    def __init__(self, token_ttl: int, tick_seconds: float, gated_cache_seconds: float):
+        self.token_ttl = token_ttl
+        self.tick_seconds = tick_seconds
+        self.gated_cache_seconds = gated_cache_seconds
+        self._gated: Dict[int, float] = {}
+        self._gated_loaded_at = 0.0
+        # Registered on first use: the shared client is only handed in per call
+        self._join_script = None
+
+    @staticmethod
+    def _queue_key(show_id: int) -> str:
+        return f"waiting_room:{show_id}:queue"
+
+    @staticmethod
+    def _sequence_key(show_id: int) -> str:
+        return f"waiting_room:{show_id}:seq"
+
+    @staticmethod
+    def _token_key(show_id: int, user_id: int) -> str:
+        return f"waiting_room:{show_id}:token:{user_id}"
+
+    def issue_token(self, show_id: int, user_id: int) -> str:
+        expire = datetime.utcnow() + timedelta(seconds=self.token_ttl)
+        return jwt.encode(
+            {"sub": str(user_id), "show_id": show_id, "typ": "admission", "exp": expire},
+            settings.SECRET_KEY,
+            algorithm=settings.ALGORITHM
+        )
+
+    def verify_token(self, token: Optional[str], user_id: int) -> Optional[int]:
+        """Return the show id an admission token was issued for, if it is valid for this user"""
+        if not token:
+            return None
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            return None
+        if payload.get("typ") != "admission" or payload.get("sub") != str(user_id):
+            return None
+        return payload.get("show_id")
+
+    async def gated_shows(self, redis_client: redis.Redis) -> Dict[int, float]:
+        """Gated shows and their admission rates, cached briefly in-process"""
+        if time.monotonic() - self._gated_loaded_at >= self.gated_cache_seconds:
+            raw = await redis_client.hgetall(GATED_SHOWS_KEY)
+            self._gated = {int(show_id): float(rate) for show_id, rate in raw.items()}
+            self._gated_loaded_at = time.monotonic()
+        return self._gated
+
+    async def enable(self, redis_client: redis.Redis, show_id: int, admit_per_second: float):
+        await redis_client.hset(GATED_SHOWS_KEY, show_id, admit_per_second)
+        self._gated_loaded_at = 0.0
+
+    async def disable(self, redis_client: redis.Redis, show_id: int):
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hdel(GATED_SHOWS_KEY, show_id)
+            pipe.delete(self._queue_key(show_id), self._sequence_key(show_id))
+            await pipe.execute()
+        self._gated_loaded_at = 0.0
+
+    async def join(self, redis_client: redis.Redis, show_id: int, user_id: int) -> dict:
+        """Enter the queue (idempotent) and report the caller's status"""
+        gated = await self.gated_shows(redis_client)
+        if show_id not in gated:
+            return {"show_id": show_id, "admitted": True, "admission_token": None, "position": 0, "eta_seconds": 0}
+
+        if self._join_script is None or self._join_script.registered_client is not redis_client:
+            self._join_script = redis_client.register_script(JOIN_QUEUE_SCRIPT)
+        result = await self._join_script(
+            keys=[self._queue_key(show_id), self._sequence_key(show_id), self._token_key(show_id, user_id)],
+            args=[user_id]
+        )
+        return self._status(show_id, gated[show_id], result)
+
+    async def status(self, redis_client: redis.Redis, show_id: int, user_id: int) -> Optional[dict]:
+        """Position/ETA for a queued user, or their token once admitted; None if not queued"""
+        gated = await self.gated_shows(redis_client)
+        if show_id not in gated:
+            return {"show_id": show_id, "admitted": True, "admission_token": None, "position": 0, "eta_seconds": 0}
+
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.get(self._token_key(show_id, user_id))
+            pipe.zrank(self._queue_key(show_id), user_id)
+            token, rank = await pipe.execute()
+
+        if token:
+            return self._status(show_id, gated[show_id], [1, token])
+        if rank is None:
+            return None
+        return self._status(show_id, gated[show_id], [0, rank])
+
+    def _status(self, show_id: int, admit_per_second: float, result) -> dict:
+        if int(result[0]) == 1:
+            token = result[1].decode('utf-8') if isinstance(result[1], bytes) else result[1]
+            return {"show_id": show_id, "admitted": True, "admission_token": token, "position": 0, "eta_seconds": 0}
+        position = int(result[1]) + 1
+        return {
+            "show_id": show_id,
+            "admitted": False,
+            "admission_token": None,
+            "position": position,
+            "eta_seconds": round(position / admit_per_second, 1) if admit_per_second > 0 else None
+        }
+
+    async def check_admission(
+        self,
+        redis_client: redis.Redis,
+        db: AsyncSession,
+        ticket_ids: Iterable[int],
+        token: Optional[str],
+        user_id: int
+    ) -> bool:
+        """True if the tickets' shows are not gated, or the token admits this user to them"""
+        gated = await self.gated_shows(redis_client)
+        if not gated:
+            return True
+
+        ticket_ids = list(ticket_ids)
+        show_ids = set()
+        locations = await redis_client.hmget(SEAT_INDEX_KEY, ticket_ids)
+        missing = []
+        for ticket_id, location in zip(ticket_ids, locations):
+            if location:
+                show_ids.add(int(location.split(b":", 1)[0]))
+            else:
+                missing.append(ticket_id)
+        if missing:
+            # Seat inventory not built for these tickets yet, ask Postgres
+            result = await db.execute(select(Ticket.show_id).where(Ticket.id.in_(missing)))
+            show_ids.update(result.scalars().all())
+
+        gated_show_ids = show_ids & gated.keys()
+        if not gated_show_ids:
+            return True
+        admitted_show_id = self.verify_token(token, user_id)
+        return gated_show_ids == {admitted_show_id}
+
+    async def admit(self, redis_client: redis.Redis):
+        """Admit the next users of every gated show at its configured rate (one worker per tick)"""
+        acquired = await redis_client.set(
+            ADMITTER_LOCK_KEY, 1, nx=True, px=int(self.tick_seconds * 1000))
+        if not acquired:
+            return
+
+        gated = await self.gated_shows(redis_client)
+        waiting = 0
+        for show_id, admit_per_second in gated.items():
+            # At least one user per tick; fractional rates round up
+            count = max(1, int(admit_per_second * self.tick_seconds + 0.999))
+            popped = await redis_client.zpopmin(self._queue_key(show_id), count)
+            if popped:
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for member, _ in popped:
+                        user_id = int(member)
+                        pipe.set(
+                            self._token_key(show_id, user_id),
+                            self.issue_token(show_id, user_id),
+                            ex=self.token_ttl
+                        )
+                    pipe.zcard(self._queue_key(show_id))
+                    results = await pipe.execute()
+                WAITING_ROOM_ADMITTED.inc(len(popped))
+                waiting += results[-1]
+            else:
+                waiting += await redis_client.zcard(self._queue_key(show_id))
+        WAITING_ROOM_QUEUE_DEPTH.set(waiting)
+
+    async def run_admission_loop(self, redis_client: redis.Redis):
+        """Background task: admit users every tick"""
+        while True:
+            try:
+                await self.admit(redis_client)
+            except Exception as e:
+                print(f"Error in waiting room admission: {e}")
+            await asyncio.sleep(self.tick_seconds)
+
+
+# Global waiting room instance
+waiting_room = WaitingRoom(
+    token_ttl=settings.WAITING_ROOM_TOKEN_TTL,
+    tick_seconds=settings.WAITING_ROOM_TICK_SECONDS,
+    gated_cache_seconds=settings.WAITING_ROOM_GATED_CACHE_SECONDS
+)
@@ -8,10 +8,12 @@ done
 echo "Kafka Connect is ready."
 
 if [ -f shows-connector.json ]; then
-    echo "Creating Kafka connector..."
-    curl -X POST http://debezium:8083/connectors \
-         -H "Content-Type: application/json" \
-         -d @shows-connector.json || true
+    echo "Creating or updating Kafka connector..."
+    # PUT .../config creates the connector or applies a changed config to it
+    python -c "import json; print(json.dumps(json.load(open('shows-connector.json'))['config']))" \
+        | curl -X PUT http://debezium:8083/connectors/shows-connector/config \
+               -H "Content-Type: application/json" \
+               -d @- || true
 else
     echo "shows-connector.json not found, skipping connector creation."
 fi
@@ -0,0 +1,62 @@
+"""Fencing counters lost from Redis are re-seeded from Postgres tokens.
+
+Runs HOLD_TICKETS_SCRIPT against the Redis at REDIS_URL (skipped when none
+is reachable); the Postgres side is represented by the fence_token passed in.
+"""
+import os
+import uuid
+import pytest
+
+redis = pytest.importorskip("redis")
+booking = pytest.importorskip("daos.booking")
+
+
+@pytest.fixture
+def redis_client():
+    client = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/15"))
+    try:
+        client.ping()
+    except redis.exceptions.ConnectionError:
+        pytest.skip("Redis is not reachable")
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def ticket_id():
+    # Large and random so it never collides with real tickets
+    return 10 ** 12 + uuid.uuid4().int % 10 ** 9
+
+
+def hold(redis_client, ticket_id, db_token=None):
+    keys = [
+        booking.BookingDAO._lock_key(ticket_id),
+        booking.BookingDAO._fence_key(ticket_id),
+        booking.SEAT_INDEX_KEY,
+    ]
+    args = [1, 60, ticket_id] + ([] if db_token is None else [db_token])
+    return redis_client.register_script(booking.HOLD_TICKETS_SCRIPT)(keys=keys, args=args)
+
+
+def test_hold_after_fence_counter_lost_issues_token_above_postgres(redis_client, ticket_id):
+    lock_key, fence = booking.BookingDAO._lock_key(ticket_id), booking.BookingDAO._fence_key(ticket_id)
+    try:
+        # Ticket booked before with token 41 (tickets.fence_token); the counter was then lost
+        assert [int(v) for v in hold(redis_client, ticket_id)] == [2]
+        assert not redis_client.exists(lock_key)
+
+        result = hold(redis_client, ticket_id, db_token=41)
+        assert int(result[0]) == 1
+        assert [int(t) for t in result[1]] == [42]
+
+        # The seeded counter carries on without Postgres
+        redis_client.delete(lock_key)
+        result = hold(redis_client, ticket_id)
+        assert [int(t) for t in result[1]] == [43]
+
+        # A stale Postgres token never lowers the counter
+        redis_client.delete(lock_key)
+        result = hold(redis_client, ticket_id, db_token=5)
+        assert [int(t) for t in result[1]] == [44]
+    finally:
+        redis_client.delete(lock_key, fence)